@@ -2,6 +2,9 @@
 echo "Apply database migrations"
 python manage.py makemigrations
 python manage.py migrate
+python manage.py createcachetable
+echo "Apply database functions, triggers and indexes"
+python manage.py apply_db_schema
 echo "Start application"
-gunicorn --workers=2 --threads=100 --bind=0.0.0.0:8000 newsfeedner_project.wsgi:application
+MORPH_PRELOAD=1 gunicorn --preload --workers=2 --threads=100 --bind=0.0.0.0:8000 newsfeedner_project.wsgi:application
 
@@ -3,3 +3,7 @@ from django.apps import AppConfig
 
 class NewsfeednerConfig(AppConfig):
     name = "newsfeedner"
+
+    def ready(self):
+        # производные поля событий при записи (newsfeedner/signals.py)
+        from newsfeedner import signals  # noqa: F401
@@ -0,0 +1,62 @@
+from pathlib import Path
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+
+from newsfeedner.models import (
+    EVENT_LOCATION_MODELS,
+    TradeRegionCountry,
+)
+from newsfeedner.utils.lexicon import LEXICON
+
+SQL_DIR = Path(__file__).resolve().parents[2] / "sql"
+
+
+def get_region_country_pairs():
+    """
+    Возвращает пары (страна, регион) из справочника регионов (LEXICON.regions).
+    Сам регион (и вариант с префиксом "Разные ") тоже считается "страной" своего региона,
+    так как в поле locations регионы записываются как "Разные Страны Африки".
+    """
+    pairs = set()
+    for region, countries in LEXICON.regions.items():
+        pairs.add((region, region))
+        if not region.startswith("Разные "):
+            pairs.add(("Разные " + region, region))
+        for country in countries:
+            pairs.add((country, region))
+    return sorted(pairs)
+
+
+class Command(BaseCommand):
+    help = (
+        "Применяет SQL из newsfeedner/sql (функции, триггеры, индексы) "
+        "и заполняет справочники. Запускается после migrate, повторный запуск безопасен."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--rebuild-locations",
+            action="store_true",
+            help="Пересобрать таблицы локаций событий (после изменения query_regions_dict)",
+        )
+
+    def fill_region_countries(self):
+        TradeRegionCountry.objects.all().delete()
+        TradeRegionCountry.objects.bulk_create(
+            [TradeRegionCountry(country=c, region=r) for c, r in get_region_country_pairs()]
+        )
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            self.fill_region_countries()
+            if options["rebuild_locations"]:
+                with connection.cursor() as cursor:
+                    for location_model in EVENT_LOCATION_MODELS.values():
+                        cursor.execute(f"TRUNCATE {location_model._meta.db_table}")
+
+            for sql_path in sorted(SQL_DIR.glob("*.sql")):
+                self.stdout.write(f"Applying {sql_path.name}")
+                with connection.cursor() as cursor:
+                    cursor.execute(sql_path.read_text(encoding="utf-8"))
+        self.stdout.write(self.style.SUCCESS("Database schema is up to date"))
@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from newsfeedner.utils.abstract_benchmark import generate_articles, run_benchmark
+
+
+class Command(BaseCommand):
+    help = (
+        "Сравнивает время и результаты прежней реализации get_article_abstract, "
+        "get_article_abstract и пакетного get_article_abstracts на синтетических новостях."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--size", type=int, default=3000, help="Число новостей")
+        parser.add_argument("--repeat", type=int, default=1, help="Число запусков для замера времени")
+        parser.add_argument("--seed", type=int, default=0)
+
+    def handle(self, *args, **options):
+        articles = generate_articles(options["size"], options["seed"])
+        timings = run_benchmark(articles, options["repeat"])
+        for name in ("reference", "single", "batch"):
+            self.stdout.write(
+                f"{name:10} {timings[name]:>8.3f} s  x{timings['reference'] / timings[name]:.2f}"
+            )
+        if not timings["identical"]:
+            raise CommandError("Results differ from the reference implementation")
+        self.stdout.write(self.style.SUCCESS("Results are identical"))
@@ -0,0 +1,73 @@
+import json
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+
+from newsfeedner.utils.facet_benchmark import (
+    BUILDERS,
+    find_regressions,
+    generate_event_rows,
+    run_benchmark,
+)
+
+BASELINE_PATH = Path(__file__).resolve().parents[2] / "benchmarks" / "facets_baseline.json"
+
+
+class Command(BaseCommand):
+    help = (
+        "Замеряет время и пик памяти построителей данных фильтров на синтетических строках "
+        "и сравнивает с базовыми замерами (newsfeedner/benchmarks/facets_baseline.json)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--sizes", nargs="+", type=int, default=[10000, 100000, 1000000], help="Число строк")
+        parser.add_argument(
+            "--source",
+            choices=("memory", "postgres"),
+            default="memory",
+            help="memory - строки в памяти, без базы; postgres - временная таблица в локальной базе",
+        )
+        parser.add_argument("--repeat", type=int, default=1, help="Число запусков для замера времени")
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument(
+            "--tolerance",
+            type=float,
+            default=0.5,
+            help="Допустимое ухудшение относительно базового замера (0.5 - на 50%%)",
+        )
+        parser.add_argument("--baseline", default=str(BASELINE_PATH))
+        parser.add_argument(
+            "--update-baseline",
+            action="store_true",
+            help="Записать замеры как базовые вместо сравнения",
+        )
+
+    def handle(self, *args, **options):
+        baseline_path = Path(options["baseline"])
+        baseline = json.loads(baseline_path.read_text(encoding="utf-8")) if baseline_path.exists() else {}
+        source = options["source"]
+
+        results = {source: {}}
+        for size in options["sizes"]:
+            rows = generate_event_rows(size, options["seed"])
+            results[source][str(size)] = run_benchmark(rows, source, options["repeat"])
+            del rows
+            for builder in BUILDERS:
+                metrics = results[source][str(size)][builder]
+                base = baseline.get(source, {}).get(str(size), {}).get(builder, {})
+                self.stdout.write(
+                    f"{source:8} {size:>8} {builder:20} {metrics['seconds']:>9.4f} s {metrics['peak_mb']:>9.2f} MB"
+                    f"  (baseline {base.get('seconds', '-')} s, {base.get('peak_mb', '-')} MB)"
+                )
+
+        if options["update_baseline"]:
+            baseline.setdefault(source, {}).update(results[source])
+            baseline_path.parent.mkdir(parents=True, exist_ok=True)
+            baseline_path.write_text(json.dumps(baseline, indent=2, sort_keys=True) + "\n", encoding="utf-8")
+            self.stdout.write(self.style.SUCCESS(f"Baseline saved to {baseline_path}"))
+            return
+
+        regressions = find_regressions(results, baseline, options["tolerance"])
+        if regressions:
+            raise CommandError("Regressions against baseline:\n" + "\n".join(regressions))
+        self.stdout.write(self.style.SUCCESS("No regressions against baseline"))
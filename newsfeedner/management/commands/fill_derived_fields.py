@@ -0,0 +1,70 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from newsfeedner.models import TradeEvent, TradeEventForApproval, TradeEventRelevant
+from newsfeedner.utils.derived_fields import fill_derived_fields
+from newsfeedner.utils.queryset_process import normal_forms
+
+EVENT_MODELS = {
+    "events": TradeEvent,
+    "approval": TradeEventForApproval,
+    "relevant": TradeEventRelevant,
+}
+
+
+class Command(BaseCommand):
+    help = (
+        "Считает производные поля событий (classes_text, locations_normalized, abstract) для строк, "
+        "где их ещё нет: заполнение существующих строк и строк, записанных в обход Django."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--tables",
+            nargs="+",
+            choices=list(EVENT_MODELS),
+            default=list(EVENT_MODELS),
+            help="Таблицы событий",
+        )
+        parser.add_argument("--batch-size", type=int, default=1000)
+        parser.add_argument(
+            "--watch",
+            type=int,
+            default=0,
+            help="Не завершаться, а проверять новые строки раз в указанное число секунд",
+        )
+
+    def fill(self, tables, batch_size):
+        for table in tables:
+            model = EVENT_MODELS[table]
+            start = time.perf_counter()
+            total = fill_derived_fields(
+                model,
+                batch_size,
+                on_batch=lambda rows, seconds: self.stdout.write(
+                    f"{model._meta.db_table}: {rows} rows, {rows / max(seconds, 1e-9):.0f} rows/s"
+                ),
+            )
+            if total:
+                elapsed = time.perf_counter() - start
+                self.stdout.write(
+                    self.style.SUCCESS(
+                        f"{model._meta.db_table}: {total} rows in {elapsed:.1f} s "
+                        f"({total / max(elapsed, 1e-9):.0f} rows/s)"
+                    )
+                )
+
+    def handle(self, *args, **options):
+        normal_forms.load()
+        try:
+            while True:
+                self.fill(options["tables"], options["batch_size"])
+                if not options["watch"]:
+                    break
+                connection.close()
+                time.sleep(options["watch"])
+        finally:
+            normal_forms.save()
+            self.stdout.write(f"Normal forms cache: {normal_forms.stats()}")
@@ -0,0 +1,125 @@
+import json
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+from pathlib import Path
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from newsfeedner.management.commands.fill_derived_fields import EVENT_MODELS
+from newsfeedner.utils.derived_fields import DERIVED_SOURCE_FIELDS, get_derived_rows, update_derived_fields
+from newsfeedner.utils.lexicon import LEXICON
+from newsfeedner.utils.queryset_process import normal_forms
+
+DEFAULT_CHECKPOINT = "renormalize_locations.json"
+
+
+class Command(BaseCommand):
+    help = (
+        "Пересчитывает locations_normalized (и остальные производные поля) всех событий "
+        "после изменения loc_dict, stoplist или query_regions_dict. Строки читаются серверным курсором, "
+        "разбор pymorphy2 выполняется пулом процессов, запись - пачками, только в строки, "
+        "не изменённые с момента чтения. "
+        "Прерванный пересчёт продолжается с сохранённой позиции (--checkpoint)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--tables",
+            nargs="+",
+            choices=list(EVENT_MODELS),
+            default=list(EVENT_MODELS),
+            help="Таблицы событий",
+        )
+        parser.add_argument("--batch-size", type=int, default=1000)
+        parser.add_argument("--workers", type=int, default=os.cpu_count(), help="Число процессов (1 - без пула)")
+        parser.add_argument(
+            "--checkpoint",
+            default=DEFAULT_CHECKPOINT,
+            help="Файл с последним записанным id по каждой таблице и версией справочников",
+        )
+        parser.add_argument("--restart", action="store_true", help="Начать сначала, не читая checkpoint")
+
+    def read_checkpoint(self, path: Path, restart: bool):
+        if restart or not path.exists():
+            return {"lexicon_version": LEXICON.version}
+        checkpoint = json.loads(path.read_text(encoding="utf-8"))
+        if checkpoint.get("lexicon_version") != LEXICON.version:
+            # справочники изменились после сохранения позиции - пересчитанные строки устарели
+            self.stdout.write(self.style.WARNING("Lexicon has changed since the checkpoint, starting over"))
+            return {"lexicon_version": LEXICON.version}
+        return checkpoint
+
+    def write_checkpoint(self, path: Path, checkpoint):
+        tmp_path = path.with_suffix(".tmp")
+        tmp_path.write_text(json.dumps(checkpoint, indent=2), encoding="utf-8")
+        tmp_path.replace(path)
+
+    def get_batches(self, model, last_pk, batch_size):
+        rows = model.objects.order_by("pk")
+        if last_pk is not None:
+            rows = rows.filter(pk__gt=last_pk)
+        # iterator() в PostgreSQL читает серверным курсором, таблица целиком в память не загружается
+        rows = rows.values_list("pk", *DERIVED_SOURCE_FIELDS).iterator(chunk_size=batch_size)
+        while True:
+            batch = list(islice(rows, batch_size))
+            if not batch:
+                return
+            yield batch
+
+    def renormalize(self, model, executor, workers, checkpoint, checkpoint_path, batch_size):
+        table = model._meta.db_table
+        total, start = 0, time.perf_counter()
+        # в работе не больше 2 пачек на процесс: чтение идёт вровень с разбором
+        pending = deque()
+
+        def write_next():
+            nonlocal total
+            batch, derived_rows = pending.popleft()
+            derived_rows = derived_rows.result() if executor else derived_rows
+            total += update_derived_fields(model, batch, [fields for _, fields in derived_rows])
+            checkpoint[table] = str(batch[-1][0])
+            self.write_checkpoint(checkpoint_path, checkpoint)
+            elapsed = time.perf_counter() - start
+            self.stdout.write(f"{table}: {total} rows, {total / max(elapsed, 1e-9):.0f} rows/s")
+
+        for batch in self.get_batches(model, checkpoint.get(table), batch_size):
+            pending.append((batch, executor.submit(get_derived_rows, batch) if executor else get_derived_rows(batch)))
+            if len(pending) >= 2 * workers:
+                write_next()
+        while pending:
+            write_next()
+
+        elapsed = time.perf_counter() - start
+        self.stdout.write(
+            self.style.SUCCESS(f"{table}: {total} rows in {elapsed:.1f} s ({total / max(elapsed, 1e-9):.0f} rows/s)")
+        )
+
+    def handle(self, *args, **options):
+        checkpoint_path = Path(options["checkpoint"])
+        checkpoint = self.read_checkpoint(checkpoint_path, options["restart"])
+        workers = max(options["workers"], 1)
+        # кэш нормальных форм заполняется до запуска процессов - они получают его копию
+        normal_forms.load()
+        executor = None
+        if workers > 1:
+            # процессы создаются без открытого соединения с базой: оно не должно достаться дочерним
+            connection.close()
+            executor = ProcessPoolExecutor(max_workers=workers)
+            executor.submit(int).result()
+        try:
+            for table in options["tables"]:
+                self.renormalize(
+                    EVENT_MODELS[table], executor, workers, checkpoint, checkpoint_path, options["batch_size"]
+                )
+        finally:
+            if executor:
+                executor.shutdown()
+        # все таблицы пересчитаны - следующий запуск начнётся сначала
+        checkpoint_path.unlink(missing_ok=True)
+        if executor is None:
+            # у процессов пула свои копии кэша, их счётчики здесь не видны
+            self.stdout.write(f"Normal forms cache: {normal_forms.stats()}")
@@ -7,6 +7,7 @@ import jwt
 from django.conf import settings
 from django.contrib.auth.models import AbstractUser
 from django.contrib.postgres.fields import ArrayField
+from django.contrib.postgres.search import SearchVectorField
 from django.db import models
 from django.utils import timezone as django_timezone
 
@@ -88,12 +89,23 @@ class TradeEventAbstract(models.Model):
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     classes = ArrayField(models.TextField())
     itc_codes = models.TextField(blank=True, null=False)
+    # коды СМТК из itc_codes в виде массива, заполняется триггером базы (GIN-индекс)
+    smtk_codes = ArrayField(models.TextField(), default=list, blank=True, editable=False)
     locations = models.TextField(blank=True, null=False)
     product = models.TextField(blank=True, null=False)
     title = models.TextField(blank=True, null=False)
+    # to_tsvector('russian', title), заполняется триггером базы (GIN-индекс)
+    title_tsv = SearchVectorField(null=True, editable=False)
     url = models.TextField(blank=True, null=False)
     dates = models.TextField()
+    # дата события из dates, заполняется триггером базы (btree-индекс)
+    event_date = models.DateField(null=True, editable=False)
     article_ids = ArrayField(models.TextField())
+    # производные поля (utils/derived_fields.py): считаются при записи, а не на каждый запрос,
+    # сбрасываются в NULL триггером базы при изменении classes, locations или title
+    classes_text = models.TextField(null=True, editable=False)
+    locations_normalized = models.TextField(null=True, editable=False)
+    abstract = models.TextField(null=True, editable=False)
 
     class Meta:
         abstract = True
@@ -105,7 +117,7 @@ class TradeEvent(TradeEventAbstract):
     class Meta:
         managed = False
         db_table = "trade_news_events"
-        ordering = ("-dates", )
+        ordering = ("-event_date", )
 
     def __str__(self):
         return "{}: {}".format(self.classes, self.title)
@@ -119,7 +131,7 @@ class TradeEventForApproval(TradeEventAbstract):
     class Meta:
         managed = True
         db_table = "trade_news_for_approval"
-        ordering = ("-dates", )
+        ordering = ("-event_date", )
         constraints = [
             models.UniqueConstraint(
                 fields=("classes", "itc_codes", "locations", "title"),
@@ -138,7 +150,7 @@ class TradeEventRelevant(TradeEventAbstract):
     class Meta:
         managed = True
         db_table = "trade_news_relevant"
-        ordering = ("-dates", )
+        ordering = ("-event_date", )
         constraints = [
             models.UniqueConstraint(
                 fields=("classes", "itc_codes", "locations", "title"),
@@ -150,6 +162,164 @@ class TradeEventRelevant(TradeEventAbstract):
         return "{}: {}".format(self.classes, self.title, self.article_ids)
 
 
+class TradeRegionCountry(models.Model):
+    """
+    Справочник регион - страна из query_regions_dict.
+    Заполняется командой apply_db_schema, используется триггерами
+    для заполнения таблиц локаций событий.
+    """
+    country = models.TextField(null=False)
+    region = models.TextField(null=False)
+
+    class Meta:
+        managed = True
+        db_table = "trade_news_region_countries"
+        constraints = [
+            models.UniqueConstraint(
+                fields=("country", "region"),
+                name="unique_region_country",
+            )
+        ]
+
+
+class EventLocationAbstract(models.Model):
+    """
+    Нормализованная строка (event_id, country, region) для поля locations события.
+    Строки пишутся триггерами базы при любой записи в таблицу событий,
+    поэтому из приложения таблицы только читаются.
+    """
+    country = models.TextField(null=False)
+    region = models.TextField(blank=True, null=False)
+
+    class Meta:
+        abstract = True
+
+
+class TradeEventLocation(EventLocationAbstract):
+    event = models.ForeignKey(
+        TradeEvent,
+        on_delete=models.DO_NOTHING,
+        db_constraint=False,
+        related_name="location_rows",
+    )
+
+    class Meta:
+        managed = True
+        db_table = "trade_news_events_locations"
+        indexes = [
+            models.Index(fields=("region", "event"), name="events_loc_region_idx"),
+            models.Index(fields=("country", "event"), name="events_loc_country_idx"),
+        ]
+
+
+class TradeEventForApprovalLocation(EventLocationAbstract):
+    event = models.ForeignKey(
+        TradeEventForApproval,
+        on_delete=models.DO_NOTHING,
+        db_constraint=False,
+        related_name="location_rows",
+    )
+
+    class Meta:
+        managed = True
+        db_table = "trade_news_for_approval_locations"
+        indexes = [
+            models.Index(fields=("region", "event"), name="approval_loc_region_idx"),
+            models.Index(fields=("country", "event"), name="approval_loc_country_idx"),
+        ]
+
+
+class TradeEventRelevantLocation(EventLocationAbstract):
+    event = models.ForeignKey(
+        TradeEventRelevant,
+        on_delete=models.DO_NOTHING,
+        db_constraint=False,
+        related_name="location_rows",
+    )
+
+    class Meta:
+        managed = True
+        db_table = "trade_news_relevant_locations"
+        indexes = [
+            models.Index(fields=("region", "event"), name="relevant_loc_region_idx"),
+            models.Index(fields=("country", "event"), name="relevant_loc_country_idx"),
+        ]
+
+
+# таблица событий -> таблица её локаций
+EVENT_LOCATION_MODELS = {
+    TradeEvent: TradeEventLocation,
+    TradeEventForApproval: TradeEventForApprovalLocation,
+    TradeEventRelevant: TradeEventRelevantLocation,
+}
+
+
+class TradeTableVersion(models.Model):
+    """
+    Счётчик изменений таблицы событий. Увеличивается триггером базы
+    при фиксации транзакции записи в таблицу (см. newsfeedner/sql/0005_table_versions.sql).
+    Используется как часть ключа кэша ответов.
+    """
+    table_name = models.TextField(primary_key=True)
+    version = models.BigIntegerField(default=0)
+
+    class Meta:
+        managed = True
+        db_table = "trade_news_table_versions"
+
+
+class TradeFilterSnapshot(models.Model):
+    """
+    Готовое тело ответа фильтра (api_raw/get_*, api/get_*) для версии таблицы событий:
+    JSON и, если включено, он же в gzip. Строится одним процессом, читается всеми воркерами.
+    """
+    table_name = models.TextField()
+    slug = models.TextField()
+    version = models.BigIntegerField()
+    # формат тел и версия справочников, с которыми снимок построен (снимок другой сборки не читается)
+    format_version = models.IntegerField(default=0)
+    lexicon_version = models.TextField(default="")
+    body = models.BinaryField()
+    body_gzip = models.BinaryField(null=True)
+
+    class Meta:
+        managed = True
+        db_table = "trade_news_filter_snapshots"
+        unique_together = (("table_name", "slug"),)
+
+
+class TradeFacetDay(models.Model):
+    """
+    Дневная сводка таблицы событий для фильтров: число событий за день с отношением relation,
+    локацией country и кодом СМТК code (элементы classes, locations и smtk_codes как есть).
+    Поддерживается триггерами базы (см. newsfeedner/sql), фильтры за период считаются по ней,
+    а не по таблице событий.
+    """
+    table_name = models.TextField()
+    event_date = models.DateField()
+    relation = models.TextField()
+    country = models.TextField()
+    code = models.TextField()
+    events = models.IntegerField(default=0)
+
+    class Meta:
+        managed = True
+        db_table = "trade_news_facet_days"
+        unique_together = (("table_name", "event_date", "relation", "country", "code"),)
+
+
+class TradeNormalForm(models.Model):
+    """
+    Нормальная форма pymorphy2 для словоформы локации (кэш разбора, см. utils/normal_forms.py).
+    """
+    word = models.TextField(primary_key=True)
+    normal_form = models.TextField()
+
+    class Meta:
+        managed = True
+        db_table = "trade_news_normal_forms"
+
+
 class TradeEditStatus(models.Model):
     id = models.UUIDField(null=False, primary_key=True)
     user = models.TextField(null=False)
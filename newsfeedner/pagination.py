@@ -0,0 +1,129 @@
+import json
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from collections import OrderedDict
+from math import ceil
+
+from django.db import connection
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import replace_query_param
+
+
+def get_estimated_count(queryset) -> int:
+    """
+    Возвращает оценку числа строк queryset по плану запроса (EXPLAIN) без выполнения COUNT(*).
+    """
+    sql, params = queryset.query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute("EXPLAIN (FORMAT JSON) " + sql, params)
+        plan = cursor.fetchone()[0]
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]["Plan"]["Plan Rows"])
+
+
+class EventCursorPagination(BasePagination):
+    """
+    Keyset-пагинация по набору полей (по умолчанию ("-event_date", "-id"),
+    при поиске q - ("-rank", "-event_date", "-id")).
+    Вместо OFFSET страница выбирается условием "строго после/до позиции курсора",
+    поэтому стоимость любой страницы равна стоимости первой.
+    Курсор - base64 от [значения полей порядка..., направление].
+    """
+
+    cursor_query_param = "cursor"
+    approx_count_query_param = "approx_count"
+    page_size = api_settings.PAGE_SIZE
+    ordering = ("-event_date", "-id")
+    invalid_cursor_message = "Invalid cursor"
+
+    def encode_cursor(self, obj, reverse):
+        position = [str(getattr(obj, field.lstrip("-"))) for field in self.ordering]
+        token = json.dumps(position + [int(reverse)]).encode("utf-8")
+        token = urlsafe_b64encode(token).decode("ascii")
+        return replace_query_param(self.base_url, self.cursor_query_param, token)
+
+    def decode_cursor(self, request):
+        token = request.query_params.get(self.cursor_query_param)
+        if not token:
+            return None, False
+        try:
+            *position, reverse = json.loads(urlsafe_b64decode(token.encode("ascii")))
+        except (TypeError, ValueError):
+            raise NotFound(self.invalid_cursor_message)
+        if len(position) != len(self.ordering):
+            raise NotFound(self.invalid_cursor_message)
+        return position, bool(reverse)
+
+    def get_keyset_filter(self, position, reverse):
+        """
+        Условие "строка строго после позиции" для порядка (a, b, ...):
+        a < x or (a = x and b < y) or ...
+        Условие a <= x выносится отдельно, чтобы оно попадало в Index Cond.
+        """
+        fields = [field.lstrip("-") for field in self.ordering]
+        descending = self.ordering[0].startswith("-") != reverse
+        lookup, strict = ("lte", "lt") if descending else ("gte", "gt")
+        after = Q()
+        for i, (field, value) in enumerate(zip(fields, position)):
+            equal = dict(zip(fields[:i], position[:i]))
+            after |= Q(**equal, **{f"{field}__{strict}": value})
+        return Q(**{f"{fields[0]}__{lookup}": position[0]}) & after
+
+    def get_ordering(self, reverse):
+        if not reverse:
+            return self.ordering
+        return tuple(f[1:] if f.startswith("-") else "-" + f for f in self.ordering)
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.ordering = getattr(view, "cursor_ordering", self.ordering)
+        self.base_url = request.build_absolute_uri()
+        self.estimated_count = None
+        if request.query_params.get(self.approx_count_query_param):
+            self.estimated_count = get_estimated_count(queryset)
+
+        position, reverse = self.decode_cursor(request)
+        queryset = queryset.order_by(*self.get_ordering(reverse))
+        if position is not None:
+            queryset = queryset.filter(self.get_keyset_filter(position, reverse))
+
+        results = list(queryset[:self.page_size + 1])
+        has_more = len(results) > self.page_size
+        results = results[:self.page_size]
+        if reverse:
+            results.reverse()
+
+        # при движении назад "ещё" есть в сторону предыдущих страниц
+        self.has_next = has_more if not reverse else True
+        self.has_previous = (position is not None) if not reverse else has_more
+        self.page = results
+        return results
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        return self.encode_cursor(self.page[-1], reverse=False)
+
+    def get_previous_link(self):
+        if not self.has_previous or not self.page:
+            return None
+        return self.encode_cursor(self.page[0], reverse=True)
+
+    def get_paginated_response(self, data):
+        count = None
+        if self.estimated_count is not None:
+            # как и в постраничном режиме count - число страниц
+            count = ceil(self.estimated_count / self.page_size)
+        return Response(
+            OrderedDict(
+                [
+                    ("count", count),
+                    ("next", self.get_next_link()),
+                    ("previous", self.get_previous_link()),
+                    ("results", data),
+                ]
+            )
+        )
@@ -10,10 +10,22 @@ from newsfeedner.models import (
     TradeEventForApproval,
     TradeNewsEmbeddings,
 )
-from newsfeedner.utils.trade_utils import (
-    relations,
-    smtk_product_all,
-    countries_and_regions,
+from newsfeedner.utils.lexicon import LEXICON
+from newsfeedner.utils.trade_utils import relations
+
+# служебные столбцы таблиц событий, которые заполняются базой и не отдаются в API
+INTERNAL_EVENT_READ_FIELDS = (
+    "smtk_codes",
+    "event_date",
+    "title_tsv",
+    "classes_text",
+)
+# при записи не принимаются и производные поля: они считаются при записи (utils/derived_fields.py),
+# в ответах locations_normalized и abstract отдаются только для чтения
+INTERNAL_EVENT_FIELDS = (
+    *INTERNAL_EVENT_READ_FIELDS,
+    "locations_normalized",
+    "abstract",
 )
 
 
@@ -30,7 +42,7 @@ class EventSerializerWrite(serializers.ModelSerializer):
 
     class Meta:
         model = TradeEvent
-        fields = "__all__"
+        exclude = INTERNAL_EVENT_FIELDS
 
 class ItemsClasseSerializer(serializers.Serializer):
     relaton:  serializers.CharField()
@@ -59,7 +71,7 @@ class EventSerializerRead(serializers.ModelSerializer):
 
     class Meta:
         model = TradeEvent
-        fields = "__all__"
+        exclude = INTERNAL_EVENT_READ_FIELDS
 
 
 class EventSerializerWrite(serializers.ModelSerializer):
@@ -75,7 +87,7 @@ class EventSerializerWrite(serializers.ModelSerializer):
 
     class Meta:
         model = TradeEvent
-        fields = "__all__"
+        exclude = INTERNAL_EVENT_FIELDS
 
 
 class EventApprovalSerializerRead(serializers.ModelSerializer):
@@ -104,7 +116,7 @@ class EventApprovalSerializerRead(serializers.ModelSerializer):
 
     class Meta:
         model = TradeEventForApproval
-        fields = "__all__"
+        exclude = INTERNAL_EVENT_READ_FIELDS
 
 
 class EventApprovalSerializerWrite(serializers.ModelSerializer):
@@ -135,7 +147,7 @@ class EventApprovalSerializerWrite(serializers.ModelSerializer):
     def check_itc_codes(self, itc_codes):
         itc_codes = itc_codes.split(";; ")
         for code in itc_codes:
-            if code not in smtk_product_all:
+            if code not in LEXICON.smtk_product_set:
                 raise serializers.ValidationError({
                     "itc_codes":
                     f"'{code}' code is wrong. Check if it is written correctly"
@@ -167,7 +179,7 @@ class EventApprovalSerializerWrite(serializers.ModelSerializer):
         for loc in locations:
             if "Страны" in loc and "Персид" not in loc:
                 loc = loc.replace("Разные ", "")
-            if loc not in countries_and_regions:
+            if loc not in LEXICON.countries_and_regions:
                 raise serializers.ValidationError({
                     "locations":
                     f" Location name '{loc}' is wrong. Check if it exists"
@@ -211,7 +223,7 @@ class EventApprovalSerializerWrite(serializers.ModelSerializer):
 
     class Meta:
         model = TradeEventForApproval
-        exclude = ("status", )
+        exclude = ("status", *INTERNAL_EVENT_FIELDS)
 
 
 class EventApprovalSerializerWriteStatus(serializers.ModelSerializer):
@@ -249,7 +261,7 @@ class EventRelevantSerializerWrite(serializers.ModelSerializer):
     def check_itc_codes(self, itc_codes):
         itc_codes = itc_codes.split(";; ")
         for code in itc_codes:
-            if code not in smtk_product_all:
+            if code not in LEXICON.smtk_product_set:
                 raise serializers.ValidationError({
                     "itc_codes":
                     f"'{code}' code is wrong. Check if it is written correctly"
@@ -280,7 +292,7 @@ class EventRelevantSerializerWrite(serializers.ModelSerializer):
         for loc in locations:
             if "Страны" in loc and "Персид" not in loc:
                 loc = loc.replace("Разные ", "")
-            if loc not in countries_and_regions:
+            if loc not in LEXICON.countries_and_regions:
                 raise serializers.ValidationError({
                     "locations":
                     f" Location name '{loc}' is wrong. Check if it exists"
@@ -332,7 +344,7 @@ class EventRelevantSerializerWrite(serializers.ModelSerializer):
 
     class Meta:
         model = TradeEventRelevant
-        exclude = ("to_delete", )
+        exclude = ("to_delete", *INTERNAL_EVENT_FIELDS)
 
 
 class EventRelevantSerializerRead(serializers.ModelSerializer):
@@ -363,7 +375,7 @@ class EventRelevantSerializerRead(serializers.ModelSerializer):
 
     class Meta:
         model = TradeEventRelevant
-        exclude = ("to_delete", )
+        exclude = ("to_delete", *INTERNAL_EVENT_READ_FIELDS)
 
 
 class BinaryVectorSerializer:
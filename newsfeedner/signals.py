@@ -0,0 +1,48 @@
+from django.db.models.signals import post_init, pre_save
+from django.dispatch import receiver
+
+from newsfeedner.models import TradeEvent, TradeEventForApproval, TradeEventRelevant
+from newsfeedner.utils.derived_fields import DERIVED_FIELDS, DERIVED_SOURCE_FIELDS, set_derived_fields
+
+
+def get_derived_source(instance):
+    """
+    Значения исходных полей производных (списки - копией) или None, если какое-то из них не загружено.
+    """
+    values = instance.__dict__
+    if not all(name in values for name in DERIVED_SOURCE_FIELDS):
+        return None
+    return tuple(
+        list(values[name]) if isinstance(values[name], list) else values[name] for name in DERIVED_SOURCE_FIELDS
+    )
+
+
+@receiver(post_init, sender=TradeEvent)
+@receiver(post_init, sender=TradeEventForApproval)
+@receiver(post_init, sender=TradeEventRelevant)
+def remember_derived_source(sender, instance, **kwargs):
+    # исходные поля в том виде, в каком они загружены из базы
+    instance._derived_source = get_derived_source(instance)
+
+
+@receiver(pre_save, sender=TradeEvent)
+@receiver(pre_save, sender=TradeEventForApproval)
+@receiver(pre_save, sender=TradeEventRelevant)
+def fill_event_derived_fields(sender, instance, update_fields=None, **kwargs):
+    """
+    Производные поля события считаются при записи через save(), если это новое событие,
+    изменились classes, locations или title или производные поля ещё не посчитаны.
+    bulk_create сигнал не вызывает - там set_derived_fields вызывается явно.
+    """
+    if update_fields is not None and not set(update_fields) & set(DERIVED_SOURCE_FIELDS):
+        return
+    source = get_derived_source(instance)
+    if (
+        not instance._state.adding
+        and source is not None
+        and source == instance._derived_source
+        and all(instance.__dict__.get(name) is not None for name in DERIVED_FIELDS)
+    ):
+        return
+    set_derived_fields([instance])
+    instance._derived_source = get_derived_source(instance)
@@ -0,0 +1,74 @@
+-- Таблицы локаций событий (event_id, country, region).
+-- Заполняются триггерами при любой записи в таблицы событий,
+-- в том числе при записи в trade_news_events внешним сервисом.
+
+CREATE OR REPLACE FUNCTION trade_news_location_rows(locations text)
+RETURNS TABLE (country text, region text)
+LANGUAGE sql STABLE AS $$
+    SELECT loc.country, coalesce(m.region, '')
+    FROM (
+        SELECT DISTINCT btrim(token) AS country
+        FROM unnest(string_to_array(locations, ', ')) AS token
+    ) AS loc
+    LEFT JOIN trade_news_region_countries AS m ON m.country = loc.country
+    WHERE loc.country <> ''
+$$;
+
+CREATE OR REPLACE FUNCTION trade_news_sync_locations()
+RETURNS trigger
+LANGUAGE plpgsql AS $$
+BEGIN
+    -- TG_ARGV[0] - таблица локаций для таблицы событий, на которой висит триггер
+    IF TG_OP <> 'INSERT' THEN
+        EXECUTE format('DELETE FROM %I WHERE event_id = $1', TG_ARGV[0]) USING OLD.id;
+    END IF;
+    IF TG_OP <> 'DELETE' THEN
+        EXECUTE format(
+            'INSERT INTO %I (event_id, country, region) '
+            'SELECT $1, country, region FROM trade_news_location_rows($2)',
+            TG_ARGV[0]
+        ) USING NEW.id, NEW.locations;
+    END IF;
+    RETURN NULL;
+END
+$$;
+
+DROP TRIGGER IF EXISTS trade_news_events_locations_sync ON trade_news_events;
+CREATE TRIGGER trade_news_events_locations_sync
+    AFTER INSERT OR DELETE OR UPDATE OF id, locations ON trade_news_events
+    FOR EACH ROW EXECUTE FUNCTION trade_news_sync_locations('trade_news_events_locations');
+
+DROP TRIGGER IF EXISTS trade_news_for_approval_locations_sync ON trade_news_for_approval;
+CREATE TRIGGER trade_news_for_approval_locations_sync
+    AFTER INSERT OR DELETE OR UPDATE OF id, locations ON trade_news_for_approval
+    FOR EACH ROW EXECUTE FUNCTION trade_news_sync_locations('trade_news_for_approval_locations');
+
+DROP TRIGGER IF EXISTS trade_news_relevant_locations_sync ON trade_news_relevant;
+CREATE TRIGGER trade_news_relevant_locations_sync
+    AFTER INSERT OR DELETE OR UPDATE OF id, locations ON trade_news_relevant
+    FOR EACH ROW EXECUTE FUNCTION trade_news_sync_locations('trade_news_relevant_locations');
+
+-- заполнение для строк, записанных до появления триггеров
+INSERT INTO trade_news_events_locations (event_id, country, region)
+SELECT e.id, r.country, r.region
+FROM trade_news_events AS e
+CROSS JOIN LATERAL trade_news_location_rows(e.locations) AS r
+WHERE NOT EXISTS (
+    SELECT 1 FROM trade_news_events_locations AS l WHERE l.event_id = e.id
+);
+
+INSERT INTO trade_news_for_approval_locations (event_id, country, region)
+SELECT e.id, r.country, r.region
+FROM trade_news_for_approval AS e
+CROSS JOIN LATERAL trade_news_location_rows(e.locations) AS r
+WHERE NOT EXISTS (
+    SELECT 1 FROM trade_news_for_approval_locations AS l WHERE l.event_id = e.id
+);
+
+INSERT INTO trade_news_relevant_locations (event_id, country, region)
+SELECT e.id, r.country, r.region
+FROM trade_news_relevant AS e
+CROSS JOIN LATERAL trade_news_location_rows(e.locations) AS r
+WHERE NOT EXISTS (
+    SELECT 1 FROM trade_news_relevant_locations AS l WHERE l.event_id = e.id
+);
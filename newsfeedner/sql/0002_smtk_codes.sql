@@ -0,0 +1,54 @@
+-- Коды СМТК в виде массива text[] с GIN-индексом.
+-- Текстовое поле itc_codes (коды через ";; ") остаётся как есть,
+-- smtk_codes заполняется из него триггером при каждой записи.
+
+CREATE OR REPLACE FUNCTION trade_news_split_itc_codes(itc_codes text)
+RETURNS text[]
+LANGUAGE sql IMMUTABLE AS $$
+    SELECT coalesce(array_agg(DISTINCT btrim(code)), '{}')
+    FROM unnest(string_to_array(itc_codes, ';; ')) AS code
+    WHERE btrim(code) <> ''
+$$;
+
+CREATE OR REPLACE FUNCTION trade_news_sync_smtk_codes()
+RETURNS trigger
+LANGUAGE plpgsql AS $$
+BEGIN
+    NEW.smtk_codes := trade_news_split_itc_codes(NEW.itc_codes);
+    RETURN NEW;
+END
+$$;
+
+ALTER TABLE trade_news_events ADD COLUMN IF NOT EXISTS smtk_codes text[] NOT NULL DEFAULT '{}';
+ALTER TABLE trade_news_for_approval ADD COLUMN IF NOT EXISTS smtk_codes text[] NOT NULL DEFAULT '{}';
+ALTER TABLE trade_news_relevant ADD COLUMN IF NOT EXISTS smtk_codes text[] NOT NULL DEFAULT '{}';
+
+DROP TRIGGER IF EXISTS trade_news_events_smtk_codes_sync ON trade_news_events;
+CREATE TRIGGER trade_news_events_smtk_codes_sync
+    BEFORE INSERT OR UPDATE OF itc_codes, smtk_codes ON trade_news_events
+    FOR EACH ROW EXECUTE FUNCTION trade_news_sync_smtk_codes();
+
+DROP TRIGGER IF EXISTS trade_news_for_approval_smtk_codes_sync ON trade_news_for_approval;
+CREATE TRIGGER trade_news_for_approval_smtk_codes_sync
+    BEFORE INSERT OR UPDATE OF itc_codes, smtk_codes ON trade_news_for_approval
+    FOR EACH ROW EXECUTE FUNCTION trade_news_sync_smtk_codes();
+
+DROP TRIGGER IF EXISTS trade_news_relevant_smtk_codes_sync ON trade_news_relevant;
+CREATE TRIGGER trade_news_relevant_smtk_codes_sync
+    BEFORE INSERT OR UPDATE OF itc_codes, smtk_codes ON trade_news_relevant
+    FOR EACH ROW EXECUTE FUNCTION trade_news_sync_smtk_codes();
+
+-- заполнение для строк, записанных до появления триггеров
+UPDATE trade_news_events SET itc_codes = itc_codes
+WHERE smtk_codes = '{}' AND itc_codes <> '';
+UPDATE trade_news_for_approval SET itc_codes = itc_codes
+WHERE smtk_codes = '{}' AND itc_codes <> '';
+UPDATE trade_news_relevant SET itc_codes = itc_codes
+WHERE smtk_codes = '{}' AND itc_codes <> '';
+
+CREATE INDEX IF NOT EXISTS trade_news_events_smtk_codes_gin
+    ON trade_news_events USING gin (smtk_codes);
+CREATE INDEX IF NOT EXISTS trade_news_for_approval_smtk_codes_gin
+    ON trade_news_for_approval USING gin (smtk_codes);
+CREATE INDEX IF NOT EXISTS trade_news_relevant_smtk_codes_gin
+    ON trade_news_relevant USING gin (smtk_codes);
@@ -0,0 +1,65 @@
+-- Дата события event_date (date) с btree-индексом.
+-- Текстовое поле dates остаётся как есть и отдаётся в API,
+-- event_date заполняется из него триггером при каждой записи.
+
+CREATE OR REPLACE FUNCTION trade_news_parse_event_date(dates text)
+RETURNS date
+LANGUAGE plpgsql IMMUTABLE AS $$
+BEGIN
+    IF dates !~ '^\d{4}-\d{2}-\d{2}' THEN
+        RETURN NULL;
+    END IF;
+    RETURN to_date(substr(dates, 1, 10), 'YYYY-MM-DD');
+EXCEPTION WHEN others THEN
+    RETURN NULL;
+END
+$$;
+
+CREATE OR REPLACE FUNCTION trade_news_sync_event_date()
+RETURNS trigger
+LANGUAGE plpgsql AS $$
+BEGIN
+    NEW.event_date := trade_news_parse_event_date(NEW.dates);
+    RETURN NEW;
+END
+$$;
+
+ALTER TABLE trade_news_events ADD COLUMN IF NOT EXISTS event_date date;
+ALTER TABLE trade_news_for_approval ADD COLUMN IF NOT EXISTS event_date date;
+ALTER TABLE trade_news_relevant ADD COLUMN IF NOT EXISTS event_date date;
+
+DROP TRIGGER IF EXISTS trade_news_events_event_date_sync ON trade_news_events;
+CREATE TRIGGER trade_news_events_event_date_sync
+    BEFORE INSERT OR UPDATE OF dates, event_date ON trade_news_events
+    FOR EACH ROW EXECUTE FUNCTION trade_news_sync_event_date();
+
+DROP TRIGGER IF EXISTS trade_news_for_approval_event_date_sync ON trade_news_for_approval;
+CREATE TRIGGER trade_news_for_approval_event_date_sync
+    BEFORE INSERT OR UPDATE OF dates, event_date ON trade_news_for_approval
+    FOR EACH ROW EXECUTE FUNCTION trade_news_sync_event_date();
+
+DROP TRIGGER IF EXISTS trade_news_relevant_event_date_sync ON trade_news_relevant;
+CREATE TRIGGER trade_news_relevant_event_date_sync
+    BEFORE INSERT OR UPDATE OF dates, event_date ON trade_news_relevant
+    FOR EACH ROW EXECUTE FUNCTION trade_news_sync_event_date();
+
+-- заполнение для строк, записанных до появления триггеров
+UPDATE trade_news_events SET dates = dates
+WHERE event_date IS NULL AND dates ~ '^\d{4}-\d{2}-\d{2}';
+UPDATE trade_news_for_approval SET dates = dates
+WHERE event_date IS NULL AND dates ~ '^\d{4}-\d{2}-\d{2}';
+UPDATE trade_news_relevant SET dates = dates
+WHERE event_date IS NULL AND dates ~ '^\d{4}-\d{2}-\d{2}';
+
+-- фильтр по диапазону дат, сортировка и keyset-пагинация (см. newsfeedner/pagination.py)
+CREATE INDEX IF NOT EXISTS trade_news_events_event_date_id_idx
+    ON trade_news_events (event_date DESC, id DESC);
+CREATE INDEX IF NOT EXISTS trade_news_for_approval_event_date_id_idx
+    ON trade_news_for_approval (event_date DESC, id DESC);
+CREATE INDEX IF NOT EXISTS trade_news_relevant_event_date_id_idx
+    ON trade_news_relevant (event_date DESC, id DESC);
+
+-- индексы по текстовому dates больше не используются
+DROP INDEX IF EXISTS trade_news_events_dates_id_idx;
+DROP INDEX IF EXISTS trade_news_for_approval_dates_id_idx;
+DROP INDEX IF EXISTS trade_news_relevant_dates_id_idx;
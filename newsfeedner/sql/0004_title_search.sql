@@ -0,0 +1,42 @@
+-- Полнотекстовый поиск по заголовку: столбец title_tsv (tsvector, конфигурация russian)
+-- с GIN-индексом, заполняется триггером при каждой записи title.
+
+CREATE OR REPLACE FUNCTION trade_news_sync_title_tsv()
+RETURNS trigger
+LANGUAGE plpgsql AS $$
+BEGIN
+    NEW.title_tsv := to_tsvector('russian', coalesce(NEW.title, ''));
+    RETURN NEW;
+END
+$$;
+
+ALTER TABLE trade_news_events ADD COLUMN IF NOT EXISTS title_tsv tsvector;
+ALTER TABLE trade_news_for_approval ADD COLUMN IF NOT EXISTS title_tsv tsvector;
+ALTER TABLE trade_news_relevant ADD COLUMN IF NOT EXISTS title_tsv tsvector;
+
+DROP TRIGGER IF EXISTS trade_news_events_title_tsv_sync ON trade_news_events;
+CREATE TRIGGER trade_news_events_title_tsv_sync
+    BEFORE INSERT OR UPDATE OF title, title_tsv ON trade_news_events
+    FOR EACH ROW EXECUTE FUNCTION trade_news_sync_title_tsv();
+
+DROP TRIGGER IF EXISTS trade_news_for_approval_title_tsv_sync ON trade_news_for_approval;
+CREATE TRIGGER trade_news_for_approval_title_tsv_sync
+    BEFORE INSERT OR UPDATE OF title, title_tsv ON trade_news_for_approval
+    FOR EACH ROW EXECUTE FUNCTION trade_news_sync_title_tsv();
+
+DROP TRIGGER IF EXISTS trade_news_relevant_title_tsv_sync ON trade_news_relevant;
+CREATE TRIGGER trade_news_relevant_title_tsv_sync
+    BEFORE INSERT OR UPDATE OF title, title_tsv ON trade_news_relevant
+    FOR EACH ROW EXECUTE FUNCTION trade_news_sync_title_tsv();
+
+-- заполнение для строк, записанных до появления триггеров
+UPDATE trade_news_events SET title = title WHERE title_tsv IS NULL;
+UPDATE trade_news_for_approval SET title = title WHERE title_tsv IS NULL;
+UPDATE trade_news_relevant SET title = title WHERE title_tsv IS NULL;
+
+CREATE INDEX IF NOT EXISTS trade_news_events_title_tsv_gin
+    ON trade_news_events USING gin (title_tsv);
+CREATE INDEX IF NOT EXISTS trade_news_for_approval_title_tsv_gin
+    ON trade_news_for_approval USING gin (title_tsv);
+CREATE INDEX IF NOT EXISTS trade_news_relevant_title_tsv_gin
+    ON trade_news_relevant USING gin (title_tsv);
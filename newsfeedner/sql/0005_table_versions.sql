@@ -0,0 +1,94 @@
+-- Счётчики изменений таблиц событий (trade_news_table_versions).
+-- Увеличиваются при фиксации транзакции записи, поэтому новая версия видна читателям
+-- одновременно с новыми данными.
+-- Оператор записи только отмечает транзакцию (вставка в trade_news_table_version_bumps, без блокировок),
+-- строка счётчика обновляется отложенным триггером непосредственно перед фиксацией:
+-- её блокировка держится только на время фиксации, а не всей транзакции, и параллельные
+-- транзакции записи (загрузчик, пакетные endpoint'ы, команды досчёта) не ждут друг друга.
+
+-- отметки незафиксированных транзакций, таблица всегда пуста для остальных сеансов
+CREATE UNLOGGED TABLE IF NOT EXISTS trade_news_table_version_bumps (
+    table_name text NOT NULL
+);
+
+-- отмечает транзакцию для счётчика name (имя таблицы или другой ключ trade_news_table_versions)
+CREATE OR REPLACE FUNCTION trade_news_mark_version(name text)
+RETURNS void
+LANGUAGE plpgsql AS $$
+BEGIN
+    -- одна отметка на счётчик за транзакцию (настройка действует до конца транзакции)
+    IF current_setting('trade_news.version_bump.' || name, true) IS DISTINCT FROM 'on' THEN
+        PERFORM set_config('trade_news.version_bump.' || name, 'on', true);
+        INSERT INTO trade_news_table_version_bumps (table_name) VALUES (name);
+    END IF;
+END
+$$;
+
+CREATE OR REPLACE FUNCTION trade_news_bump_table_version()
+RETURNS trigger
+LANGUAGE plpgsql AS $$
+BEGIN
+    PERFORM trade_news_mark_version(TG_TABLE_NAME);
+    RETURN NULL;
+END
+$$;
+
+CREATE OR REPLACE FUNCTION trade_news_apply_table_version_bump()
+RETURNS trigger
+LANGUAGE plpgsql AS $$
+BEGIN
+    INSERT INTO trade_news_table_versions (table_name, version)
+    VALUES (NEW.table_name, 1)
+    ON CONFLICT (table_name) DO UPDATE
+    SET version = trade_news_table_versions.version + 1;
+    -- отметки других транзакций этому сеансу не видны
+    DELETE FROM trade_news_table_version_bumps WHERE table_name = NEW.table_name;
+    RETURN NULL;
+END
+$$;
+
+-- создаётся один раз: в транзакции применения схемы уже могут быть отложенные вызовы этого триггера
+DO $$
+BEGIN
+    IF NOT EXISTS (
+        SELECT 1 FROM pg_trigger
+        WHERE tgname = 'trade_news_table_version_bumps_apply'
+            AND tgrelid = 'trade_news_table_version_bumps'::regclass
+    ) THEN
+        CREATE CONSTRAINT TRIGGER trade_news_table_version_bumps_apply
+            AFTER INSERT ON trade_news_table_version_bumps
+            DEFERRABLE INITIALLY DEFERRED
+            FOR EACH ROW EXECUTE FUNCTION trade_news_apply_table_version_bump();
+    END IF;
+END
+$$;
+
+-- UPDATE учитывается только по столбцам, которые видны в API (в ответах, фильтрах, поиске и сортировке):
+-- запись одного classes_text (0007) версию не меняет
+INSERT INTO trade_news_table_versions (table_name, version)
+VALUES ('trade_news_events', 0), ('trade_news_for_approval', 0), ('trade_news_relevant', 0)
+ON CONFLICT (table_name) DO NOTHING;
+
+DROP TRIGGER IF EXISTS trade_news_events_version_bump ON trade_news_events;
+CREATE TRIGGER trade_news_events_version_bump
+    AFTER INSERT OR DELETE OR TRUNCATE OR UPDATE OF
+        id, classes, itc_codes, smtk_codes, locations, product, title, title_tsv, url, dates, event_date,
+        locations_normalized, abstract, article_ids, status
+    ON trade_news_events
+    FOR EACH STATEMENT EXECUTE FUNCTION trade_news_bump_table_version();
+
+DROP TRIGGER IF EXISTS trade_news_for_approval_version_bump ON trade_news_for_approval;
+CREATE TRIGGER trade_news_for_approval_version_bump
+    AFTER INSERT OR DELETE OR TRUNCATE OR UPDATE OF
+        id, classes, itc_codes, smtk_codes, locations, product, title, title_tsv, url, dates, event_date,
+        locations_normalized, abstract, article_ids, status, user_checked, date_checked
+    ON trade_news_for_approval
+    FOR EACH STATEMENT EXECUTE FUNCTION trade_news_bump_table_version();
+
+DROP TRIGGER IF EXISTS trade_news_relevant_version_bump ON trade_news_relevant;
+CREATE TRIGGER trade_news_relevant_version_bump
+    AFTER INSERT OR DELETE OR TRUNCATE OR UPDATE OF
+        id, classes, itc_codes, smtk_codes, locations, product, title, title_tsv, url, dates, event_date,
+        locations_normalized, abstract, article_ids, user_checked, date_checked, user_approved, date_approved, to_delete
+    ON trade_news_relevant
+    FOR EACH STATEMENT EXECUTE FUNCTION trade_news_bump_table_version();
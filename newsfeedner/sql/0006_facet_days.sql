@@ -0,0 +1,156 @@
+-- Дневная сводка таблиц событий для фильтров за период (trade_news_facet_days):
+-- (таблица, день, отношение, локация, код СМТК) -> число событий.
+-- Поддерживается триггерами на уровне оператора по таблицам переходов (old_rows/new_rows),
+-- поэтому пачка записей - один пересчёт сводки.
+-- Если сводка изменилась, при фиксации увеличивается счётчик '<таблица>_facet_days'
+-- в trade_news_table_versions (см. 0005): по нему кэшируются фильтры за период.
+
+-- текст запроса сочетаний по строкам событий из source (каждое событие учитывается один раз)
+CREATE OR REPLACE FUNCTION trade_news_facet_day_rows_sql(source text)
+RETURNS text
+LANGUAGE sql IMMUTABLE AS $$
+    SELECT format(
+        'SELECT t.event_date, t.relation, t.country, t.code, count(*) AS events '
+        'FROM ('
+        '    SELECT DISTINCT e.id, e.event_date, r.relation, l.country, c.code '
+        '    FROM (%s) AS e '
+        '    CROSS JOIN LATERAL unnest(e.classes) AS r(relation) '
+        '    CROSS JOIN LATERAL unnest(string_to_array(e.locations, '', '')) AS l(country) '
+        '    CROSS JOIN LATERAL unnest(e.smtk_codes) AS c(code) '
+        '    WHERE e.event_date IS NOT NULL AND r.relation IS NOT NULL '
+        '        AND l.country IS NOT NULL AND c.code IS NOT NULL'
+        ') AS t '
+        'GROUP BY 1, 2, 3, 4 '
+        'ORDER BY 1, 2, 3, 4',
+        source
+    )
+$$;
+
+CREATE OR REPLACE FUNCTION trade_news_sync_facet_days()
+RETURNS trigger
+LANGUAGE plpgsql AS $$
+DECLARE
+    changed text := '(o.classes, o.locations, o.smtk_codes, o.event_date) '
+                    'IS DISTINCT FROM (n.classes, n.locations, n.smtk_codes, n.event_date)';
+    old_source text;
+    new_source text;
+    has_changes boolean;
+    changed_rows bigint := 0;
+    inserted_rows bigint;
+    emptied_dates date[];
+    emptied_relations text[];
+    emptied_countries text[];
+    emptied_codes text[];
+BEGIN
+    IF TG_OP = 'TRUNCATE' THEN
+        DELETE FROM trade_news_facet_days WHERE table_name = TG_TABLE_NAME;
+        PERFORM trade_news_mark_version(TG_TABLE_NAME || '_facet_days');
+        RETURN NULL;
+    ELSIF TG_OP = 'INSERT' THEN
+        new_source := 'SELECT * FROM new_rows';
+    ELSIF TG_OP = 'DELETE' THEN
+        old_source := 'SELECT * FROM old_rows';
+    ELSE
+        -- UPDATE без изменений полей фильтров (статус, производные поля) сводку не трогает
+        EXECUTE 'SELECT EXISTS (SELECT 1 FROM old_rows AS o FULL JOIN new_rows AS n ON n.id = o.id '
+                'WHERE o.id IS NULL OR n.id IS NULL OR ' || changed || ')'
+            INTO has_changes;
+        IF NOT has_changes THEN
+            RETURN NULL;
+        END IF;
+        -- в сводку попадают только строки с изменёнными полями фильтров
+        old_source := 'SELECT o.* FROM old_rows AS o LEFT JOIN new_rows AS n ON n.id = o.id '
+                      'WHERE n.id IS NULL OR ' || changed;
+        new_source := 'SELECT n.* FROM new_rows AS n LEFT JOIN old_rows AS o ON o.id = n.id '
+                      'WHERE o.id IS NULL OR ' || changed;
+    END IF;
+
+    IF old_source IS NOT NULL THEN
+        -- обнулившиеся ключи удаляются по списку из RETURNING, без прохода по всей сводке таблицы
+        EXECUTE format(
+            'WITH u AS ('
+            '    UPDATE trade_news_facet_days AS f SET events = f.events - d.events FROM (%s) AS d '
+            '    WHERE f.table_name = $1 AND f.event_date = d.event_date AND f.relation = d.relation '
+            '        AND f.country = d.country AND f.code = d.code '
+            '    RETURNING f.event_date, f.relation, f.country, f.code, f.events'
+            ') '
+            'SELECT count(*), array_agg(event_date) FILTER (WHERE events <= 0), '
+            '    array_agg(relation) FILTER (WHERE events <= 0), array_agg(country) FILTER (WHERE events <= 0), '
+            '    array_agg(code) FILTER (WHERE events <= 0) '
+            'FROM u',
+            trade_news_facet_day_rows_sql(old_source)
+        ) INTO changed_rows, emptied_dates, emptied_relations, emptied_countries, emptied_codes USING TG_TABLE_NAME;
+        IF emptied_dates IS NOT NULL THEN
+            DELETE FROM trade_news_facet_days AS f
+            USING unnest(emptied_dates, emptied_relations, emptied_countries, emptied_codes)
+                AS k(event_date, relation, country, code)
+            WHERE f.table_name = TG_TABLE_NAME AND f.event_date = k.event_date AND f.relation = k.relation
+                AND f.country = k.country AND f.code = k.code AND f.events <= 0;
+        END IF;
+    END IF;
+
+    IF new_source IS NOT NULL THEN
+        EXECUTE format(
+            'INSERT INTO trade_news_facet_days AS f (table_name, event_date, relation, country, code, events) '
+            'SELECT $1, d.event_date, d.relation, d.country, d.code, d.events FROM (%s) AS d '
+            'ON CONFLICT (table_name, event_date, relation, country, code) DO UPDATE '
+            'SET events = f.events + EXCLUDED.events',
+            trade_news_facet_day_rows_sql(new_source)
+        ) USING TG_TABLE_NAME;
+        GET DIAGNOSTICS inserted_rows = ROW_COUNT;
+        changed_rows := changed_rows + inserted_rows;
+    END IF;
+
+    IF changed_rows > 0 THEN
+        PERFORM trade_news_mark_version(TG_TABLE_NAME || '_facet_days');
+    END IF;
+    RETURN NULL;
+END
+$$;
+
+-- сводка заполняется по таблице целиком, если её ещё нет; записи в таблицу событий
+-- до конца применения схемы ждут, чтобы ни одна пачка не прошла мимо сводки
+CREATE OR REPLACE FUNCTION trade_news_install_facet_days(events_table text)
+RETURNS void
+LANGUAGE plpgsql AS $$
+BEGIN
+    EXECUTE format('LOCK TABLE %I IN SHARE ROW EXCLUSIVE MODE', events_table);
+
+    EXECUTE format('DROP TRIGGER IF EXISTS %I ON %I', events_table || '_facet_days_insert', events_table);
+    EXECUTE format(
+        'CREATE TRIGGER %I AFTER INSERT ON %I REFERENCING NEW TABLE AS new_rows '
+        'FOR EACH STATEMENT EXECUTE FUNCTION trade_news_sync_facet_days()',
+        events_table || '_facet_days_insert', events_table
+    );
+    EXECUTE format('DROP TRIGGER IF EXISTS %I ON %I', events_table || '_facet_days_update', events_table);
+    EXECUTE format(
+        'CREATE TRIGGER %I AFTER UPDATE ON %I REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows '
+        'FOR EACH STATEMENT EXECUTE FUNCTION trade_news_sync_facet_days()',
+        events_table || '_facet_days_update', events_table
+    );
+    EXECUTE format('DROP TRIGGER IF EXISTS %I ON %I', events_table || '_facet_days_delete', events_table);
+    EXECUTE format(
+        'CREATE TRIGGER %I AFTER DELETE ON %I REFERENCING OLD TABLE AS old_rows '
+        'FOR EACH STATEMENT EXECUTE FUNCTION trade_news_sync_facet_days()',
+        events_table || '_facet_days_delete', events_table
+    );
+    EXECUTE format('DROP TRIGGER IF EXISTS %I ON %I', events_table || '_facet_days_truncate', events_table);
+    EXECUTE format(
+        'CREATE TRIGGER %I AFTER TRUNCATE ON %I '
+        'FOR EACH STATEMENT EXECUTE FUNCTION trade_news_sync_facet_days()',
+        events_table || '_facet_days_truncate', events_table
+    );
+
+    IF NOT EXISTS (SELECT 1 FROM trade_news_facet_days WHERE table_name = events_table) THEN
+        EXECUTE format(
+            'INSERT INTO trade_news_facet_days (table_name, event_date, relation, country, code, events) '
+            'SELECT $1, d.event_date, d.relation, d.country, d.code, d.events FROM (%s) AS d',
+            trade_news_facet_day_rows_sql(format('SELECT * FROM %I', events_table))
+        ) USING events_table;
+    END IF;
+END
+$$;
+
+SELECT trade_news_install_facet_days('trade_news_events');
+SELECT trade_news_install_facet_days('trade_news_for_approval');
+SELECT trade_news_install_facet_days('trade_news_relevant');
@@ -0,0 +1,52 @@
+-- Производные поля событий: classes_text, locations_normalized, abstract.
+-- Считаются в Python (pymorphy2, razdel) при записи через Django и командой fill_derived_fields
+-- для строк, записанных в обход Django (trade_news_events). Триггер сбрасывает их в NULL,
+-- если classes, locations или title изменились, а производные поля в том же запросе не пересчитаны.
+
+CREATE OR REPLACE FUNCTION trade_news_reset_derived_fields()
+RETURNS trigger
+LANGUAGE plpgsql AS $$
+BEGIN
+    IF (NEW.classes, NEW.locations, NEW.title) IS DISTINCT FROM (OLD.classes, OLD.locations, OLD.title)
+        AND (NEW.classes_text, NEW.locations_normalized, NEW.abstract)
+            IS NOT DISTINCT FROM (OLD.classes_text, OLD.locations_normalized, OLD.abstract) THEN
+        NEW.classes_text := NULL;
+        NEW.locations_normalized := NULL;
+        NEW.abstract := NULL;
+    END IF;
+    RETURN NEW;
+END
+$$;
+
+ALTER TABLE trade_news_events ADD COLUMN IF NOT EXISTS classes_text text;
+ALTER TABLE trade_news_events ADD COLUMN IF NOT EXISTS locations_normalized text;
+ALTER TABLE trade_news_events ADD COLUMN IF NOT EXISTS abstract text;
+ALTER TABLE trade_news_for_approval ADD COLUMN IF NOT EXISTS classes_text text;
+ALTER TABLE trade_news_for_approval ADD COLUMN IF NOT EXISTS locations_normalized text;
+ALTER TABLE trade_news_for_approval ADD COLUMN IF NOT EXISTS abstract text;
+ALTER TABLE trade_news_relevant ADD COLUMN IF NOT EXISTS classes_text text;
+ALTER TABLE trade_news_relevant ADD COLUMN IF NOT EXISTS locations_normalized text;
+ALTER TABLE trade_news_relevant ADD COLUMN IF NOT EXISTS abstract text;
+
+DROP TRIGGER IF EXISTS trade_news_events_derived_fields_reset ON trade_news_events;
+CREATE TRIGGER trade_news_events_derived_fields_reset
+    BEFORE UPDATE OF classes, locations, title ON trade_news_events
+    FOR EACH ROW EXECUTE FUNCTION trade_news_reset_derived_fields();
+
+DROP TRIGGER IF EXISTS trade_news_for_approval_derived_fields_reset ON trade_news_for_approval;
+CREATE TRIGGER trade_news_for_approval_derived_fields_reset
+    BEFORE UPDATE OF classes, locations, title ON trade_news_for_approval
+    FOR EACH ROW EXECUTE FUNCTION trade_news_reset_derived_fields();
+
+DROP TRIGGER IF EXISTS trade_news_relevant_derived_fields_reset ON trade_news_relevant;
+CREATE TRIGGER trade_news_relevant_derived_fields_reset
+    BEFORE UPDATE OF classes, locations, title ON trade_news_relevant
+    FOR EACH ROW EXECUTE FUNCTION trade_news_reset_derived_fields();
+
+-- строки, которые ещё предстоит посчитать (fill_derived_fields)
+CREATE INDEX IF NOT EXISTS trade_news_events_derived_pending_idx
+    ON trade_news_events (id) WHERE abstract IS NULL;
+CREATE INDEX IF NOT EXISTS trade_news_for_approval_derived_pending_idx
+    ON trade_news_for_approval (id) WHERE abstract IS NULL;
+CREATE INDEX IF NOT EXISTS trade_news_relevant_derived_pending_idx
+    ON trade_news_relevant (id) WHERE abstract IS NULL;
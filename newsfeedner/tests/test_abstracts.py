@@ -0,0 +1,22 @@
+from django.test import SimpleTestCase
+
+from newsfeedner.utils.abstract_benchmark import (
+    generate_articles,
+    get_article_abstract_reference,
+    to_comparable,
+)
+from newsfeedner.utils.queryset_process import get_article_abstract, get_article_abstracts
+
+
+class ArticleAbstractTestCases(SimpleTestCase):
+    def test_same_as_reference(self):
+        articles = generate_articles(200, seed=3)
+        articles += [
+            # стоп-фразы подряд и в конце строки - очистка по очереди, как раньше
+            ("Заголовок\n\nЭкспорт в Китай вырос. Подробнее читайте вЧитайте также x", ["Китай"], None),
+            ("Заголовок\n\nЭкспорт в Китай вырос. ЧИТАЙТЕ НАС НА: сайт.Китай и Индия", ["Индия"], None),
+            ("Заголовок\n\nПоставки в страны Африки выросли на треть.", ["Египет"], ["Страны Африки"]),
+        ]
+        reference = to_comparable([get_article_abstract_reference(*article) for article in articles])
+        self.assertEqual(to_comparable([get_article_abstract(*article) for article in articles]), reference)
+        self.assertEqual(to_comparable(get_article_abstracts(articles)), reference)
@@ -0,0 +1,153 @@
+import uuid
+from unittest import mock
+
+import requests
+from django.test import TestCase
+from rest_framework.test import APIClient
+
+from newsfeedner.models import (
+    ApprovedIDs,
+    CheckedIDs,
+    CustomUser,
+    TradeEvent,
+    TradeEventForApproval,
+    TradeEventRelevant,
+    TradeNewsEmbeddings,
+    UserRoles,
+)
+from newsfeedner.views.views_main import EMBEDDING_TIMEOUT, NewsApprovalBulkApiView
+
+CODE = "04 - Зерновые и продукты из них"
+
+
+def get_embedding_response(*args, **kwargs):
+    response = mock.Mock()
+    response.json.return_value = {"embedding": [0.25, 0.5], "model": "test-model"}
+    return response
+
+
+class BulkApiTestCases(TestCase):
+    def setUp(self) -> None:
+        role = UserRoles.objects.create(role="admin")
+        self.client = APIClient()
+        self.client.force_authenticate(CustomUser.objects.create(username="approver", role=role))
+
+    def get_item(self, title, **fields):
+        item = {
+            "id": str(uuid.uuid4()),
+            "classes": "Внешняя торговля",
+            "itc_codes": CODE,
+            "locations": "Китай",
+            "title": title,
+            "url": "https://example.com/news",
+            "dates": "2023-03-08",
+            "article_ids": "1,2",
+            "product": "пшеница",
+            "user_checked": "annotator",
+            "date_checked": "2023-03-08T10:00:00Z",
+            "user_approved": "approver",
+            "date_approved": "2023-03-09T10:00:00Z",
+        }
+        item.update(fields)
+        return item
+
+    def post(self, url, items):
+        with mock.patch("newsfeedner.views.views_main.requests.post", side_effect=get_embedding_response) as post:
+            response = self.client.post(url, items, format="json")
+        self.assertEqual(response.status_code, 200)
+        return response.json(), post
+
+    def get_error_indexes(self, data):
+        return [error["index"] for error in data["errors"]]
+
+    def test_items_are_checked_one_by_one(self):
+        first = self.get_item("Китай увеличил импорт пшеницы")
+        TradeEvent.objects.create(
+            id=first["id"], classes=["Внешняя торговля"], locations="Китай", title=first["title"], dates="2023-03-08",
+            article_ids=["1"],
+        )
+        items = [
+            first,
+            self.get_item("Неверный тип отношений", classes="Погода"),
+            self.get_item("Повтор id", id=first["id"]),
+            # те же тип отношений, коды, страны и текст, что у первой
+            self.get_item(first["title"]),
+            self.get_item("Неверные id статей", article_ids="1,x"),
+        ]
+        data, post = self.post("/api_news/news_bulk", items)
+        self.assertEqual(data["saved"], [first["id"]])
+        self.assertEqual(self.get_error_indexes(data), [1, 2, 3, 4])
+        self.assertIn("classes", data["errors"][0]["errors"])
+        self.assertEqual(data["errors"][1]["errors"], {"error": "Новость с таким id уже есть в базе"})
+        self.assertIn("уже существует", data["errors"][2]["errors"]["error"])
+        self.assertIn("article_ids", data["errors"][3]["errors"])
+
+        self.assertEqual(list(TradeEventForApproval.objects.values_list("title", flat=True)), [first["title"]])
+        self.assertEqual(sorted(CheckedIDs.objects.values_list("checked_id", flat=True)), [1, 2])
+        self.assertEqual(TradeEvent.objects.get(id=first["id"]).status, "checked")
+        self.assertEqual(TradeNewsEmbeddings.objects.get(id=first["id"]).article_id, "1,2")
+        self.assertEqual(post.call_args.kwargs["timeout"], EMBEDDING_TIMEOUT)
+
+    def test_not_a_list(self):
+        response = self.client.post("/api_news/news_bulk", self.get_item("Одна новость"), format="json")
+        self.assertEqual(response.status_code, 400)
+
+    def test_leftover_embedding_is_replaced(self):
+        item = self.get_item("Новость с оставшимся эмбеддингом")
+        TradeNewsEmbeddings.objects.create(id=item["id"], embedding=b"old", article_id="9", model="old-model")
+        data, _ = self.post("/api_news/news_bulk", [item])
+        self.assertEqual(data, {"saved": [item["id"]], "errors": []})
+        embedding = TradeNewsEmbeddings.objects.get(id=item["id"])
+        self.assertEqual((embedding.model, embedding.article_id), ("test-model", "1,2"))
+
+    def test_embedding_timeout_is_item_error(self):
+        slow, fast = self.get_item("Медленный ответ"), self.get_item("Быстрый ответ", article_ids="3,4")
+
+        def post(url, json, timeout):
+            if json["text"] == slow["title"]:
+                raise requests.Timeout("read timeout")
+            return get_embedding_response()
+
+        with mock.patch("newsfeedner.views.views_main.requests.post", side_effect=post):
+            data = self.client.post("/api_news/news_bulk", [slow, fast], format="json").json()
+        self.assertEqual(data["saved"], [fast["id"]])
+        self.assertEqual(data["errors"], [{"index": 0, "id": slow["id"], "errors": {"embedding": "read timeout"}}])
+        self.assertFalse(TradeEventForApproval.objects.filter(id=slow["id"]).exists())
+
+    def test_article_ids_as_in_single_post(self):
+        # как в NewsApiViewApproval.post: для "0" сериализатор события id статей не проверяет, в approved_ids он записывается
+        item = self.get_item("Статья 0", article_ids="0")
+        data, _ = self.post("/api_news/news_approval_bulk", [item])
+        self.assertEqual(data, {"saved": [item["id"]], "errors": []})
+        self.assertEqual(list(ApprovedIDs.objects.values_list("approved_id", flat=True)), [0])
+
+    def test_article_ids_repeated_in_list(self):
+        first = self.get_item("Первая", article_ids="1,2")
+        second = self.get_item("Вторая", article_ids="2,3")
+        third = self.get_item("Третья", article_ids="0")
+        fourth = self.get_item("Четвёртая", article_ids="0")
+        data, _ = self.post("/api_news/news_approval_bulk", [first, second, third, fourth])
+        self.assertEqual(data["saved"], [first["id"], third["id"], fourth["id"]])
+        self.assertEqual(
+            data["errors"],
+            [{"index": 1, "id": second["id"], "errors": {"article_ids": "id статей 2 уже есть у другого события в списке"}}],
+        )
+        self.assertEqual(sorted(ApprovedIDs.objects.values_list("approved_id", flat=True)), [0, 1, 2])
+
+    def test_item_fallback_after_integrity_error(self):
+        first, second = self.get_item("Первая", article_ids="3"), self.get_item("Вторая")
+
+        def prepare_items(view, items):
+            # запись с тем же id появилась после проверки (конкурентная запись)
+            TradeEventRelevant.objects.create(
+                id=first["id"], classes=["Санкции"], locations="Китай", title="Другая новость", dates="2023-03-08",
+                article_ids=["3"], date_checked="2023-03-08T10:00:00Z", date_approved="2023-03-08T10:00:00Z",
+            )
+            return items, []
+
+        with mock.patch.object(NewsApprovalBulkApiView, "prepare_items", prepare_items):
+            data, _ = self.post("/api_news/news_approval_bulk", [first, second])
+        self.assertEqual(data["saved"], [second["id"]])
+        self.assertEqual(data["errors"], [{"index": 0, "id": first["id"], "errors": {"error": "Новость с таким id уже есть в базе"}}])
+        self.assertEqual(TradeEventRelevant.objects.get(id=first["id"]).title, "Другая новость")
+        self.assertEqual(sorted(ApprovedIDs.objects.values_list("approved_id", flat=True)), [1, 2])
@@ -0,0 +1,115 @@
+from datetime import datetime, timezone
+from io import StringIO
+from types import SimpleNamespace
+from unittest import mock
+
+from django.core.management import call_command
+from django.test import SimpleTestCase, TransactionTestCase
+
+from newsfeedner.models import TradeEventRelevant
+from newsfeedner.views.views_dupl_search import GetDuplicated
+from newsfeedner.utils.derived_fields import get_derived_fields, get_derived_rows
+from newsfeedner.utils.response_cache import get_table_versions, get_versions
+from newsfeedner.utils.queryset_process import (
+    get_article_abstract,
+    process_queryset_classes,
+    process_text_locations,
+)
+
+
+class DerivedFieldsTestCases(SimpleTestCase):
+    def test_same_as_view_time_processing(self):
+        events = [
+            SimpleNamespace(
+                classes=["Санкции", "Внешняя торговля; Санкции"],
+                locations="Китай, ФРГ, британский",
+                title="Поставки в ФРГ выросли. Читайте также: другое",
+            ),
+            SimpleNamespace(classes=["Инвестиции"], locations="Разные Страны Африки", title="Инвестиции"),
+        ]
+        for event, fields in zip(events, get_derived_fields(events)):
+            locations, _ = process_text_locations(event.locations)
+            self.assertEqual(fields["locations_normalized"], ", ".join(locations))
+            self.assertEqual(fields["abstract"], get_article_abstract(event.title, locations)[0])
+            process_queryset_classes(event)
+            self.assertEqual(fields["classes_text"], event.classes)
+        self.assertEqual(get_derived_fields(events[:1])[0]["locations_normalized"], "Великобритания, Германия, Китай")
+
+    def test_derived_rows(self):
+        rows = [(1, ["Санкции"], "ФРГ", "Санкции против ФРГ"), (2, ["Инвестиции"], "Китай", "Инвестиции")]
+        derived_rows = get_derived_rows(rows)
+        self.assertEqual([pk for pk, _ in derived_rows], [1, 2])
+        self.assertEqual(derived_rows[0][1]["locations_normalized"], "Германия")
+        self.assertEqual(derived_rows[1][1]["classes_text"], "Инвестиции")
+
+
+class DerivedFieldsWriteTestCases(TransactionTestCase):
+    """
+    Запись производных полей на тестовой базе с триггерами из newsfeedner/sql.
+    """
+
+    def setUp(self) -> None:
+        call_command("apply_db_schema", stdout=StringIO())
+        now = datetime(2023, 3, 8, tzinfo=timezone.utc)
+        self.event = TradeEventRelevant.objects.create(
+            classes=["Санкции"],
+            itc_codes="04",
+            locations="ФРГ",
+            product="пшеница",
+            title="Санкции против ФРГ",
+            url="https://example.com/news",
+            dates="2023-03-08 10:00:00+00",
+            article_ids=["1"],
+            user_checked="test",
+            user_approved="test",
+            date_checked=now,
+            date_approved=now,
+        )
+
+    def get_versions(self):
+        table = TradeEventRelevant._meta.db_table
+        return get_table_versions(TradeEventRelevant) + get_versions(f"{table}_facet_days")
+
+    def test_derived_only_update_keeps_versions(self):
+        self.assertEqual(self.event.locations_normalized, "Германия")
+        versions = self.get_versions()
+        # classes_text в ответы API не попадает
+        TradeEventRelevant.objects.filter(id=self.event.id).update(classes_text="Санкции")
+        self.assertEqual(self.get_versions(), versions)
+        # locations_normalized и abstract отдаются в API, сводку фильтров не меняют
+        TradeEventRelevant.objects.filter(id=self.event.id).update(locations_normalized="Германия", abstract=None)
+        self.assertEqual(self.get_versions(), (versions[0] + 1, versions[1]))
+        TradeEventRelevant.objects.filter(id=self.event.id).update(user_checked="other")
+        self.assertEqual(self.get_versions(), (versions[0] + 2, versions[1]))
+
+    def test_read_paths_serve_stored_fields(self):
+        response = self.client.get("/api_news/news_relevant", {"start_date": "2023-03-01", "end_date": "2023-03-31"})
+        self.assertEqual(response.status_code, 200)
+        (event,) = response.json()["results"]
+        self.assertEqual((event["locations_normalized"], event["abstract"]), ("Германия", "Санкции против ФРГ"))
+        self.assertNotIn("classes_text", event)
+
+        view = GetDuplicated()
+        (event,) = view.process_queryset(TradeEventRelevant.objects.filter(id=self.event.id))
+        self.assertEqual((event.classes, event.dates), ("Санкции", "2023-03-08"))
+
+    def test_save_recomputes_only_changed(self):
+        event = TradeEventRelevant.objects.get(id=self.event.id)
+        with mock.patch("newsfeedner.signals.set_derived_fields") as set_derived_fields:
+            event.url = "https://example.com/other"
+            event.save()
+            set_derived_fields.assert_not_called()
+            event.classes.append("Экспорт")
+            event.save()
+            set_derived_fields.assert_called_once_with([event])
+        event.title = "Санкции против Китая"
+        event.locations = "Китай"
+        event.save()
+        event = TradeEventRelevant.objects.get(id=self.event.id)
+        self.assertEqual((event.locations_normalized, event.abstract), ("Китай", "Санкции против Китая"))
+
+        # не посчитанные производные поля считаются при любой записи
+        TradeEventRelevant.objects.filter(id=self.event.id).update(abstract=None)
+        event = TradeEventRelevant.objects.get(id=self.event.id)
+        event.save()
+        self.assertIsNotNone(TradeEventRelevant.objects.get(id=self.event.id).abstract)
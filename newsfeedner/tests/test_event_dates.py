@@ -0,0 +1,16 @@
+from datetime import date
+
+from django.test import SimpleTestCase
+from rest_framework import serializers
+
+from newsfeedner.views.views_main import EventApiView
+
+
+class CheckDatesTestCases(SimpleTestCase):
+    def test_single_date(self):
+        self.assertEqual(EventApiView().check_dates("2023-03-08"), date(2023, 3, 8))
+
+    def test_wrong_dates(self):
+        for value in ("2023-01-01,2023-02-01", "", "08.03.2023", "2023-02-30"):
+            with self.assertRaises(serializers.ValidationError):
+                EventApiView().check_dates(value)
@@ -0,0 +1,356 @@
+import gzip
+import json
+from datetime import datetime, timezone
+from io import StringIO
+from unittest import mock
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from rest_framework.exceptions import ValidationError
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from newsfeedner.models import TradeEventRelevant, TradeFilterSnapshot
+from newsfeedner.utils.facet_benchmark import find_regressions, generate_event_rows, get_facet_tuples_from_rows
+from newsfeedner.utils.facet_store import FacetStore
+from newsfeedner.utils.facets import get_branch_codes
+from newsfeedner.utils.filter_facets import FacetIndex, FilterFacets
+from newsfeedner.utils.trade_funcs import build_filter_facets, get_country_regions
+from newsfeedner.utils.lexicon import LEXICON
+from newsfeedner.utils.response_cache import get_table_versions, get_versions
+from newsfeedner.utils.trade_utils import smtk_products
+from newsfeedner.views.views_filters import FilterViewRelevant
+
+
+class FacetsTestCases(SimpleTestCase):
+    def test_branch_codes(self):
+        branches, codes = get_branch_codes()
+        self.assertEqual(len(branches), len(codes))
+        pairs = set(zip(branches, codes))
+        branch = "0 - Пищевые продукты и живые животные"
+        self.assertIn((branch, branch), pairs)
+        for product in smtk_products[branch]:
+            self.assertIn((branch, product), pairs)
+
+    def test_country_regions(self):
+        countries, regions = get_country_regions()
+        self.assertEqual(len(countries), len(regions))
+        self.assertTrue(all(region.startswith("Страны") for region in regions))
+        for country, region in zip(countries, regions):
+            self.assertIn(region, LEXICON.country_regions[country])
+
+    def test_build_filter_facets(self):
+        branch = "0 - Пищевые продукты и живые животные"
+        query = {
+            "Экспорт": {"Страны Азии": {"Китай": {branch: {branch, "04"}}, "Индия": {branch: {branch}}}},
+            "Импорт": {"Страны Азии": {"Китай": {branch: {"01"}}}},
+        }
+        facets = build_filter_facets(query)
+        # входные данные не изменяются
+        self.assertEqual(query["Экспорт"]["Страны Азии"]["Китай"][branch], {branch, "04"})
+        self.assertEqual(facets["countries"], ["Индия", "Китай"])
+        self.assertEqual(facets["region_relations"], {"Страны Азии": ["Импорт", "Экспорт"]})
+        self.assertEqual(list(facets["country_products"]), ["Импорт", "Экспорт", "Все типы"])
+        self.assertEqual(
+            facets["country_products"]["Экспорт"]["Индия"], {"Все товарные разделы": []}
+        )
+        self.assertEqual(
+            facets["country_products"]["Все типы"]["Все страны"],
+            {branch: ["01", "04"], "Все товарные разделы": ["01", "04"]},
+        )
+        self.assertEqual(facets["product_branches"], [branch])
+
+
+class FacetStoreTestCases(SimpleTestCase):
+    rows = [
+        ("Экспорт", "Страны Азии", "Китай", "0 - Пищевые", "04"),
+        ("Экспорт", "Страны Азии", "Индия", "7 - Машины", "78"),
+        ("Импорт", "Страны Азии", "Индия", "0 - Пищевые", "04"),
+        ("Импорт", "Страны Африки", "Египет", "0 - Пищевые", "01"),
+    ]
+
+    def test_values(self):
+        store = FacetStore.from_rows(self.rows)
+        self.assertEqual(store.values("country"), ["Египет", "Индия", "Китай"])
+        self.assertEqual(store.values("country", relation=["Экспорт"], product=["04"]), ["Китай"])
+        self.assertEqual(store.values("relation", country=["Индия", "Египет"], product=["04"]), ["Импорт"])
+        self.assertEqual(store.values("product", region=["Страны Азии"], relation=[]), ["04", "78"])
+        self.assertEqual(store.values("country", product=["99"]), [])
+
+    def test_bytes(self):
+        store = FacetStore.from_bytes(FacetStore.from_rows(self.rows).to_bytes())
+        self.assertEqual(store.values("region", product=["01"]), ["Страны Африки"])
+        self.assertEqual(store.values("product_branch"), ["0 - Пищевые", "7 - Машины"])
+
+
+class FacetIndexTestCases(SimpleTestCase):
+    @override_settings(FILTER_FACETS_GZIP=True)
+    def test_snapshot_bodies(self):
+        rows = [("Экспорт", "Страны Азии", "Китай", "0 - Пищевые продукты и живые животные", "04")]
+        facets = FilterFacets.from_rows(3, rows)
+        self.assertEqual(json.loads(facets.bodies["get_countries"]), ["Китай"])
+        self.assertEqual(json.loads(facets.bodies["get_regions"]), ["Страны Азии"])
+        for slug, body in facets.bodies.items():
+            self.assertEqual(gzip.decompress(facets.gzip_bodies[slug]), body)
+
+    def test_persisted_snapshot_served_before_build(self):
+        index = FacetIndex(TradeEventRelevant)
+        persisted = FilterFacets(1, {}, {}, None)
+        with mock.patch.object(index, "start_refresher") as start_refresher, \
+                mock.patch.object(index, "load_persisted", return_value=persisted), \
+                mock.patch.object(index, "refresh") as refresh:
+            self.assertIs(index.get_snapshot(), persisted)
+        start_refresher.assert_called_once()
+        refresh.assert_not_called()
+
+    def test_snapshot_built_without_persisted(self):
+        index = FacetIndex(TradeEventRelevant)
+        built = FilterFacets(2, {}, {}, None)
+        with mock.patch.object(index, "start_refresher"), \
+                mock.patch.object(index, "load_persisted", return_value=None), \
+                mock.patch.object(index, "refresh", side_effect=lambda: index.set_snapshot(built)):
+            self.assertIs(index.get_snapshot(), built)
+
+    def test_refresher_survives_errors(self):
+        index = FacetIndex(TradeEventRelevant)
+
+        class Stop(BaseException):
+            pass
+
+        with mock.patch.object(index, "refresh", side_effect=[ValueError("bad row"), None]) as refresh, \
+                mock.patch("newsfeedner.utils.filter_facets.time.sleep", side_effect=[None, Stop]), \
+                mock.patch("newsfeedner.utils.filter_facets.connection"), \
+                self.assertLogs("newsfeedner.utils.filter_facets", "ERROR"):
+            with self.assertRaises(Stop):
+                index.run_refresher()
+        self.assertEqual(refresh.call_count, 2)
+
+
+class FilterSnapshotTestCases(TestCase):
+    rows = [("Экспорт", "Страны Азии", "Китай", "0 - Пищевые продукты и живые животные", "04")]
+
+    def setUp(self) -> None:
+        FilterFacets.from_rows(5, self.rows).save(TradeEventRelevant)
+
+    def test_saved_snapshot_loaded(self):
+        snapshot = FilterFacets.load(TradeEventRelevant)
+        self.assertEqual(snapshot.version, 5)
+        self.assertEqual(json.loads(snapshot.bodies["get_countries"]), ["Китай"])
+        self.assertEqual(snapshot.store.size, 1)
+
+    def test_other_build_is_missing(self):
+        snapshots = TradeFilterSnapshot.objects.filter(table_name=TradeEventRelevant._meta.db_table)
+        snapshots.update(lexicon_version="0123456789abcdef")
+        self.assertIsNone(FilterFacets.load(TradeEventRelevant))
+        snapshots.update(lexicon_version=LEXICON.version, format_version=0)
+        self.assertIsNone(FilterFacets.load(TradeEventRelevant))
+
+    def test_undecodable_store_rebuilt(self):
+        TradeFilterSnapshot.objects.filter(slug="facet_store").update(body=b"not json")
+        with self.assertLogs("newsfeedner.utils.filter_facets", "WARNING"):
+            self.assertIsNone(FacetIndex(TradeEventRelevant).load_persisted())
+        index = FacetIndex(TradeEventRelevant)
+        with mock.patch.object(index, "build", return_value=FilterFacets.from_rows(6, self.rows)) as build, \
+                self.assertLogs("newsfeedner.utils.filter_facets", "WARNING"):
+            self.assertEqual(index.build_shared(6, wait=True).version, 6)
+        build.assert_called_once_with(6)
+        self.assertEqual(FilterFacets.load(TradeEventRelevant).version, 6)
+
+
+class FiltersEtagTestCases(SimpleTestCase):
+    rows = [("Экспорт", "Страны Азии", "Китай", "0 - Пищевые", "04")]
+
+    def get(self, **headers):
+        request = APIRequestFactory().get("/api/get_countries", **headers)
+        snapshot = FilterFacets.from_rows(5, self.rows)
+        with mock.patch.object(FilterViewRelevant.facet_index, "get_snapshot", return_value=snapshot):
+            return FilterViewRelevant.as_view(slug="get_countries")(request)
+
+    def test_lexicon_change_changes_etag(self):
+        etag = self.get()["ETag"]
+        self.assertEqual(self.get(HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        # новая версия справочников при той же версии таблицы
+        with mock.patch("newsfeedner.utils.filter_facets.LEXICON", mock.Mock(version="changed")):
+            response = self.get(HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response["ETag"], etag)
+        with mock.patch("newsfeedner.utils.filter_facets.SNAPSHOT_FORMAT_VERSION", 2):
+            self.assertEqual(self.get(HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+
+class FiltersWindowTestCases(SimpleTestCase):
+    def get_facets(self, params):
+        request = Request(APIRequestFactory().get("/api/get_countries", params))
+        return FilterViewRelevant().get_facets(request)
+
+    def test_window_snapshot(self):
+        index = FilterViewRelevant.facet_index
+        with mock.patch.object(index, "get_window_snapshot") as get_window_snapshot, \
+                mock.patch.object(index, "get_snapshot") as get_snapshot:
+            self.get_facets({"start_date": "2023-01-01", "end_date": "2023-01-31"})
+            get_window_snapshot.assert_called_once_with("2023-01-01", "2023-01-31")
+            self.get_facets({})
+            get_snapshot.assert_called_once_with()
+
+    def test_window_dates_validated(self):
+        with mock.patch.object(FilterViewRelevant.facet_index, "get_window_snapshot") as get_window_snapshot:
+            with self.assertRaises(ValidationError):
+                self.get_facets({"start_date": "2023-01-01"})
+            with self.assertRaises(ValidationError):
+                self.get_facets({"start_date": "2023-01-01", "end_date": "2023-13-01"})
+        get_window_snapshot.assert_not_called()
+
+
+class FacetDaysTestCases(TransactionTestCase):
+    """
+    Дневная сводка trade_news_facet_days и фильтры за период на тестовой базе с триггерами из newsfeedner/sql.
+    """
+
+    version_name = f"{TradeEventRelevant._meta.db_table}_facet_days"
+
+    def setUp(self) -> None:
+        call_command("apply_db_schema", stdout=StringIO())
+        cache.clear()
+
+    def create_event(self, title, dates="2023-03-08 10:00:00+00", **fields):
+        now = datetime(2023, 3, 8, tzinfo=timezone.utc)
+        event = dict(
+            classes=["Экспорт"],
+            itc_codes="04",
+            locations="Китай",
+            product="пшеница",
+            title=title,
+            url="https://example.com/" + title,
+            dates=dates,
+            article_ids=["1"],
+            user_checked="test",
+            user_approved="test",
+            date_checked=now,
+            date_approved=now,
+        )
+        event.update(fields)
+        return TradeEventRelevant.objects.create(**event)
+
+    def get_rollup(self):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT event_date::text, relation, country, code, events FROM trade_news_facet_days "
+                "WHERE table_name = %s",
+                [TradeEventRelevant._meta.db_table],
+            )
+            return {row[:4]: row[4] for row in cursor.fetchall()}
+
+    def get_rollup_version(self):
+        return get_versions(self.version_name)[0]
+
+    def test_rollup_follows_events(self):
+        first = self.create_event("Первая")
+        self.create_event("Вторая")
+        self.create_event("Третья", dates="2023-05-01 10:00:00+00", classes=["Импорт"], locations="Индия")
+        rollup = self.get_rollup()
+        export = [key for key in rollup if key[:3] == ("2023-03-08", "Экспорт", "Китай")]
+        self.assertTrue(export)
+        self.assertEqual({rollup[key] for key in export}, {2})
+        self.assertTrue(any(key[:3] == ("2023-05-01", "Импорт", "Индия") for key in rollup))
+
+        first.classes = ["Санкции"]
+        first.save()
+        rollup = self.get_rollup()
+        self.assertEqual({rollup[key] for key in export}, {1})
+        self.assertTrue(any(key[:3] == ("2023-03-08", "Санкции", "Китай") for key in rollup))
+
+        # удаляются только обнулившиеся ключи записи, а не все нулевые строки сводки таблицы
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "INSERT INTO trade_news_facet_days (table_name, event_date, relation, country, code, events) "
+                "VALUES (%s, '2020-01-01', 'Экспорт', 'Китай', '04', 0)",
+                [TradeEventRelevant._meta.db_table],
+            )
+        TradeEventRelevant.objects.filter(title="Вторая").delete()
+        rollup = self.get_rollup()
+        self.assertFalse(any(key in rollup for key in export))
+        self.assertEqual(rollup[("2020-01-01", "Экспорт", "Китай", "04")], 0)
+        self.assertTrue(any(key[:3] == ("2023-05-01", "Импорт", "Индия") for key in rollup))
+
+    def test_rollup_version(self):
+        event = self.create_event("Первая")
+        version = self.get_rollup_version()
+        self.assertGreater(version, 0)
+        (table_version,) = get_table_versions(TradeEventRelevant)
+        # смена статуса сводку не меняет
+        TradeEventRelevant.objects.filter(id=event.id).update(user_checked="other")
+        self.assertEqual(self.get_rollup_version(), version)
+        self.assertEqual(get_table_versions(TradeEventRelevant), (table_version + 1,))
+        TradeEventRelevant.objects.filter(id=event.id).update(locations="Индия")
+        self.assertEqual(self.get_rollup_version(), version + 1)
+
+    def test_window_snapshot(self):
+        event = self.create_event("Первая")
+        self.create_event("Вторая", dates="2023-05-01 10:00:00+00", locations="Индия")
+        index = FacetIndex(TradeEventRelevant)
+        window = index.get_window_snapshot("2023-03-01", "2023-03-31")
+        self.assertEqual(json.loads(window.get_body("get_countries")), ["Китай"])
+        self.assertEqual(gzip.decompress(window.get_gzip_body("get_countries")), window.get_body("get_countries"))
+        self.assertIsNone(window.get_body("get_unknown"))
+        self.assertEqual(window.store.values("country"), ["Китай"])
+
+        # запись без изменения сводки: тот же ключ кэша, тела из кэша без запросов к сводке
+        TradeEventRelevant.objects.filter(id=event.id).update(user_checked="other")
+        cached = index.get_window_snapshot("2023-03-01", "2023-03-31")
+        self.assertEqual(cached.version, window.version)
+        with mock.patch("newsfeedner.utils.filter_facets.get_facet_tuples") as get_facet_tuples:
+            self.assertEqual(json.loads(cached.get_body("get_countries")), ["Китай"])
+            self.assertEqual(cached.store.values("country"), ["Китай"])
+        get_facet_tuples.assert_not_called()
+
+        # после смены справочников кэш прежней версии не читается
+        with mock.patch("newsfeedner.utils.filter_facets.LEXICON", mock.Mock(version="changed")), \
+                mock.patch("newsfeedner.utils.filter_facets.get_facet_tuples", return_value=[]):
+            self.assertEqual(json.loads(index.get_window_snapshot("2023-03-01", "2023-03-31").get_body("get_countries")), [])
+        with mock.patch("newsfeedner.utils.filter_facets.SNAPSHOT_FORMAT_VERSION", 2), \
+                mock.patch("newsfeedner.utils.filter_facets.get_facet_tuples", return_value=[]):
+            self.assertEqual(index.get_window_snapshot("2023-03-01", "2023-03-31").store.values("country"), [])
+
+        self.create_event("Третья", locations="Индия")
+        window = index.get_window_snapshot("2023-03-01", "2023-03-31")
+        self.assertNotEqual(window.version, cached.version)
+        self.assertEqual(json.loads(window.get_body("get_countries")), ["Индия", "Китай"])
+
+    def test_window_view(self):
+        self.create_event("Первая")
+        response = self.client.get("/api/get_countries", {"start_date": "2023-03-01", "end_date": "2023-03-31"})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(json.loads(response.content), ["Китай"])
+        response = self.client.get("/api/get_countries", {"start_date": "2024-01-01", "end_date": "2024-01-31"})
+        self.assertEqual(json.loads(response.content), [])
+
+
+class FacetBenchmarkTestCases(SimpleTestCase):
+    def test_generated_rows(self):
+        rows = generate_event_rows(50, seed=1)
+        self.assertEqual(rows, generate_event_rows(50, seed=1))
+        self.assertTrue(get_facet_tuples_from_rows(rows))
+
+    def test_facet_tuples_from_rows(self):
+        branch = "0 - Пищевые продукты и живые животные"
+        rows = [
+            (["Санкции"], "Китай, Неизвестная страна", [branch, "01 - Мясо и мясопродукты", "Товары без кода"]),
+            ([], "Китай", ["01 - Мясо и мясопродукты"]),
+        ]
+        self.assertEqual(
+            get_facet_tuples_from_rows(rows),
+            [
+                ("Санкции", "Страны Азии", "Китай", branch, branch),
+                ("Санкции", "Страны Азии", "Китай", branch, "01 - Мясо и мясопродукты"),
+            ],
+        )
+
+    def test_find_regressions(self):
+        baseline = {"memory": {"10000": {"snapshot": {"seconds": 1.0, "peak_mb": 10.0}}}}
+        results = {"memory": {"10000": {"snapshot": {"seconds": 1.4, "peak_mb": 10.0}}}}
+        self.assertEqual(find_regressions(results, baseline, 0.5), [])
+        results["memory"]["10000"]["snapshot"]["peak_mb"] = 20.0
+        self.assertEqual(len(find_regressions(results, baseline, 0.5)), 1)
+        self.assertEqual(find_regressions({"postgres": results["memory"]}, baseline, 0.5), [])
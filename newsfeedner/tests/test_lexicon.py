@@ -0,0 +1,40 @@
+from django.test import SimpleTestCase
+
+from newsfeedner.utils import trade_utils
+from newsfeedner.utils.lexicon import LEXICON, Lexicon
+
+
+class LexiconTestCases(SimpleTestCase):
+    def test_read_only(self):
+        with self.assertRaises(AttributeError):
+            LEXICON.stoplist = set()
+        with self.assertRaises(TypeError):
+            LEXICON.loc_dict["фрг"] = "Франция"
+        self.assertIsInstance(LEXICON.countries_and_regions, frozenset)
+        self.assertIsInstance(LEXICON.country_regions["Китай"], frozenset)
+
+    def test_version(self):
+        self.assertEqual(Lexicon.from_trade_utils().version, LEXICON.version)
+        loc_dict = {**trade_utils.loc_dict, "новая форма": "Китай"}
+        changed = Lexicon(
+            trade_utils.query_regions_dict,
+            loc_dict,
+            trade_utils.stoplist,
+            trade_utils.relations,
+            trade_utils.smtk_products,
+        )
+        self.assertNotEqual(changed.version, LEXICON.version)
+
+    def test_indexes(self):
+        for region, countries in trade_utils.query_regions_dict.items():
+            self.assertIn(region, LEXICON.countries_and_regions)
+            for country in countries:
+                self.assertIn(region, LEXICON.country_regions[country])
+        self.assertEqual(LEXICON.smtk_product_set, set(LEXICON.smtk_product_all))
+        self.assertEqual(LEXICON.smtk_branches, tuple(trade_utils.smtk_products))
+        self.assertEqual(LEXICON.smtk_product_all[: len(LEXICON.smtk_branches)], LEXICON.smtk_branches)
+        # словоформа и название в нижнем регистре
+        self.assertEqual(LEXICON.loc_forms["фрг"], ("Германия",))
+        self.assertEqual(LEXICON.loc_forms["германия"], ("Германия",))
+        # исходный словарь при этом не меняется
+        self.assertNotIn("германия", trade_utils.loc_dict)
@@ -0,0 +1,33 @@
+import random
+
+from django.test import SimpleTestCase
+
+from newsfeedner.utils.location_matcher import AUTOMATON_MIN_PATTERNS, LocationMatcher, location_matcher
+
+
+class LocationMatcherTestCases(SimpleTestCase):
+    def test_find_equals_substring_search(self):
+        patterns = ["кита", "китай", "тай", "ай", "южная корея", "коре", "р"]
+        matcher = LocationMatcher(patterns)
+        rng = random.Random(0)
+        alphabet = "китайюжнаорея "
+        for _ in range(300):
+            text = "".join(rng.choice(alphabet) for _ in range(rng.randint(0, 40)))
+            self.assertEqual(matcher.find(text), {p for p in patterns if p in text})
+
+    def test_contains_any(self):
+        text = "поставки из южной кореи и китая выросли"
+        self.assertTrue(location_matcher.contains_any(text, {"кита"}))
+        self.assertFalse(location_matcher.contains_any(text, {"франци"}))
+        # много шаблонов - проход автомата, шаблон не из словаря ищется подстрокой
+        patterns = {f"нет такой локации {i}" for i in range(AUTOMATON_MIN_PATTERNS)}
+        self.assertFalse(location_matcher.contains_any(text, patterns))
+        self.assertTrue(location_matcher.contains_any(text, patterns | {"выросли"}))
+        self.assertTrue(location_matcher.contains_any(text, patterns | {"коре"}))
+
+    def test_locations(self):
+        self.assertEqual(location_matcher.get_locations("фрг"), ("Германия",))
+        self.assertEqual(location_matcher.get_locations("япония гонконг"), ("Япония", "Гонконг"))
+        self.assertEqual(location_matcher.get_locations("германия"), ("Германия",))
+        self.assertEqual(location_matcher.get_locations("страна"), ())
+        self.assertEqual(location_matcher.find_locations("фрг и китай"), {"Германия", "Китай"})
@@ -0,0 +1,101 @@
+import threading
+from collections import Counter
+
+from django.test import SimpleTestCase, TestCase
+
+from newsfeedner.models import TradeNormalForm
+from newsfeedner.utils.morph import get_morph
+from newsfeedner.utils.normal_forms import NormalFormCache
+
+
+class FakeParse:
+    def __init__(self, normal_form):
+        self.normal_form = normal_form
+
+
+class FakeMorph:
+    def __init__(self):
+        self.calls = Counter()
+
+    def parse(self, word):
+        self.calls[word] += 1
+        return [FakeParse(word.lower())]
+
+
+class NormalFormCacheTestCases(SimpleTestCase):
+    def test_hits_and_misses(self):
+        morph = FakeMorph()
+        cache = NormalFormCache(lambda: morph, maxsize=10)
+        self.assertEqual(cache.get("Китая"), "китая")
+        self.assertEqual(cache.get("Китая"), "китая")
+        self.assertEqual(cache.get("России"), "россии")
+        self.assertEqual(morph.calls, Counter({"Китая": 1, "России": 1}))
+        self.assertEqual(
+            cache.stats(), {"hits": 1, "misses": 2, "hit_rate": 0.3333, "size": 2, "maxsize": 10}
+        )
+
+    def test_eviction(self):
+        morph = FakeMorph()
+        cache = NormalFormCache(lambda: morph, maxsize=2)
+        cache.get("a")
+        cache.get("b")
+        cache.get("a")
+        cache.get("c")
+        # вытесняется давно не использованная "b"
+        cache.get("a")
+        cache.get("b")
+        self.assertEqual(morph.calls, Counter({"a": 1, "b": 2, "c": 1}))
+        self.assertEqual(cache.stats()["size"], 2)
+
+    def test_threads(self):
+        morph = FakeMorph()
+        cache = NormalFormCache(lambda: morph, maxsize=50)
+        words = [f"w{i}" for i in range(100)]
+
+        def run():
+            for word in words:
+                self.assertEqual(cache.get(word), word)
+
+        threads = [threading.Thread(target=run) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        stats = cache.stats()
+        self.assertEqual(stats["hits"] + stats["misses"], 400)
+        self.assertEqual(stats["size"], 50)
+
+
+class NormalFormSaveTestCases(TestCase):
+    def test_save_writes_only_new_forms(self):
+        cache = NormalFormCache(FakeMorph, maxsize=10)
+        cache.get("Китая")
+        cache.get("России")
+        self.assertEqual(cache.save(), 2)
+        # повторно уже записанное не отправляется
+        self.assertEqual(cache.save(), 0)
+
+        # форма, записанная другим процессом, не считается
+        TradeNormalForm.objects.create(word="Индии", normal_form="индии")
+        cache.get("Индии")
+        cache.get("Египта")
+        self.assertEqual(cache.save(batch_size=1), 1)
+
+        other = NormalFormCache(FakeMorph, maxsize=10)
+        self.assertEqual(other.load(), 4)
+        # загруженные формы не записываются заново
+        self.assertEqual(other.save(), 0)
+        self.assertEqual(other.get("Китая"), "китая")
+        self.assertEqual(TradeNormalForm.objects.count(), 4)
+
+
+class MorphTestCases(SimpleTestCase):
+    def test_one_analyzer_per_process(self):
+        analyzers = []
+        threads = [threading.Thread(target=lambda: analyzers.append(get_morph())) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(len({id(analyzer) for analyzer in analyzers}), 1)
+        self.assertIs(analyzers[0], get_morph())
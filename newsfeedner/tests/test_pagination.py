@@ -0,0 +1,47 @@
+from types import SimpleNamespace
+
+from django.test import SimpleTestCase
+from rest_framework.exceptions import NotFound
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from newsfeedner.pagination import EventCursorPagination
+
+
+class EventCursorPaginationTestCases(SimpleTestCase):
+    def setUp(self) -> None:
+        self.factory = APIRequestFactory()
+        self.paginator = EventCursorPagination()
+        self.paginator.base_url = "http://localhost/api_news/news_relevant?pagination=cursor"
+
+    def test_cursor_roundtrip(self):
+        obj = SimpleNamespace(event_date="2023-03-08", id="0a2b2e0e-2a4c-4a4c-8a8a-000000000000")
+        link = self.paginator.encode_cursor(obj, reverse=True)
+        token = link.split("cursor=")[1].split("&")[0]
+        request = Request(self.factory.get("/", {"cursor": token}))
+        position, reverse = self.paginator.decode_cursor(request)
+        self.assertEqual(position, ["2023-03-08", "0a2b2e0e-2a4c-4a4c-8a8a-000000000000"])
+        self.assertTrue(reverse)
+
+    def test_invalid_cursor(self):
+        request = Request(self.factory.get("/", {"cursor": "not-a-cursor"}))
+        with self.assertRaises(NotFound):
+            self.paginator.decode_cursor(request)
+
+    def test_reverse_ordering(self):
+        self.assertEqual(self.paginator.get_ordering(False), ("-event_date", "-id"))
+        self.assertEqual(self.paginator.get_ordering(True), ("event_date", "id"))
+
+    def test_keyset_filter(self):
+        forward = self.paginator.get_keyset_filter(["2023-03-08", "x"], reverse=False)
+        backward = self.paginator.get_keyset_filter(["2023-03-08", "x"], reverse=True)
+        self.assertIn(("event_date__lte", "2023-03-08"), forward.children)
+        self.assertIn(("event_date__gte", "2023-03-08"), backward.children)
+
+    def test_keyset_filter_three_fields(self):
+        self.paginator.ordering = ("-rank", "-event_date", "-id")
+        condition = self.paginator.get_keyset_filter(["0.5", "2023-03-08", "x"], reverse=False)
+        self.assertIn(("rank__lte", "0.5"), condition.children)
+        after = condition.children[1]
+        self.assertEqual(after.connector, "OR")
+        self.assertEqual(len(after.children), 3)
@@ -0,0 +1,100 @@
+import json
+import tempfile
+from datetime import datetime, timezone
+from io import StringIO
+from pathlib import Path
+from unittest import mock
+
+from django.core.management import call_command
+from django.test import TestCase
+
+from newsfeedner.models import TradeEventRelevant
+from newsfeedner.utils.derived_fields import get_derived_rows, update_derived_fields
+from newsfeedner.utils.lexicon import LEXICON
+
+
+class RenormalizeLocationsTestCases(TestCase):
+    def setUp(self) -> None:
+        now = datetime(2023, 3, 8, tzinfo=timezone.utc)
+        for title, locations in (("Санкции против ФРГ", "ФРГ"), ("Экспорт в Китай", "Китай"), ("Импорт из Индии", "Индия")):
+            TradeEventRelevant.objects.create(
+                classes=["Санкции"],
+                itc_codes="04",
+                locations=locations,
+                product="пшеница",
+                title=title,
+                url="https://example.com/" + title,
+                dates="2023-03-08",
+                article_ids=["1"],
+                user_checked="test",
+                user_approved="test",
+                date_checked=now,
+                date_approved=now,
+            )
+        self.pks = list(TradeEventRelevant.objects.order_by("pk").values_list("pk", flat=True))
+        # производные поля "устарели": их должна переписать команда
+        TradeEventRelevant.objects.update(locations_normalized="old")
+        tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp_dir.cleanup)
+        self.checkpoint = Path(tmp_dir.name) / "checkpoint.json"
+
+    def renormalize(self):
+        out = StringIO()
+        call_command(
+            "renormalize_locations",
+            "--tables", "relevant",
+            "--workers", "1",
+            "--batch-size", "1",
+            "--checkpoint", str(self.checkpoint),
+            stdout=out,
+        )
+        return out.getvalue()
+
+    def get_renormalized(self):
+        return [
+            locations != "old"
+            for locations in TradeEventRelevant.objects.order_by("pk").values_list("locations_normalized", flat=True)
+        ]
+
+    def write_checkpoint(self, last_pk, lexicon_version=LEXICON.version):
+        self.checkpoint.write_text(
+            json.dumps({"lexicon_version": lexicon_version, "trade_news_relevant": str(last_pk)}), encoding="utf-8"
+        )
+
+    def test_conditional_write(self):
+        rows = list(TradeEventRelevant.objects.order_by("pk").values_list("pk", "classes", "locations", "title"))
+        derived = [fields for _, fields in get_derived_rows(rows)]
+        # строка изменена после чтения - её производные поля не перезаписываются
+        TradeEventRelevant.objects.filter(pk=self.pks[0]).update(title="Новый заголовок")
+        self.assertEqual(update_derived_fields(TradeEventRelevant, rows, derived), 2)
+        self.assertEqual(self.get_renormalized(), [False, True, True])
+
+    def test_checkpoint_saved_after_each_batch(self):
+        calls = []
+
+        def update(model, rows, derived):
+            if calls:
+                raise RuntimeError("interrupted")
+            calls.append(rows)
+            return update_derived_fields(model, rows, derived)
+
+        with mock.patch(
+            "newsfeedner.management.commands.renormalize_locations.update_derived_fields", side_effect=update
+        ), self.assertRaises(RuntimeError):
+            self.renormalize()
+        checkpoint = json.loads(self.checkpoint.read_text(encoding="utf-8"))
+        self.assertEqual(checkpoint, {"lexicon_version": LEXICON.version, "trade_news_relevant": str(self.pks[0])})
+        self.assertEqual(self.get_renormalized(), [True, False, False])
+
+    def test_resume_from_checkpoint(self):
+        self.write_checkpoint(self.pks[0])
+        self.renormalize()
+        self.assertEqual(self.get_renormalized(), [False, True, True])
+        # всё пересчитано - позиция удаляется
+        self.assertFalse(self.checkpoint.exists())
+
+    def test_lexicon_change_restarts(self):
+        self.write_checkpoint(self.pks[-1], lexicon_version="outdated")
+        out = self.renormalize()
+        self.assertIn("Lexicon has changed", out)
+        self.assertEqual(self.get_renormalized(), [True, True, True])
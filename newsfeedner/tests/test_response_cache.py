@@ -0,0 +1,94 @@
+from datetime import datetime, timezone
+from io import StringIO
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import transaction
+from django.http import HttpResponse, QueryDict
+from django.test import RequestFactory, SimpleTestCase, TransactionTestCase
+
+from newsfeedner.models import TradeEventRelevant
+from newsfeedner.utils.response_cache import get_etag_response, get_table_versions, normalize_query_params
+
+
+class ResponseCacheTestCases(SimpleTestCase):
+    def test_normalize_query_params(self):
+        first = QueryDict("start_date=2023-01-01&end_date=2023-03-08&page=2&region=")
+        second = QueryDict("page=2&end_date=2023-03-08&start_date=2023-01-01")
+        self.assertEqual(normalize_query_params(first), normalize_query_params(second))
+
+    def test_normalize_query_params_differs(self):
+        first = QueryDict("start_date=2023-01-01&end_date=2023-03-08&page=2")
+        second = QueryDict("start_date=2023-01-01&end_date=2023-03-08&page=3")
+        self.assertNotEqual(normalize_query_params(first), normalize_query_params(second))
+
+    def test_etag_response(self):
+        factory = RequestFactory()
+        etag = 'W/"abc"'
+        response = get_etag_response(factory.get("/"), etag, lambda: HttpResponse("data"))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["ETag"], etag)
+
+        request = factory.get("/", HTTP_IF_NONE_MATCH=etag)
+        response = get_etag_response(request, etag, lambda: self.fail("response should not be built"))
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response["ETag"], etag)
+
+
+class ResponseCacheInvalidationTestCases(TransactionTestCase):
+    """
+    Версии таблиц и кэш ответов на тестовой базе с триггерами из newsfeedner/sql.
+    """
+
+    def setUp(self) -> None:
+        call_command("apply_db_schema", stdout=StringIO())
+        cache.clear()
+
+    def create_event(self, title):
+        now = datetime(2023, 3, 8, tzinfo=timezone.utc)
+        return TradeEventRelevant.objects.create(
+            classes=["Экспорт"],
+            itc_codes="04",
+            locations="Китай",
+            product="пшеница",
+            title=title,
+            url="https://example.com/" + title,
+            dates="2023-03-08 10:00:00+00",
+            article_ids=["1"],
+            user_checked="test",
+            user_approved="test",
+            date_checked=now,
+            date_approved=now,
+        )
+
+    def get_news_relevant(self):
+        response = self.client.get("/api_news/news_relevant", {"start_date": "2023-01-01", "end_date": "2023-12-31"})
+        self.assertEqual(response.status_code, 200)
+        return response, sorted(event["title"] for event in response.json()["results"])
+
+    def test_write_invalidates_cached_response(self):
+        self.create_event("Первая")
+        first, titles = self.get_news_relevant()
+        self.assertEqual(titles, ["Первая"])
+        cached, titles = self.get_news_relevant()
+        self.assertEqual(titles, ["Первая"])
+        self.assertEqual(cached["ETag"], first["ETag"])
+
+        self.create_event("Вторая")
+        second, titles = self.get_news_relevant()
+        self.assertEqual(titles, ["Вторая", "Первая"])
+        self.assertNotEqual(second["ETag"], first["ETag"])
+
+    def test_version_bumped_once_at_commit(self):
+        (before,) = get_table_versions(TradeEventRelevant)
+        with transaction.atomic():
+            self.create_event("Первая")
+            self.create_event("Вторая")
+            # счётчик не блокируется и не меняется до фиксации
+            self.assertEqual(get_table_versions(TradeEventRelevant), (before,))
+        self.assertEqual(get_table_versions(TradeEventRelevant), (before + 1,))
+
+        with transaction.atomic():
+            self.create_event("Третья")
+            transaction.set_rollback(True)
+        self.assertEqual(get_table_versions(TradeEventRelevant), (before + 1,))
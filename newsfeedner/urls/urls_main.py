@@ -11,7 +11,11 @@ from newsfeedner.views.views_dupl_search import GetDuplicated, AddDuplicated
 
 from newsfeedner.views.views_auth import GetTokenView
 from newsfeedner.views.views_filters import (
+    FacetsView,
+    FacetsViewRelevant,
     FiltersView,
+    FilterValuesView,
+    FilterValuesViewRelevant,
     FilterViewRelevant,
 )
 from newsfeedner.views.views_main import (
@@ -23,6 +27,8 @@ from newsfeedner.views.views_main import (
     # NewsList,
     NewsApiView,
     NewsApiViewApproval,
+    NewsBulkApiView,
+    NewsApprovalBulkApiView,
 )
 from newsfeedner.views.views_post_ids import (
     AddToExceptions,
@@ -50,6 +56,8 @@ urlpatterns = [
     # Добавлено 03.03.2023
     path("api_news/news", csrf_exempt(NewsApiView.as_view())),
     path("api_news/news_approval", csrf_exempt(NewsApiViewApproval.as_view())),
+    path("api_news/news_bulk", csrf_exempt(NewsBulkApiView.as_view())),
+    path("api_news/news_approval_bulk", csrf_exempt(NewsApprovalBulkApiView.as_view())),
     # path("api/events", csrf_exempt(EventApiViewRelevant.as_view())),
     path("api_news/news_relevant", csrf_exempt(EventApiViewRelevant.as_view())),
     # Конец добавлено
@@ -70,6 +78,8 @@ urlpatterns = [
     path("api_raw/get_countries", FiltersView.as_view(slug="get_countries")),
     path("api_raw/get_regions", FiltersView.as_view(slug="get_regions")),
     path("api_raw/get_product_branches", FiltersView.as_view(slug="get_product_branches")),
+    path("api_raw/get_filter_values", FilterValuesView.as_view()),
+    path("api_raw/get_facets", FacetsView.as_view()),
     # data from db table checked by annotator for approving by approver
     path("api_raw/add_to_approved", AddToApproval.as_view(), name="add_to_approved"),
     # path("api_approval/events", csrf_exempt(EventApiViewApproval.as_view())),
@@ -96,6 +106,8 @@ urlpatterns = [
         "api/get_product_branches",
         FilterViewRelevant.as_view(slug="get_product_branches"),
     ),
+    path("api/get_filter_values", FilterValuesViewRelevant.as_view()),
+    path("api/get_facets", FacetsViewRelevant.as_view()),
     path("get_token", GetTokenView.as_view(), name="get_token"),
     path("edit_status", EditStatusView.as_view(), name="edit_status"),
     path("duplicated/get", GetDuplicated.as_view(), name="get_duplicated"),
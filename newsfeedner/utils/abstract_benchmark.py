@@ -0,0 +1,178 @@
+import random
+import re
+import time
+from typing import AnyStr, Dict, List, Tuple
+
+import razdel
+
+from newsfeedner.utils.queryset_process import get_article_abstract, get_article_abstracts
+from newsfeedner.utils.lexicon import LEXICON
+from newsfeedner.utils.trade_utils import query_regions_dict
+
+ARTICLE_WORDS = (
+    "компания поставки экспорт импорт рост объём товаров рынок цены правительство заявил министр "
+    "торговли соглашение пошлины тонн миллионов долларов году сообщил представитель санкции "
+    "производство зерна нефти газа металлов"
+).split()
+
+
+def generate_articles(size: int, seed: int = 0) -> List[Tuple]:
+    """
+    Синтетические новости длиной как настоящие (заголовок и 10-40 предложений) с упоминаниями стран
+    в разных падежах, стоп-фразами, слипшимися предложениями и ссылками:
+    (article_body, search_countries, region_locations).
+    """
+    rng = random.Random(seed)
+    names = sorted(LEXICON.countries_and_regions)
+    # формы с другими окончаниями: усечённая основа всё равно совпадает
+    forms = [name[:-1] + ending for name in names for ending in ("", "и", "е", "ой", "у")]
+    stop_phrases = ("Читайте также:", "Читайте нас на: t.me/news", "Подробнее читайте в источнике", "ria.ru")
+
+    def sentence():
+        words = [rng.choice(ARTICLE_WORDS) for _ in range(rng.randint(8, 25))]
+        if rng.random() < 0.3:
+            words.insert(rng.randint(0, len(words)), rng.choice(forms))
+        return " ".join(words).capitalize() + rng.choice((". ", ".", "! "))
+
+    articles = []
+    for _ in range(size):
+        text = "".join(sentence() for _ in range(rng.randint(10, 40)))
+        if rng.random() < 0.2:
+            text += rng.choice(stop_phrases) + " " + sentence()
+        region_locations = rng.sample(sorted(query_regions_dict), rng.randint(0, 2)) or None
+        articles.append((sentence() + "\n\n" + text, rng.sample(names, rng.randint(1, 4)), region_locations))
+    return articles
+
+
+def get_article_abstract_reference(
+    article_body: str,
+    search_countries: List[str],
+    region_locations: List[str] = None,
+):
+    """
+    Прежняя реализация get_article_abstract - для сверки результатов и времени.
+    article_body - это title + "\n\n" + text
+    search_countries - список стран, каждая страна не обязательно из одного слова (['Турецкая Республика', 'Турция'])
+                    + могут быть прилагательные (['Сербия', 'Словакия', 'Турция', 'словацкие'])
+
+    """
+    stoplist_middle = [
+        "Читайте нас на:",
+    ]
+    stoplist_end = [
+        "Читайте также",
+        "Читайте нас в Telegram",
+        "Почему так произошло, читайте здесь",
+        "Читайте полный текст",
+        "Читайте еще",
+        "Полный текст статьи читайте",
+        "Полный текст интервью",
+        "Читайте ранее",
+        "Читайте подробнее",
+        "Подробнее по этой теме читайте",
+        "Подробнее читайте в",
+        "Все новости Белоруссии читайте на",
+        "Подписывайтесь на видео-новости",
+    ]
+    # подготовка строк локаций
+    search_countries_parts = []
+    for sc in search_countries:
+        if " " in sc:
+            for sc_part in sc.split():
+                search_countries_parts.append(sc_part)
+        else:
+            search_countries_parts.append(sc)
+    search_countries = [sc.lower()[:-1] for sc in search_countries_parts]
+
+    # очистка
+    for pattern in stoplist_middle:
+        article_body = re.sub(pattern, "", article_body, flags=re.I)
+    for pattern in stoplist_end:
+        article_body = re.sub(f"{pattern}.+", "", article_body, flags=re.I)
+
+    # добавить пробелы, если в изначальном тексте слипшиеся предложения
+    article_body = re.sub(r"\.([а-яА-яёЁa-zA-Z])", r". \1", article_body)
+
+    # разделение заголовка и текста новости
+    title = article_body
+    text = ""
+    for split_chars in ["\\n\\n", "\n\n"]:
+        if split_chars in article_body:
+            splited_text = article_body.split(split_chars)
+            if len(splited_text) <= 2:
+                title, text = splited_text
+            else:
+                title, text = splited_text[:2]
+
+    article_body = title
+    sents = []
+
+    # только предложения, содержащие указанные локации и регионы
+    if search_countries:
+        sents = razdel.sentenize(text)
+        if region_locations:
+            sents = [
+                s
+                for s in sents
+                if any(a.lower() in s.text.lower() for a in region_locations)
+                or any(sc in s.text.lower() for sc in search_countries)
+            ]
+        else:
+            sents = [
+                s for s in sents if any(sc in s.text.lower() for sc in search_countries)
+            ]
+
+        sents = [
+            s
+            for s in sents
+            if len(s.text) > 10
+            and (s.text not in title)
+            and (title not in s.text)  # без повторения заголовка
+            and not any(
+                [
+                    term in s.text
+                    for term in ["sputnik.", "ria.ru", "http", "Rosiya Segodnya"]
+                ]
+            )
+            # посторонний текст в спутнике и риа
+        ]
+        # Leave only 5 sentences
+        sents = sents[:5]
+
+        abstract = " ".join([s.text for s in sents])  # абстракт
+        if abstract:
+            article_body = title + ". " + abstract  # заголовок + абстракт
+    for s in sents:
+        # len("\\n\\n") == 4
+        s.start += len(title) + 4
+        s.stop += len(title) + 4
+    sents = [razdel.substring.Substring(0, len(title) + 1, title)] + sents
+
+    return article_body, sents
+
+
+
+def to_comparable(results: List[Tuple]) -> List[Tuple]:
+    return [(article_body, [(s.start, s.stop, s.text) for s in sents]) for article_body, sents in results]
+
+
+def run_benchmark(articles: List[Tuple], repeat: int = 1) -> Dict[AnyStr, float]:
+    """
+    Время (лучшее из repeat) прежней реализации, get_article_abstract по одной новости
+    и get_article_abstracts пачкой; identical - совпадают ли результаты.
+    """
+    functions = {
+        "reference": lambda: [get_article_abstract_reference(*article) for article in articles],
+        "single": lambda: [get_article_abstract(*article) for article in articles],
+        "batch": lambda: get_article_abstracts(articles),
+    }
+    timings, results = {}, {}
+    for name, function in functions.items():
+        for _ in range(repeat):
+            start = time.perf_counter()
+            results[name] = function()
+            elapsed = time.perf_counter() - start
+            timings[name] = min(timings.get(name, elapsed), elapsed)
+    reference = to_comparable(results["reference"])
+    timings["identical"] = all(to_comparable(results[name]) == reference for name in ("single", "batch"))
+    return timings
@@ -0,0 +1,108 @@
+import time
+from types import SimpleNamespace
+from typing import AnyStr, Dict, Iterable, List, Tuple
+
+from django.db import connection
+
+from newsfeedner.utils.queryset_process import (
+    get_article_abstracts,
+    process_text_locations,
+)
+
+# столбцы событий, которые считаются при записи (см. sql/0007_derived_fields.sql)
+DERIVED_FIELDS = ("classes_text", "locations_normalized", "abstract")
+# исходные поля, от которых зависят производные
+DERIVED_SOURCE_FIELDS = ("classes", "locations", "title")
+
+
+def get_classes_text(classes: List[AnyStr]) -> AnyStr:
+    # то же, что process_queryset_classes
+    return "; ".join(sorted(set("; ".join(classes).split("; "))))
+
+
+def get_derived_fields(events: Iterable) -> List[Dict[AnyStr, AnyStr]]:
+    """
+    Производные поля для событий (объектов с classes, locations, title):
+    classes_text - отношения через "; ", как в process_queryset_classes;
+    locations_normalized - известные локации из process_text_locations через ", ";
+    abstract - заголовок после get_article_abstract(title, locations).
+    """
+    events = list(events)
+    locations = [process_text_locations(event.locations)[0] for event in events]
+    abstracts = get_article_abstracts(
+        (event.title, event_locations) for event, event_locations in zip(events, locations)
+    )
+    return [
+        {
+            "classes_text": get_classes_text(event.classes),
+            "locations_normalized": ", ".join(event_locations),
+            "abstract": abstract,
+        }
+        for event, event_locations, (abstract, _) in zip(events, locations, abstracts)
+    ]
+
+
+def get_derived_rows(rows: List[Tuple]) -> List[Tuple]:
+    """
+    rows - (pk, classes, locations, title) -> (pk, производные поля).
+    Без обращений к базе, поэтому подходит для пула процессов.
+    """
+    events = [SimpleNamespace(classes=classes, locations=locations, title=title) for _, classes, locations, title in rows]
+    return [(row[0], fields) for row, fields in zip(rows, get_derived_fields(events))]
+
+
+def set_derived_fields(events: Iterable) -> None:
+    """
+    Заполняет производные поля объектов моделей событий перед записью.
+    """
+    events = list(events)
+    for event, fields in zip(events, get_derived_fields(events)):
+        for name, value in fields.items():
+            setattr(event, name, value)
+
+
+def update_derived_fields(model, rows: List[Tuple], derived: List[Dict[AnyStr, AnyStr]]) -> int:
+    """
+    rows - (pk, classes, locations, title), по которым посчитаны производные поля derived (в том же порядке).
+    Записывает их одним UPDATE ... FROM (VALUES ...) только в строки, где classes, locations и title
+    не изменились с момента чтения: строку, изменённую параллельно, уже пересчитал save()
+    или триггер сбросил её поля в NULL. Возвращает число обновлённых строк.
+    """
+    if not rows:
+        return 0
+    table = connection.ops.quote_name(model._meta.db_table)
+    values = ", ".join(["(%s::uuid, %s::text[], %s, %s, %s, %s, %s)"] * len(rows))
+    params = []
+    for (pk, classes, locations, title), fields in zip(rows, derived):
+        params += [str(pk), list(classes), locations, title, *(fields[name] for name in DERIVED_FIELDS)]
+    sql = (
+        f"UPDATE {table} AS t SET "
+        + ", ".join(f"{name} = v.{name}" for name in DERIVED_FIELDS)
+        + f" FROM (VALUES {values}) AS v(id, classes, locations, title, {', '.join(DERIVED_FIELDS)}) "
+        "WHERE t.id = v.id AND t.classes = v.classes AND t.locations = v.locations AND t.title = v.title"
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        return cursor.rowcount
+
+
+def fill_derived_fields(model, batch_size: int = 1000, on_batch=None) -> int:
+    """
+    Считает производные поля строк таблицы модели, где их ещё нет (abstract IS NULL),
+    пачками по batch_size в порядке id (запись - update_derived_fields). Возвращает число обновлённых строк.
+    on_batch(rows, seconds) вызывается после каждой пачки.
+    """
+    total = 0
+    last_pk = None
+    pending = model.objects.filter(abstract__isnull=True).order_by("pk").values_list("pk", *DERIVED_SOURCE_FIELDS)
+    while True:
+        batch = pending if last_pk is None else pending.filter(pk__gt=last_pk)
+        rows = list(batch[:batch_size])
+        if not rows:
+            return total
+        start = time.perf_counter()
+        updated = update_derived_fields(model, rows, [fields for _, fields in get_derived_rows(rows)])
+        total += updated
+        last_pk = rows[-1][0]
+        if on_batch is not None:
+            on_batch(updated, time.perf_counter() - start)
@@ -0,0 +1,172 @@
+import csv
+import gc
+import io
+import random
+import time
+import tracemalloc
+from collections import defaultdict
+from typing import AnyStr, Callable, Dict, Iterable, List, Tuple
+
+from django.db import connection
+
+from newsfeedner.utils.facet_store import FacetStore
+from newsfeedner.utils.filter_facets import FilterFacets
+from newsfeedner.utils.lexicon import LEXICON
+from newsfeedner.utils.trade_funcs import (
+    FILTER_TUPLES_SQL,
+    build_filter_facets,
+    get_country_regions,
+    get_query_dict,
+)
+from newsfeedner.utils.trade_utils import (
+    query_regions_dict,
+    relations,
+    smtk_products,
+)
+
+BENCHMARK_TABLE = "facet_benchmark_events"
+BUILDERS = ("facet_tuples", "query_dict", "build_filter_facets", "facet_store", "snapshot")
+
+
+def generate_event_rows(size: int, seed: int = 0) -> List[Tuple]:
+    """
+    Синтетические строки (classes, locations, smtk_codes) из настоящих справочников:
+    отношения - relations, локации - страны и регионы query_regions_dict
+    (иногда неизвестная локация), коды - товарные разделы и группы smtk_products.
+    """
+    rng = random.Random(seed)
+    all_relations = sorted(relations)
+    locations = sorted({country for countries in query_regions_dict.values() for country in countries})
+    locations += sorted(query_regions_dict) + ["Неизвестная страна"]
+    codes = [code for branch, products in smtk_products.items() for code in (branch, *products)]
+    rows = []
+    for _ in range(size):
+        rows.append(
+            (
+                rng.sample(all_relations, rng.choice((1, 1, 1, 2))),
+                ", ".join(rng.sample(locations, rng.choice((1, 1, 2, 3)))),
+                rng.sample(codes, rng.choice((1, 2, 2, 3))),
+            )
+        )
+    return rows
+
+
+def get_facet_tuples_from_rows(rows: Iterable[Tuple]) -> List[Tuple]:
+    """
+    То же, что FILTER_TUPLES_SQL, по строкам в памяти (без базы).
+    """
+    country_regions = defaultdict(list)
+    for country, region in zip(*get_country_regions()):
+        country_regions[country].append(region)
+    tuples = set()
+    for classes, locations, codes in rows:
+        if not classes or not locations or not codes:
+            continue
+        regions = [
+            (country, region)
+            for country in set(locations.split(", "))
+            for region in country_regions.get(country, ())
+        ]
+        products = [
+            (LEXICON.smtk_branches[int(code[0])], code.strip())
+            for code in set(codes)
+            if code and code[0] in "0123456789"
+        ]
+        for relation in set(classes):
+            for country, region in regions:
+                for branch, code in products:
+                    tuples.add((relation, region, country, branch, code))
+    return sorted(tuples)
+
+
+def to_array_literal(values: List[AnyStr]) -> str:
+    items = ('"' + value.replace("\\", "\\\\").replace('"', '\\"') + '"' for value in values)
+    return "{" + ",".join(items) + "}"
+
+
+def load_rows_to_postgres(rows: List[Tuple]) -> None:
+    """
+    Загружает строки во временную таблицу BENCHMARK_TABLE (COPY), таблица живёт до конца сессии.
+    """
+    data = io.StringIO()
+    writer = csv.writer(data)
+    for classes, locations, codes in rows:
+        writer.writerow((to_array_literal(classes), locations, to_array_literal(codes)))
+    data.seek(0)
+    with connection.cursor() as cursor:
+        cursor.execute(f"DROP TABLE IF EXISTS {BENCHMARK_TABLE}")
+        cursor.execute(f"CREATE TEMP TABLE {BENCHMARK_TABLE} (classes text[], locations text, smtk_codes text[])")
+        cursor.cursor.copy_expert(f"COPY {BENCHMARK_TABLE} FROM STDIN WITH (FORMAT csv)", data)
+        cursor.execute(f"ANALYZE {BENCHMARK_TABLE}")
+
+
+def get_facet_tuples_from_postgres() -> List[Tuple]:
+    with connection.cursor() as cursor:
+        cursor.execute(FILTER_TUPLES_SQL.format(table=BENCHMARK_TABLE), (list(LEXICON.smtk_branches), *get_country_regions()))
+        return cursor.fetchall()
+
+
+def measure(function: Callable, repeat: int = 1) -> Tuple[object, Dict[AnyStr, float]]:
+    """
+    Время (лучшее из repeat запусков) и пик памяти Python (tracemalloc, отдельный запуск) функции.
+    """
+    seconds = None
+    for _ in range(repeat):
+        gc.collect()
+        start = time.perf_counter()
+        result = function()
+        elapsed = time.perf_counter() - start
+        seconds = elapsed if seconds is None else min(seconds, elapsed)
+        del result
+    gc.collect()
+    tracemalloc.start()
+    try:
+        result = function()
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return result, {"seconds": round(seconds, 4), "peak_mb": round(peak / 2 ** 20, 2)}
+
+
+def run_benchmark(rows: List[Tuple], source: AnyStr, repeat: int = 1) -> Dict[AnyStr, Dict[AnyStr, float]]:
+    """
+    Замеры построителей данных фильтров на строках rows.
+    source - "memory" (сочетания считаются в Python) или "postgres" (FILTER_TUPLES_SQL по временной таблице).
+    """
+    results = {}
+    if source == "postgres":
+        load_rows_to_postgres(rows)
+        tuples, results["facet_tuples"] = measure(get_facet_tuples_from_postgres, repeat)
+    else:
+        tuples, results["facet_tuples"] = measure(lambda: get_facet_tuples_from_rows(rows), repeat)
+    query_dict, results["query_dict"] = measure(lambda: get_query_dict(tuples), repeat)
+    _, results["build_filter_facets"] = measure(lambda: build_filter_facets(query_dict), repeat)
+    _, results["facet_store"] = measure(lambda: FacetStore.from_rows(tuples), repeat)
+    _, results["snapshot"] = measure(lambda: FilterFacets.from_rows(None, tuples), repeat)
+    for metrics in results.values():
+        metrics["tuples"] = len(tuples)
+    return results
+
+
+def find_regressions(results: Dict, baseline: Dict, tolerance: float) -> List[AnyStr]:
+    """
+    Сравнивает замеры {source: {size: {builder: metrics}}} с базовыми.
+    Регрессия - время или память больше базовых более чем в (1 + tolerance) раз
+    (с небольшим абсолютным запасом для маленьких значений).
+    """
+    slack = {"seconds": 0.01, "peak_mb": 1.0}
+    regressions = []
+    for source, sizes in results.items():
+        for size, builders in sizes.items():
+            for builder, metrics in builders.items():
+                base = baseline.get(source, {}).get(size, {}).get(builder)
+                if not base:
+                    continue
+                for metric, extra in slack.items():
+                    limit = base[metric] * (1 + tolerance) + extra
+                    if metrics[metric] > limit:
+                        regressions.append(
+                            f"{source} {size} {builder}: {metric} {metrics[metric]} > {limit:.4f} "
+                            f"(baseline {base[metric]})"
+                        )
+    return regressions
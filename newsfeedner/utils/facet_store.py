@@ -0,0 +1,84 @@
+import base64
+import json
+from typing import AnyStr, Dict, Iterable, List, Tuple
+
+FACET_STORE_DIMENSIONS = ("relation", "region", "country", "product_branch", "product")
+
+
+class FacetStore:
+    """
+    Компактное хранилище сочетаний (отношение, регион, страна, товарный раздел, товарная группа).
+    Значения каждого измерения заменены целыми id, для каждого значения хранится битовая маска
+    (int) номеров сочетаний, в которых оно встречается. Отбор по любым фильтрам - пересечение
+    масок (&), без перестроения: например, страны с группой X при отношении Y -
+    values("country", relation=["Y"], product=["X"]).
+    """
+
+    def __init__(self, size: int, names: Dict[AnyStr, List[AnyStr]], bitsets: Dict[AnyStr, List[int]]):
+        self.size = size
+        self.names = names
+        self.bitsets = bitsets
+        self.ids = {dimension: {name: i for i, name in enumerate(names[dimension])} for dimension in names}
+
+    @classmethod
+    def from_rows(cls, rows: List[Tuple]):
+        """
+        rows - различные сочетания в порядке FACET_STORE_DIMENSIONS (get_facet_tuples).
+        """
+        names, bitsets = {}, {}
+        for column, dimension in enumerate(FACET_STORE_DIMENSIONS):
+            ids = {}
+            bits = []
+            for row_number, row in enumerate(rows):
+                value_id = ids.setdefault(row[column], len(ids))
+                if value_id == len(bits):
+                    bits.append(bytearray((len(rows) + 7) // 8))
+                bits[value_id][row_number >> 3] |= 1 << (row_number & 7)
+            names[dimension] = list(ids)
+            bitsets[dimension] = [int.from_bytes(value_bits, "little") for value_bits in bits]
+        return cls(len(rows), names, bitsets)
+
+    def get_mask(self, **filters: Iterable[AnyStr]) -> int:
+        """
+        Маска сочетаний, подходящих под фильтры: внутри измерения - любое из значений,
+        между измерениями - все сразу. Пустой фильтр измерения не ограничивает.
+        """
+        mask = (1 << self.size) - 1
+        for dimension, values in filters.items():
+            if not values:
+                continue
+            ids = self.ids[dimension]
+            dimension_mask = 0
+            for value in values:
+                if value in ids:
+                    dimension_mask |= self.bitsets[dimension][ids[value]]
+            mask &= dimension_mask
+        return mask
+
+    def values(self, dimension: AnyStr, **filters: Iterable[AnyStr]) -> List[AnyStr]:
+        """
+        Отсортированные значения измерения, встречающиеся в сочетаниях под фильтрами.
+        """
+        mask = self.get_mask(**filters)
+        names = self.names[dimension]
+        return sorted(names[i] for i, bits in enumerate(self.bitsets[dimension]) if bits & mask)
+
+    def to_bytes(self) -> bytes:
+        bitsets = {
+            dimension: [
+                base64.b64encode(bits.to_bytes((bits.bit_length() + 7) // 8, "little")).decode("ascii")
+                for bits in dimension_bitsets
+            ]
+            for dimension, dimension_bitsets in self.bitsets.items()
+        }
+        data = {"size": self.size, "names": self.names, "bitsets": bitsets}
+        return json.dumps(data, ensure_ascii=False).encode("utf-8")
+
+    @classmethod
+    def from_bytes(cls, body: bytes):
+        data = json.loads(body)
+        bitsets = {
+            dimension: [int.from_bytes(base64.b64decode(bits), "little") for bits in dimension_bitsets]
+            for dimension, dimension_bitsets in data["bitsets"].items()
+        }
+        return cls(data["size"], data["names"], bitsets)
@@ -0,0 +1,83 @@
+from collections import defaultdict
+from typing import AnyStr, Dict, List, Tuple
+
+from django.db import connection
+
+from newsfeedner.models import EVENT_LOCATION_MODELS
+from newsfeedner.utils.lexicon import LEXICON
+
+FACET_DIMENSIONS = ("relation", "region", "country", "product_branch", "product")
+
+# один запрос: отношения - по unnest(classes), регион и страна - GROUPING SETS по таблице локаций,
+# товарный раздел и группа - GROUPING SETS по unnest(smtk_codes) и справочнику раздел - код
+FACETS_SQL = """
+WITH ev AS MATERIALIZED ({events_sql})
+SELECT 'total', NULL, count(*) FROM ev
+UNION ALL
+SELECT 'relation', r.relation, count(DISTINCT ev.id)
+FROM ev CROSS JOIN unnest(ev.classes) AS r(relation)
+GROUP BY r.relation
+UNION ALL
+SELECT
+    CASE WHEN grouping(l.country) = 1 THEN 'region' ELSE 'country' END,
+    CASE WHEN grouping(l.country) = 1 THEN l.region ELSE l.country END,
+    count(DISTINCT l.event_id)
+FROM ev JOIN {locations_table} AS l ON l.event_id = ev.id
+GROUP BY GROUPING SETS ((l.region), (l.country))
+UNION ALL
+SELECT
+    CASE WHEN grouping(c.code) = 1 THEN 'product_branch' ELSE 'product' END,
+    CASE WHEN grouping(c.code) = 1 THEN m.branch ELSE c.code END,
+    count(DISTINCT ev.id)
+FROM ev
+CROSS JOIN unnest(ev.smtk_codes) AS c(code)
+LEFT JOIN unnest(%s::text[], %s::text[]) AS m(branch, code) ON m.code = c.code
+GROUP BY GROUPING SETS ((m.branch), (c.code))
+"""
+
+
+def get_branch_codes() -> Tuple[List[AnyStr], List[AnyStr]]:
+    """
+    Возвращает пары (товарный раздел, код) в виде двух списков.
+    Раздел сам входит в свои коды - так же, как в фильтре filter_queryset_by_product.
+    """
+    branches, codes = [], []
+    for branch, products in LEXICON.smtk_products.items():
+        for code in (branch, *products):
+            branches.append(branch)
+            codes.append(code)
+    return branches, codes
+
+
+def get_facet_counts(queryset) -> Dict:
+    """
+    Возвращает число событий queryset для каждого значения фильтров:
+    {"total": n,
+     "relation": {отношение: n},
+     "region": {регион: n},
+     "country": {страна: n},
+     "product_branch": {товарный раздел: n},
+     "product": {товарная группа: n}}
+    Значения отсортированы по убыванию числа событий.
+    Считается одним запросом к базе, queryset не выполняется отдельно.
+    """
+    events_sql, events_params = queryset.order_by().values("id", "classes", "smtk_codes").query.sql_with_params()
+    locations_table = connection.ops.quote_name(EVENT_LOCATION_MODELS[queryset.model]._meta.db_table)
+    sql = FACETS_SQL.format(events_sql=events_sql, locations_table=locations_table)
+    with connection.cursor() as cursor:
+        cursor.execute(sql, (*events_params, *get_branch_codes()))
+        rows = cursor.fetchall()
+
+    total = 0
+    facets = defaultdict(list)
+    for dimension, value, count in rows:
+        if dimension == "total":
+            total = count
+        elif value and not (dimension == "product" and value in LEXICON.smtk_products):
+            facets[dimension].append((value, count))
+
+    result = {"total": total}
+    for dimension in FACET_DIMENSIONS:
+        values = sorted(facets[dimension], key=lambda item: (-item[1], item[0]))
+        result[dimension] = dict(values)
+    return result
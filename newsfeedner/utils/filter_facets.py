@@ -0,0 +1,310 @@
+import gzip
+import logging
+import threading
+import time
+from contextlib import contextmanager
+
+import django.db
+from django.conf import settings
+from django.db import connection, transaction
+from rest_framework.renderers import JSONRenderer
+
+from newsfeedner.models import TradeFilterSnapshot
+from newsfeedner.utils.response_cache import get_cached_response_data, get_table_versions, get_versions
+from newsfeedner.utils.facet_store import FacetStore
+from newsfeedner.utils.lexicon import LEXICON
+from newsfeedner.utils.trade_funcs import build_filter_facets, get_facet_tuples, get_query_dict
+
+logger = logging.getLogger(__name__)
+
+# slug фильтра -> данные из build_filter_facets
+FILTER_SLUGS = {
+    "get_region_relations": "region_relations",
+    "get_region_countries": "region_countries",
+    "get_relation_countries": "relation_countries",
+    "get_country_products": "country_products",
+    "get_countries": "countries",
+    "get_product_branches": "product_branches",
+    "get_regions": "regions",
+}
+# строка снимка с хранилищем сочетаний FacetStore
+FACET_STORE_SLUG = "facet_store"
+# формат сохранённого снимка: увеличивается при изменении тел ответов или FacetStore.to_bytes,
+# снимки прежнего формата (как и построенные по другой версии справочников) считаются отсутствующими
+SNAPSHOT_FORMAT_VERSION = 1
+
+
+class FilterFacets:
+    """
+    Снимок данных для фильтров (api_raw/get_*, api/get_*) по таблице событий:
+    готовые тела ответов в JSON (и в gzip) по slug, без рендеринга на каждый запрос,
+    и хранилище сочетаний FacetStore для отбора значений по произвольным фильтрам.
+    После создания не изменяется: при обновлении строится новый снимок.
+    version - версия таблицы (trade_news_table_versions), на момент которой снят снимок.
+    """
+
+    def __init__(self, version, bodies, gzip_bodies, store):
+        self.version = version
+        self.bodies = bodies
+        self.gzip_bodies = gzip_bodies
+        self.store = store
+
+    @property
+    def build_version(self):
+        # тела ответов зависят от данных, формата снимка и справочников - ETag меняется при смене любого из них
+        return self.version, SNAPSHOT_FORMAT_VERSION, LEXICON.version
+
+    def get_body(self, slug):
+        return self.bodies.get(slug)
+
+    def get_gzip_body(self, slug):
+        return self.gzip_bodies.get(slug)
+
+    @classmethod
+    def from_rows(cls, version, rows):
+        """
+        rows - сочетания из get_facet_tuples.
+        """
+        renderer = JSONRenderer()
+        facets = build_filter_facets(get_query_dict(rows))
+        bodies, gzip_bodies = {}, {}
+        for slug, name in FILTER_SLUGS.items():
+            bodies[slug] = renderer.render(facets[name])
+            if settings.FILTER_FACETS_GZIP:
+                gzip_bodies[slug] = gzip.compress(bodies[slug])
+        return cls(version, bodies, gzip_bodies, FacetStore.from_rows(rows))
+
+    @classmethod
+    def load(cls, model):
+        """
+        Сохранённый снимок таблицы модели (trade_news_filter_snapshots) или None.
+        Снимок другого формата или версии справочников, без хранилища сочетаний
+        или с нечитаемым хранилищем считается отсутствующим.
+        """
+        rows = TradeFilterSnapshot.objects.filter(
+            table_name=model._meta.db_table,
+            format_version=SNAPSHOT_FORMAT_VERSION,
+            lexicon_version=LEXICON.version,
+        )
+        rows = list(rows.values_list("slug", "version", "body", "body_gzip"))
+        bodies = {slug: bytes(body) for slug, _, body, _ in rows}
+        gzip_bodies = {slug: bytes(body_gzip) for slug, _, _, body_gzip in rows if body_gzip is not None}
+        store_body = bodies.pop(FACET_STORE_SLUG, None)
+        if store_body is None:
+            return None
+        try:
+            store = FacetStore.from_bytes(store_body)
+        except (ValueError, KeyError, TypeError) as err:
+            logger.warning("Filter facets snapshot for %s is not decoded: %s", model._meta.db_table, err)
+            return None
+        return cls(rows[0][1], bodies, gzip_bodies, store)
+
+    def save(self, model):
+        table_name = model._meta.db_table
+        with transaction.atomic():
+            TradeFilterSnapshot.objects.filter(table_name=table_name).delete()
+            bodies = {**self.bodies, FACET_STORE_SLUG: self.store.to_bytes()}
+            TradeFilterSnapshot.objects.bulk_create(
+                TradeFilterSnapshot(
+                    table_name=table_name,
+                    slug=slug,
+                    version=self.version,
+                    format_version=SNAPSHOT_FORMAT_VERSION,
+                    lexicon_version=LEXICON.version,
+                    body=body,
+                    body_gzip=self.gzip_bodies.get(slug),
+                )
+                for slug, body in bodies.items()
+            )
+
+
+class WindowFilterFacets:
+    """
+    Данные фильтров по событиям периода из дневной сводки (trade_news_facet_days).
+    В отличие от FilterFacets ничего не строится заранее: тело ответа (и gzip) рендерится
+    только для запрошенного slug, FacetStore - только для get_filter_values.
+    Готовые части кэшируются по отдельности, по версии сводки, формата и справочников и периоду.
+    version - счётчик '<таблица>_facet_days', он меняется только при изменении сводки.
+    """
+
+    def __init__(self, model, version, start_date, end_date):
+        self.model = model
+        self.version = version
+        self.start_date = start_date
+        self.end_date = end_date
+        # в ключе и версии формата и справочников: кэш прежнего деплоя не читается
+        self.cache_key = (
+            f"filter_facets:{model._meta.db_table}:{version}:{SNAPSHOT_FORMAT_VERSION}:{LEXICON.version}"
+            f":{start_date}:{end_date}"
+        )
+        self._rows = None
+
+    @property
+    def build_version(self):
+        # тела ответов зависят от данных, формата снимка и справочников - ETag меняется при смене любого из них
+        return self.version, SNAPSHOT_FORMAT_VERSION, LEXICON.version
+
+    def get_rows(self):
+        # сочетания периода запрашиваются не больше одного раза на запрос
+        if self._rows is None:
+            self._rows = get_facet_tuples(self.model, self.start_date, self.end_date)
+        return self._rows
+
+    def get_bodies(self, slug):
+        name = FILTER_SLUGS.get(slug)
+        if name is None:
+            return None, None
+
+        def render():
+            body = JSONRenderer().render(build_filter_facets(get_query_dict(self.get_rows()))[name])
+            return body, gzip.compress(body) if settings.FILTER_FACETS_GZIP else None
+
+        return get_cached_response_data(f"{self.cache_key}:{slug}", render)
+
+    def get_body(self, slug):
+        return self.get_bodies(slug)[0]
+
+    def get_gzip_body(self, slug):
+        return self.get_bodies(slug)[1]
+
+    @property
+    def store(self):
+        return get_cached_response_data(
+            f"{self.cache_key}:{FACET_STORE_SLUG}", lambda: FacetStore.from_rows(self.get_rows())
+        )
+
+
+@contextmanager
+def advisory_lock(name, wait):
+    """
+    Блокировка PostgreSQL (pg_advisory_lock) на время блока, общая для всех процессов.
+    Без ожидания (wait=False) отдаёт False, если блокировка занята.
+    """
+    with connection.cursor() as cursor:
+        if wait:
+            cursor.execute("SELECT pg_advisory_lock(hashtext(%s))", [name])
+            acquired = True
+        else:
+            cursor.execute("SELECT pg_try_advisory_lock(hashtext(%s))", [name])
+            acquired = cursor.fetchone()[0]
+    try:
+        yield acquired
+    finally:
+        if acquired:
+            with connection.cursor() as cursor:
+                cursor.execute("SELECT pg_advisory_unlock(hashtext(%s))", [name])
+
+
+class FacetIndex:
+    """
+    Данные фильтров по таблице событий в памяти процесса.
+    Снимок строится не при импорте, а фоновым потоком при первом обращении.
+    Строит его один процесс (под блокировкой базы) и сохраняет в trade_news_filter_snapshots,
+    остальные воркеры читают сохранённый снимок.
+    Пока новый снимок строится, запросы получают последний сохранённый
+    (ждут построения, только если сохранённого снимка ещё нет).
+    Далее поток раз в FILTER_FACETS_REFRESH_INTERVAL секунд сверяет версию таблицы
+    и при изменении подменяет снимок целиком - запросы всегда читают готовый снимок из памяти.
+    """
+
+    def __init__(self, model):
+        self.model = model
+        self.snapshot = None
+        self.lock_name = f"filter_facets:{model._meta.db_table}"
+        self._lock = threading.Lock()
+        self._snapshot_lock = threading.Lock()
+        self._refresher = None
+
+    def build(self, version) -> FilterFacets:
+        return FilterFacets.from_rows(version, get_facet_tuples(self.model))
+
+    def load_persisted(self):
+        """
+        Последний сохранённый снимок или None.
+        """
+        try:
+            return FilterFacets.load(self.model)
+        except django.db.Error as err:
+            logger.warning("Filter facets for %s are not loaded: %s", self.model._meta.db_table, err)
+            return None
+
+    def build_shared(self, version, wait):
+        """
+        Строит и сохраняет снимок, если его ещё не построил другой процесс.
+        Если блокировка занята и ждать не нужно - возвращает None (снимок возьмём при следующей проверке).
+        """
+        with advisory_lock(self.lock_name, wait) as acquired:
+            if not acquired:
+                return None
+            snapshot = FilterFacets.load(self.model)
+            if snapshot is None or snapshot.version < version:
+                snapshot = self.build(version)
+                snapshot.save(self.model)
+            return snapshot
+
+    def set_snapshot(self, snapshot, if_empty=False):
+        with self._snapshot_lock:
+            if not if_empty or self.snapshot is None:
+                self.snapshot = snapshot
+
+    def refresh(self):
+        """
+        Обновляет снимок, если версия таблицы изменилась.
+        При ошибке базы остаётся прежний снимок (или пустой, если его ещё нет).
+        """
+        with self._lock:
+            try:
+                version = get_table_versions(self.model)[0]
+                if self.snapshot is not None and self.snapshot.version == version:
+                    return
+                snapshot = FilterFacets.load(self.model)
+                if snapshot is None or snapshot.version < version:
+                    wait = snapshot is None and self.snapshot is None
+                    snapshot = self.build_shared(version, wait) or snapshot
+                if snapshot is not None:
+                    self.set_snapshot(snapshot)
+            except django.db.Error as err:
+                logger.warning("Filter facets for %s are not refreshed: %s", self.model._meta.db_table, err)
+                self.set_snapshot(FilterFacets.from_rows(None, []), if_empty=True)
+
+    def run_refresher(self):
+        interval = settings.FILTER_FACETS_REFRESH_INTERVAL
+        while True:
+            try:
+                self.refresh()
+            except Exception:
+                # поток не должен завершаться: иначе процесс до перезапуска отдаёт устаревшие фильтры
+                logger.exception("Filter facets for %s are not refreshed", self.model._meta.db_table)
+            finally:
+                # у потока своё соединение с базой, между проверками оно не держится
+                connection.close()
+            time.sleep(interval)
+
+    def start_refresher(self):
+        if self._refresher is not None:
+            return
+        with self._snapshot_lock:
+            if self._refresher is None:
+                self._refresher = threading.Thread(
+                    target=self.run_refresher,
+                    name=f"facets-{self.model._meta.db_table}",
+                    daemon=True,
+                )
+                self._refresher.start()
+
+    def get_window_snapshot(self, start_date, end_date) -> WindowFilterFacets:
+        """
+        Данные фильтров по событиям периода [start_date, end_date] из дневной сводки.
+        Версия - счётчик сводки: записи, не меняющие её (статус, проверка), кэш периода не сбрасывают.
+        """
+        version = get_versions(f"{self.model._meta.db_table}_facet_days")[0]
+        return WindowFilterFacets(self.model, version, start_date, end_date)
+
+    def get_snapshot(self) -> FilterFacets:
+        if self.snapshot is None:
+            self.start_refresher()
+            self.set_snapshot(self.load_persisted(), if_empty=True)
+        if self.snapshot is None:
+            # сохранённого снимка нет - ждём первого построения
+            self.refresh()
+        return self.snapshot
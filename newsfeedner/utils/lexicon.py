@@ -0,0 +1,86 @@
+import hashlib
+import json
+from types import MappingProxyType
+
+from newsfeedner.utils import trade_utils
+
+
+class Lexicon:
+    """
+    Справочники trade_utils.py в неизменяемом виде с готовыми индексами.
+    Собирается один раз при импорте модуля и дальше только читается, в том числе из потоков
+    и воркеров после fork; изменить его (и исходные словари через него) нельзя.
+    version - хэш исходных справочников, меняется при любой их правке в trade_utils.py
+    (по нему можно понять, что сохранённые производные данные устарели).
+
+    regions - регион -> страны, country_regions - страна -> регионы (обратный индекс),
+    countries_and_regions - все названия, names_upper_case - названия-аббревиатуры,
+    loc_dict - словоформа -> название, loc_forms - словоформа или название в нижнем регистре -> названия,
+    stoplist, relations - множества, smtk_branches - товарные разделы по порядку (индекс - первая цифра кода),
+    smtk_product_all - разделы и группы в порядке справочника, smtk_product_set - то же для проверки "in".
+    """
+
+    __slots__ = (
+        "version",
+        "regions",
+        "country_regions",
+        "countries_and_regions",
+        "names_upper_case",
+        "loc_dict",
+        "loc_forms",
+        "stoplist",
+        "relations",
+        "smtk_products",
+        "smtk_branches",
+        "smtk_product_all",
+        "smtk_product_set",
+    )
+
+    def __init__(self, query_regions_dict, loc_dict, stoplist, relations, smtk_products):
+        country_regions = {}
+        for region, countries in query_regions_dict.items():
+            for country in countries:
+                country_regions.setdefault(country, set()).add(region)
+        countries_and_regions = frozenset(query_regions_dict) | frozenset(country_regions)
+        # названия из loc_dict в нижнем регистре тоже считаются словоформами
+        loc_forms = {form: tuple(value.split(", ")) for form, value in loc_dict.items()}
+        loc_forms.update({value.lower(): tuple(value.split(", ")) for value in loc_dict.values()})
+        products = sorted({product for branch_products in smtk_products.values() for product in branch_products})
+        smtk_product_all = (*smtk_products, *products)
+
+        source = [query_regions_dict, loc_dict, sorted(stoplist), sorted(relations), smtk_products]
+        values = {
+            "version": hashlib.sha256(json.dumps(source, ensure_ascii=False).encode("utf-8")).hexdigest()[:16],
+            "regions": MappingProxyType({region: tuple(countries) for region, countries in query_regions_dict.items()}),
+            "country_regions": MappingProxyType(
+                {country: frozenset(regions) for country, regions in country_regions.items()}
+            ),
+            "countries_and_regions": countries_and_regions,
+            "names_upper_case": frozenset(name for name in countries_and_regions if name.isupper()),
+            "loc_dict": MappingProxyType(dict(loc_dict)),
+            "loc_forms": MappingProxyType(loc_forms),
+            "stoplist": frozenset(stoplist),
+            "relations": frozenset(relations),
+            "smtk_products": MappingProxyType({branch: tuple(products) for branch, products in smtk_products.items()}),
+            "smtk_branches": tuple(smtk_products),
+            "smtk_product_all": smtk_product_all,
+            "smtk_product_set": frozenset(smtk_product_all),
+        }
+        for name, value in values.items():
+            object.__setattr__(self, name, value)
+
+    def __setattr__(self, name, value):
+        raise AttributeError("Lexicon is read-only")
+
+    @classmethod
+    def from_trade_utils(cls):
+        return cls(
+            trade_utils.query_regions_dict,
+            trade_utils.loc_dict,
+            trade_utils.stoplist,
+            trade_utils.relations,
+            trade_utils.smtk_products,
+        )
+
+
+LEXICON = Lexicon.from_trade_utils()
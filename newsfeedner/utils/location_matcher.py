@@ -0,0 +1,118 @@
+from collections import deque
+from typing import AnyStr, Dict, Iterable, Set, Tuple
+
+from newsfeedner.utils.lexicon import LEXICON
+
+# с какого числа шаблонов проход автомата быстрее, чем поиск подстрок по каждому шаблону
+# (замер на предложениях новостей: 20k предложений - автомат 0.69 с, 128 шаблонов in - 0.61 с)
+AUTOMATON_MIN_PATTERNS = 150
+
+
+class LocationMatcher:
+    """
+    Автомат Ахо-Корасик по словарю локаций: за один проход по тексту находит все вхождения
+    всех шаблонов (в том числе перекрывающиеся), то есть ровно те шаблоны p, для которых p in text.
+    Переходы достроены по суффиксным ссылкам заранее, поэтому на символ текста - один поиск в dict.
+    locations - шаблон (целая словоформа) -> названия локаций, forms - то же только для словоформ loc_dict.
+    """
+
+    def __init__(
+        self,
+        patterns: Iterable[AnyStr],
+        locations: Dict[AnyStr, Tuple[AnyStr, ...]] = None,
+        forms: Dict[AnyStr, Tuple[AnyStr, ...]] = None,
+    ):
+        self.patterns = frozenset(p for p in patterns if p)
+        self.locations = locations or {}
+        self.forms = forms or {}
+        goto = [{}]
+        outputs = [set()]
+        for pattern in self.patterns:
+            state = 0
+            for char in pattern:
+                next_state = goto[state].get(char)
+                if next_state is None:
+                    next_state = len(goto)
+                    goto[state][char] = next_state
+                    goto.append({})
+                    outputs.append(set())
+                state = next_state
+            outputs[state].add(pattern)
+
+        # обход в ширину: суффиксные ссылки, выходы по ним и полные таблицы переходов
+        fail = [0] * len(goto)
+        transitions = [None] * len(goto)
+        transitions[0] = dict(goto[0])
+        queue = deque(goto[0].values())
+        while queue:
+            state = queue.popleft()
+            transitions[state] = {**transitions[fail[state]], **goto[state]}
+            for char, next_state in goto[state].items():
+                fail[next_state] = transitions[fail[state]].get(char, 0) if state else 0
+                queue.append(next_state)
+            outputs[state] |= outputs[fail[state]]
+        self._transitions = transitions
+        self._outputs = [frozenset(output) if output else None for output in outputs]
+
+    @classmethod
+    def from_lexicon(cls):
+        """
+        Шаблоны: названия стран и регионов, словоформы loc_dict и их названия (в нижнем регистре)
+        и усечённые основы слов названий (без последней буквы), как в get_article_abstract.
+        """
+        forms = LEXICON.loc_forms
+        locations = {name.lower(): (name,) for name in LEXICON.countries_and_regions}
+        locations.update(forms)
+        names = {name for value in locations.values() for name in value}
+        patterns = set(locations)
+        for name in names | set(LEXICON.loc_dict):
+            patterns.update(part.lower()[:-1] for part in name.split())
+        return cls(patterns, locations, forms)
+
+    def __contains__(self, pattern: AnyStr) -> bool:
+        return pattern in self.patterns
+
+    def find(self, text: AnyStr) -> Set[AnyStr]:
+        """
+        Шаблоны, входящие в text (text должен быть в нижнем регистре).
+        """
+        transitions = self._transitions
+        outputs = self._outputs
+        found = set()
+        state = 0
+        for char in text:
+            state = transitions[state].get(char, 0)
+            if outputs[state] is not None:
+                found |= outputs[state]
+        return found
+
+    def contains_any(self, text: AnyStr, patterns: Set[AnyStr]) -> bool:
+        """
+        Есть ли в text (в нижнем регистре) хотя бы один из patterns.
+        Для многих шаблонов - один проход автомата (шаблоны не из словаря ищутся подстрокой),
+        для нескольких - поиск подстрок быстрее.
+        """
+        if len(patterns) < AUTOMATON_MIN_PATTERNS:
+            return any(p in text for p in patterns)
+        return not patterns.isdisjoint(self.find(text)) or any(
+            p in text for p in patterns if p not in self.patterns
+        )
+
+    def find_locations(self, text: AnyStr) -> Set[AnyStr]:
+        """
+        Названия локаций, целые словоформы которых встречаются в text (в нижнем регистре).
+        """
+        found = set()
+        for pattern in self.find(text):
+            found.update(self.locations.get(pattern, ()))
+        return found
+
+    def get_locations(self, form: AnyStr) -> Tuple[AnyStr, ...]:
+        """
+        Названия локаций для нормальной формы в нижнем регистре по loc_dict
+        (пустой кортеж, если её там нет).
+        """
+        return self.forms.get(form, ())
+
+
+location_matcher = LocationMatcher.from_lexicon()
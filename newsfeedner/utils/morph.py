@@ -0,0 +1,22 @@
+import threading
+
+import pymorphy2
+
+_morph = None
+_morph_lock = threading.Lock()
+
+
+def get_morph() -> pymorphy2.MorphAnalyzer:
+    """
+    Один MorphAnalyzer на процесс, словари загружаются при первом обращении
+    (запросы и команды, которым морфология не нужна, их не загружают).
+    После загрузки анализатор только читается, поэтому общий для всех потоков.
+    В gunicorn с --preload и MORPH_PRELOAD=1 загружается в мастере до fork (см. wsgi.py),
+    и страницы словарей остаются общими для воркеров.
+    """
+    global _morph
+    if _morph is None:
+        with _morph_lock:
+            if _morph is None:
+                _morph = pymorphy2.MorphAnalyzer()
+    return _morph
@@ -0,0 +1,102 @@
+import logging
+import threading
+from collections import OrderedDict
+from typing import AnyStr, Dict
+
+import django.db
+from django.db import connection
+
+from newsfeedner.models import TradeNormalForm
+
+logger = logging.getLogger(__name__)
+
+
+class NormalFormCache:
+    """
+    Кэш нормальных форм pymorphy2 (morph.parse(word)[0].normal_form) по словоформе.
+    Ограничен maxsize записями (вытесняются давно не использованные), потокобезопасен,
+    считает попадания и промахи. Может быть заполнен заранее из trade_news_normal_forms (load)
+    и сохранён туда же (save), чтобы следующий процесс не разбирал те же формы заново.
+    get_morph - функция, возвращающая анализатор: он нужен только при промахе.
+    """
+
+    def __init__(self, get_morph, maxsize: int):
+        self.get_morph = get_morph
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()
+        # формы, разобранные после последних load/save: только их записывает save
+        self._unsaved = {}
+        self._lock = threading.Lock()
+
+    def get(self, word: AnyStr) -> AnyStr:
+        with self._lock:
+            normal_form = self._data.get(word)
+            if normal_form is not None:
+                self._data.move_to_end(word)
+                self.hits += 1
+                return normal_form
+            self.misses += 1
+        # разбор - вне блокировки, одновременный разбор одной формы безвреден
+        normal_form = self.get_morph().parse(word)[0].normal_form
+        self.put(word, normal_form, unsaved=True)
+        return normal_form
+
+    def put(self, word: AnyStr, normal_form: AnyStr, unsaved: bool = False) -> None:
+        with self._lock:
+            self._data[word] = normal_form
+            self._data.move_to_end(word)
+            if unsaved:
+                self._unsaved[word] = normal_form
+            while len(self._data) > self.maxsize:
+                evicted, _ = self._data.popitem(last=False)
+                self._unsaved.pop(evicted, None)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            requests = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / requests, 4) if requests else 0.0,
+                "size": len(self._data),
+                "maxsize": self.maxsize,
+            }
+
+    def load(self) -> int:
+        """
+        Заполняет кэш сохранёнными формами (не больше maxsize). Возвращает число загруженных.
+        """
+        try:
+            pairs = list(TradeNormalForm.objects.values_list("word", "normal_form")[:self.maxsize])
+        except django.db.Error as err:
+            logger.warning("Normal forms are not loaded: %s", err)
+            return 0
+        for word, normal_form in pairs:
+            self.put(word, normal_form)
+        return len(pairs)
+
+    def save(self, batch_size: int = 5000) -> int:
+        """
+        Сохраняет в trade_news_normal_forms формы, разобранные после последних load/save
+        (INSERT ... ON CONFLICT DO NOTHING: формы, уже записанные другим процессом, пропускаются).
+        Возвращает число записанных строк.
+        """
+        with self._lock:
+            pairs = list(self._unsaved.items())
+        table = connection.ops.quote_name(TradeNormalForm._meta.db_table)
+        written = 0
+        with connection.cursor() as cursor:
+            for start in range(0, len(pairs), batch_size):
+                batch = pairs[start:start + batch_size]
+                cursor.execute(
+                    f"INSERT INTO {table} (word, normal_form) VALUES {', '.join(['(%s, %s)'] * len(batch))} "
+                    "ON CONFLICT (word) DO NOTHING",
+                    [value for pair in batch for value in pair],
+                )
+                written += cursor.rowcount
+        with self._lock:
+            for word, _ in pairs:
+                self._unsaved.pop(word, None)
+        return written
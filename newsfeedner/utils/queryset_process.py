@@ -1,20 +1,18 @@
 import re
 from collections import defaultdict
-from typing import List, Tuple, Dict
+from itertools import islice
+from typing import Dict, Iterable, List, Tuple
 
-import pymorphy2
 import razdel
+from django.conf import settings
 
-from newsfeedner.utils.trade_utils import loc_dict
-from newsfeedner.utils.trade_utils import (
-    names_upper_case,
-    stoplist,
-    countries_and_regions,
-    query_regions_dict_reversed,
-)
-from newsfeedner.utils.trade_utils import query_regions_dict as query_regions
+from newsfeedner.utils.location_matcher import location_matcher
+from newsfeedner.utils.morph import get_morph
+from newsfeedner.utils.normal_forms import NormalFormCache
+from newsfeedner.utils.lexicon import LEXICON
 
-morph = pymorphy2.MorphAnalyzer()
+# одни и те же формы локаций повторяются из события в событие, разбор pymorphy2 - основная стоимость
+normal_forms = NormalFormCache(get_morph, settings.NORMAL_FORMS_CACHE_SIZE)
 
 
 def get_known_locations(locations: List) -> List:
@@ -27,7 +25,7 @@ def get_known_locations(locations: List) -> List:
     unknown = set()
     for loc in locations:
         loc = loc.replace("Разные ", "")
-        if loc in countries_and_regions:
+        if loc in LEXICON.countries_and_regions:
             known_locations.add(loc)
         else:
             unknown.add(loc)
@@ -40,10 +38,140 @@ def process_queryset_classes(q):
     q.classes = "; ".join(sorted(set(q.classes.split("; "))))
 
 
-def process_queryset_dates(q):
-    dates = [d[:10] for d in q.dates]
-    dates = sorted(set(dates))
-    q.dates = dates[-1]
+# удаляются из текста новости
+ABSTRACT_STOPLIST_MIDDLE = [
+    "Читайте нас на:",
+]
+# удаляются вместе с остатком строки
+ABSTRACT_STOPLIST_END = [
+    "Читайте также",
+    "Читайте нас в Telegram",
+    "Почему так произошло, читайте здесь",
+    "Читайте полный текст",
+    "Читайте еще",
+    "Полный текст статьи читайте",
+    "Полный текст интервью",
+    "Читайте ранее",
+    "Читайте подробнее",
+    "Подробнее по этой теме читайте",
+    "Подробнее читайте в",
+    "Все новости Белоруссии читайте на",
+    "Подписывайтесь на видео-новости",
+]
+# посторонний текст в спутнике и риа
+ABSTRACT_SKIP_TERMS = ("sputnik.", "ria.ru", "http", "Rosiya Segodnya")
+ABSTRACT_MAX_SENTS = 5
+
+
+class AbstractBuilder:
+    """
+    Краткое содержание новостей (get_article_abstract) с заранее скомпилированными выражениями.
+    Текст без стоп-фраз (почти все новости) проверяется поиском подстрок в тексте, приведённом casefold,
+    очистка выражениями выполняется, только если какая-то из фраз нашлась.
+    Предложения разбираются razdel до ABSTRACT_MAX_SENTS подходящих, а не по всему тексту.
+    """
+
+    def __init__(self, stoplist_middle: List[str], stoplist_end: List[str]):
+        self.middle = re.compile("|".join(stoplist_middle), flags=re.I)
+        # re.I находит фразу только там, где она есть в тексте после casefold
+        # (одно выражение-перечисление с re.I для кириллицы медленнее, чем поиск подстрок)
+        self.end_phrases = [pattern.casefold() for pattern in stoplist_end]
+        self.end = [re.compile(f"{pattern}.+", flags=re.I) for pattern in stoplist_end]
+        self.glued_sentences = re.compile(r"\.([а-яА-яёЁa-zA-Z])")
+
+    @staticmethod
+    def get_search_countries(search_countries: List[str]) -> List[str]:
+        # слова названий без последней буквы, в нижнем регистре
+        search_countries_parts = []
+        for sc in search_countries:
+            if " " in sc:
+                search_countries_parts.extend(sc.split())
+            else:
+                search_countries_parts.append(sc)
+        return [sc.lower()[:-1] for sc in search_countries_parts]
+
+    def clean(self, article_body: str) -> str:
+        article_body = self.middle.sub("", article_body)
+        # фразы удаляются по очереди, как и раньше: порядок важен, если их несколько в строке
+        folded_body = article_body.casefold()
+        if any(phrase in folded_body for phrase in self.end_phrases):
+            for pattern in self.end:
+                article_body = pattern.sub("", article_body)
+        # добавить пробелы, если в изначальном тексте слипшиеся предложения
+        return self.glued_sentences.sub(r". \1", article_body)
+
+    def build(
+        self,
+        article_body: str,
+        search_countries: List[str],
+        region_locations: List[str] = None,
+    ):
+        return self.build_from_patterns(
+            article_body, self.get_search_countries(search_countries), region_locations
+        )
+
+    def build_from_patterns(
+        self,
+        article_body: str,
+        search_countries: List[str],
+        region_locations: List[str] = None,
+    ):
+        article_body = self.clean(article_body)
+
+        # разделение заголовка и текста новости
+        title = article_body
+        text = ""
+        for split_chars in ["\\n\\n", "\n\n"]:
+            if split_chars in article_body:
+                title, text = article_body.split(split_chars)[:2]
+
+        article_body = title
+        sents = []
+
+        # только предложения, содержащие указанные локации и регионы
+        if search_countries:
+            # предложение приводится к нижнему регистру один раз, шаблоны ищутся через словарь локаций
+            patterns = set(search_countries)
+            if region_locations:
+                patterns.update(a.lower() for a in region_locations)
+            sents = (
+                s
+                for s in razdel.sentenize(text)
+                if len(s.text) > 10
+                and (s.text not in title)
+                and (title not in s.text)  # без повторения заголовка
+                and not any(term in s.text for term in ABSTRACT_SKIP_TERMS)
+                and location_matcher.contains_any(s.text.lower(), patterns)
+            )
+            sents = list(islice(sents, ABSTRACT_MAX_SENTS))
+
+            abstract = " ".join([s.text for s in sents])  # абстракт
+            if abstract:
+                article_body = title + ". " + abstract  # заголовок + абстракт
+        for s in sents:
+            # len("\\n\\n") == 4
+            s.start += len(title) + 4
+            s.stop += len(title) + 4
+        sents = [razdel.substring.Substring(0, len(title) + 1, title)] + sents
+
+        return article_body, sents
+
+    def build_batch(self, articles: Iterable[Tuple]) -> List[Tuple]:
+        """
+        articles - (article_body, search_countries, region_locations) или (article_body, search_countries).
+        Одинаковые списки стран (у событий одной выборки они часто повторяются) готовятся один раз.
+        """
+        prepared = {}
+        results = []
+        for article_body, search_countries, *region_locations in articles:
+            key = tuple(search_countries)
+            if key not in prepared:
+                prepared[key] = self.get_search_countries(search_countries)
+            results.append(self.build_from_patterns(article_body, prepared[key], *region_locations))
+        return results
+
+
+abstract_builder = AbstractBuilder(ABSTRACT_STOPLIST_MIDDLE, ABSTRACT_STOPLIST_END)
 
 
 def get_article_abstract(
@@ -57,99 +185,14 @@ def get_article_abstract(
                     + могут быть прилагательные (['Сербия', 'Словакия', 'Турция', 'словацкие'])
 
     """
-    stoplist_middle = [
-        "Читайте нас на:",
-    ]
-    stoplist_end = [
-        "Читайте также",
-        "Читайте нас в Telegram",
-        "Почему так произошло, читайте здесь",
-        "Читайте полный текст",
-        "Читайте еще",
-        "Полный текст статьи читайте",
-        "Полный текст интервью",
-        "Читайте ранее",
-        "Читайте подробнее",
-        "Подробнее по этой теме читайте",
-        "Подробнее читайте в",
-        "Все новости Белоруссии читайте на",
-        "Подписывайтесь на видео-новости",
-    ]
-    # подготовка строк локаций
-    search_countries_parts = []
-    for sc in search_countries:
-        if " " in sc:
-            for sc_part in sc.split():
-                search_countries_parts.append(sc_part)
-        else:
-            search_countries_parts.append(sc)
-    search_countries = [sc.lower()[:-1] for sc in search_countries_parts]
-
-    # очистка
-    for pattern in stoplist_middle:
-        article_body = re.sub(pattern, "", article_body, flags=re.I)
-    for pattern in stoplist_end:
-        article_body = re.sub(f"{pattern}.+", "", article_body, flags=re.I)
-
-    # добавить пробелы, если в изначальном тексте слипшиеся предложения
-    article_body = re.sub(r"\.([а-яА-яёЁa-zA-Z])", r". \1", article_body)
-
-    # разделение заголовка и текста новости
-    title = article_body
-    text = ""
-    for split_chars in ["\\n\\n", "\n\n"]:
-        if split_chars in article_body:
-            splited_text = article_body.split(split_chars)
-            if len(splited_text) <= 2:
-                title, text = splited_text
-            else:
-                title, text = splited_text[:2]
-
-    article_body = title
-    sents = []
-
-    # только предложения, содержащие указанные локации и регионы
-    if search_countries:
-        sents = razdel.sentenize(text)
-        if region_locations:
-            sents = [
-                s
-                for s in sents
-                if any(a.lower() in s.text.lower() for a in region_locations)
-                or any(sc in s.text.lower() for sc in search_countries)
-            ]
-        else:
-            sents = [
-                s for s in sents if any(sc in s.text.lower() for sc in search_countries)
-            ]
-
-        sents = [
-            s
-            for s in sents
-            if len(s.text) > 10
-            and (s.text not in title)
-            and (title not in s.text)  # без повторения заголовка
-            and not any(
-                [
-                    term in s.text
-                    for term in ["sputnik.", "ria.ru", "http", "Rosiya Segodnya"]
-                ]
-            )
-            # посторонний текст в спутнике и риа
-        ]
-        # Leave only 5 sentences
-        sents = sents[:5]
+    return abstract_builder.build(article_body, search_countries, region_locations)
 
-        abstract = " ".join([s.text for s in sents])  # абстракт
-        if abstract:
-            article_body = title + ". " + abstract  # заголовок + абстракт
-    for s in sents:
-        # len("\\n\\n") == 4
-        s.start += len(title) + 4
-        s.stop += len(title) + 4
-    sents = [razdel.substring.Substring(0, len(title) + 1, title)] + sents
 
-    return article_body, sents
+def get_article_abstracts(articles: Iterable[Tuple]) -> List[Tuple]:
+    """
+    get_article_abstract для пачки новостей: articles - (article_body, search_countries, region_locations).
+    """
+    return abstract_builder.build_batch(articles)
 
 
 def remove_location_duplicates(locations: List) -> List:
@@ -180,25 +223,24 @@ def normalize_locations(locations: List) -> List:
     # британско-шведский -> Великобритания, Швеция
     new_countries = []
     for l_i, l in enumerate(locations):
-        if l in countries_and_regions:
+        if l in LEXICON.countries_and_regions:
             continue
-        normal_form = morph.parse(l)[0].normal_form
-        if normal_form in stoplist:
+        normal_form = normal_forms.get(l)
+        if normal_form in LEXICON.stoplist:
             locations[l_i] = ""
             continue
 
-        new_form = loc_dict.get(normal_form.lower())
+        new_form = location_matcher.get_locations(normal_form.lower())
         if new_form:
-            new_form = new_form.split(", ")
             new_countries.extend(new_form)
             locations[l_i] = ""
 
-        if normal_form in names_upper_case:
+        if normal_form in LEXICON.names_upper_case:
             normal_form = normal_form.upper()
         else:
             normal_form = normal_form.capitalize()
 
-        region = query_regions_dict_reversed.get(normal_form)
+        region = LEXICON.country_regions.get(normal_form)
         if region:
             locations[l_i] = normal_form
     locations.extend(new_countries)
@@ -215,9 +257,9 @@ def get_regions_from_countries(locations: List) -> Dict:
     """
     regions = defaultdict(set)
     for loc in locations:
-        region = query_regions_dict_reversed.get(loc)
+        region = LEXICON.country_regions.get(loc)
         loc = loc.replace("Разные ", "")
-        if loc in query_regions and "Страны" not in loc:
+        if loc in LEXICON.regions and "Страны" not in loc:
             regions[loc].add(loc)
         if region:
             for reg in region:
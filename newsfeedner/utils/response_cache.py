@@ -0,0 +1,89 @@
+from hashlib import md5
+from typing import Tuple
+from urllib.parse import urlencode
+
+from django.core.cache import cache
+from django.utils.cache import get_conditional_response
+
+from newsfeedner.models import TradeTableVersion
+
+
+def get_versions(*names) -> Tuple[int, ...]:
+    """
+    Возвращает текущие счётчики trade_news_table_versions по именам
+    одним запросом, в порядке имён.
+    """
+    versions = dict(TradeTableVersion.objects.filter(table_name__in=names).values_list("table_name", "version"))
+    return tuple(versions.get(name, 0) for name in names)
+
+
+def get_table_versions(*models) -> Tuple[int, ...]:
+    """
+    Возвращает текущие счётчики изменений таблиц моделей (trade_news_table_versions)
+    одним запросом, в порядке моделей.
+    """
+    return get_versions(*(model._meta.db_table for model in models))
+
+
+def normalize_query_params(query_params) -> str:
+    """
+    Приводит параметры запроса к каноническому виду: без пустых значений,
+    ключи и значения отсортированы.
+    """
+    items = sorted(
+        (key, value)
+        for key, values in query_params.lists()
+        for value in values
+        if value != ""
+    )
+    return urlencode(items)
+
+
+def get_request_digest(prefix, versions, request) -> str:
+    """
+    Хэш от префикса, версий таблиц и нормализованных параметров запроса.
+    После записи в таблицу версия меняется, и хэш тоже.
+    """
+    params = normalize_query_params(request.GET)
+    key = f"{prefix}:{versions}:{request.get_host()}?{params}"
+    return md5(key.encode("utf-8")).hexdigest()
+
+
+def get_response_cache_key(prefix, versions, request) -> str:
+    """
+    Ключ кэша ответа, старые ключи после записи в таблицу больше не читаются.
+    """
+    return f"{prefix}:{get_request_digest(prefix, versions, request)}"
+
+
+def get_request_etag(prefix, versions, request) -> str:
+    """
+    Слабый ETag ответа для версий таблиц и параметров запроса.
+    """
+    return f'W/"{get_request_digest(prefix, versions, request)}"'
+
+
+def get_cached_response_data(cache_key, get_data):
+    """
+    Возвращает данные ответа из кэша, при промахе вычисляет их get_data() и сохраняет.
+    """
+    data = cache.get(cache_key)
+    if data is None:
+        data = get_data()
+        cache.set(cache_key, data)
+    return data
+
+
+def get_etag_response(request, etag, get_response):
+    """
+    Если If-None-Match совпадает с etag - возвращает 304 без вызова get_response,
+    иначе возвращает get_response() с заголовком ETag.
+    """
+    not_modified = get_conditional_response(request, etag=etag)
+    if not_modified is not None:
+        not_modified["ETag"] = etag
+        return not_modified
+    response = get_response()
+    if response.status_code == 200:
+        response["ETag"] = etag
+    return response
@@ -1,5 +1,3 @@
-from collections import defaultdict
-
 query_regions_dict = {
     "Страны Африки": [
         "Алжир",
@@ -607,21 +605,8 @@ query_regions_list = [[loc for loc in locs]
 # for i, region in enumerate(query_regions):
 #     query_regions_list.append([(r.replace(" ", "_"), r) for r in region])
 
-countries_and_regions = set()
-for region, locs in query_regions_dict.items():
-    countries_and_regions.update({region})
-    countries_and_regions.update(locs)
-countries_and_regions = set(countries_and_regions)
-
-names_upper_case = [loc for loc in countries_and_regions if loc.isupper()]
-
-query_regions_dict_reversed = defaultdict()
-for reg, locs in query_regions_dict.items():
-    for loc in locs:
-        if loc in query_regions_dict_reversed:
-            query_regions_dict_reversed[loc].add(reg)
-        else:
-            query_regions_dict_reversed[loc] = {reg}
+# производные справочники (все названия, обратный индекс страна - регионы, словоформы в нижнем регистре,
+# коды СМТК) собираются в неизменяемом виде в newsfeedner/utils/lexicon.py
 
 loc_dict = {
     "аоэ": "ОАЭ",
@@ -1108,8 +1093,3 @@ smtk_products = {
     ],
     "Товары ГС07, выходящие за рамки охвата СМТК": [],
 }
-
-smtk_branches = list(smtk_products.keys())
-
-smtk_product_all = [*smtk_products.keys()] + sorted(
-    set([prod for k, v in smtk_products.items() for prod in v]))
@@ -11,7 +11,6 @@ from time import mktime, struct_time
 import datetime
 
 import random
-import pymorphy2
 from transliterate import translit
 
 import re
@@ -21,6 +20,8 @@ from razdel import sentenize
 
 from wordcloud import WordCloud
 
+from newsfeedner.utils.morph import get_morph
+
 
 def split_to_sentences(whole_text):
     return [text.text for text in sentenize(whole_text)]
@@ -226,7 +227,7 @@ class Morpher:
     """
 
     def __init__(self):
-        self.morph = pymorphy2.MorphAnalyzer()
+        self.morph = get_morph()
 
     def normalize(self, word):
         if word.isupper():
@@ -26,10 +26,7 @@ from newsfeedner.serializers.serializers_main import (
     EventSerializerWrite,
     EventApprovalSerializerWriteStatus,
 )
-from newsfeedner.utils.queryset_process import (
-    process_queryset_classes,
-    process_queryset_dates,
-)
+from newsfeedner.utils.queryset_process import process_queryset_classes
 
 DUPLICATES_SERVICE = os.getenv("DUPLICATES_SERVICE")
 
@@ -155,8 +152,14 @@ class GetDuplicated(ListAPIView):
     def process_queryset(self, queryset):
         queryset_processed = []
         for q in queryset:
-            process_queryset_classes(q)
-            process_queryset_dates(q)
+            # отношения посчитаны при записи, на лету - только для ещё не посчитанных строк
+            if q.classes_text is None:
+                process_queryset_classes(q)
+            else:
+                q.classes = q.classes_text
+            # дата разобрана базой в event_date (sql/0003_event_date.sql)
+            if q.event_date is not None:
+                q.dates = q.event_date.isoformat()
             queryset_processed.append(q)
         return queryset_processed
 
@@ -1,12 +1,16 @@
 import json
 import logging
+import re
 import sys
+from datetime import datetime
 
-import django.db
 from django.contrib.staticfiles.storage import staticfiles_storage
+from django.http import HttpResponse
+from django.utils.cache import patch_vary_headers
+from django.utils.decorators import method_decorator
 from django.views.decorators.csrf import csrf_exempt
 from drf_yasg.utils import swagger_auto_schema
-from rest_framework import permissions
+from rest_framework import permissions, serializers, status
 from rest_framework.response import Response
 from rest_framework.views import APIView
 
@@ -14,26 +18,16 @@ from newsfeedner.models import (
     TradeEvent,
     TradeEventRelevant,
 )
+from newsfeedner.views.views_main import EventApiView
 from newsfeedner.serializers.serializers_main import (
     EventSerializerRead,
     EventRelevantSerializerRead,
 )
-from newsfeedner.utils.trade_funcs import (
-    get_data_from_db_and_transform,
-    get_api_region_relations,
-    get_api_region_countries,
-    get_api_relation_countries,
-    get_api_country_products,
-    get_all_product_branch_products,
-    get_api_product_branches,
-    get_api_region_products,
-)
-
-from newsfeedner.utils.trade_utils import (
-    query_regions_dict as query_regions,
-    smtk_product_all,
-    relations,
-)
+from newsfeedner.utils.facet_store import FACET_STORE_DIMENSIONS
+from newsfeedner.utils.facets import get_facet_counts
+from newsfeedner.utils.filter_facets import FacetIndex
+from newsfeedner.utils.lexicon import LEXICON
+from newsfeedner.utils.response_cache import get_etag_response, get_request_etag
 
 logger = logging.getLogger()
 logger.setLevel(logging.INFO)
@@ -57,6 +51,15 @@ annotation_config = None
 if not annotation_config:
     annotation_config = default_config
 
+# значения фильтров "все", не ограничивающие выборку
+FILTER_ALL_VALUES = {"Все типы", "Все страны", "Все товарные разделы", "Все товарные группы"}
+
+re_accepts_gzip = re.compile(r"\bgzip\b")
+
+
+def accepts_gzip(request) -> bool:
+    return bool(re_accepts_gzip.search(request.META.get("HTTP_ACCEPT_ENCODING", "")))
+
 
 class FiltersView(APIView):
     """
@@ -93,89 +96,179 @@ class FiltersView(APIView):
     serializer_class = EventSerializerRead
     permission_classes = (permissions.IsAuthenticated,)
 
-    # get data with all values from db
-    query_dict = get_data_from_db_and_transform(TradeEvent)
-    # getting data to populate filters
-    region_countries, countries = get_api_region_countries(query_dict)
-    regions = list(region_countries.keys())
-    region_relations = get_api_region_relations(query_dict)
-    region_products = get_api_region_products(query_dict)
-    relation_countries = get_api_relation_countries(query_dict)
-    country_products = get_api_country_products(query_dict)
-    product_branch_products_dict = get_all_product_branch_products(query_dict)
-    product_branches = get_api_product_branches(query_dict)
+    # данные фильтров в памяти процесса, обновляются фоновым потоком при изменении таблицы
+    facet_index = FacetIndex(TradeEvent)
     slug = None
 
     @csrf_exempt
     @swagger_auto_schema(
         query_serializer=serializer_class,
+        manual_parameters=[EventApiView.start_date, EventApiView.end_date],
     )
     def get(self, request):
         # TODO add description to API depending on slug
         """ """
-        if self.slug == "get_region_relations":
-            return Response(self.region_relations)
-
-        elif self.slug == "get_region_countries":
-            return Response(self.region_countries)
-
-        elif self.slug == "get_relation_countries":
-            return Response(self.relation_countries)
-
-        elif self.slug == "get_country_products":
-            return Response(self.country_products)
-
-        elif self.slug == "get_countries":
-            return Response(self.countries)
-
-        elif self.slug == "get_product_branches":
-            return Response(self.product_branches)
-
-        elif self.slug == "get_regions":
-            return Response(self.regions)
-        else:
+        # ответ из снимка в памяти, ETag от версии снимка (таблица, формат, справочники) - без запросов к базе
+        facets = self.get_facets(request)
+        etag = get_request_etag(f"{type(self).__name__}:{self.slug}", facets.build_version, request)
+        return get_etag_response(request, etag, lambda: self.get_filters_response(facets))
+
+    def get_facets(self, request):
+        """
+        Снимок фильтров за всё время или, если заданы start_date и end_date (как в api_news/news),
+        по событиям периода - из дневной сводки.
+        """
+        start_date = request.query_params.get("start_date", "")
+        end_date = request.query_params.get("end_date", "")
+        if not start_date and not end_date:
+            return self.facet_index.get_snapshot()
+        for d in (start_date, end_date):
+            try:
+                datetime.strptime(d, "%Y-%m-%d")
+            except ValueError:
+                raise serializers.ValidationError({"dates": f"'{d}' date format is wrong. Date should be in format YYYY-MM-DD"})
+        return self.facet_index.get_window_snapshot(start_date, end_date)
+
+    def get_filters_response(self, facets):
+        # готовое тело ответа из снимка: без рендеринга, в gzip - если клиент его принимает
+        body = facets.get_body(self.slug)
+        if body is None:
             return Response(
                 "Please check API address",
             )
+        response = HttpResponse(body, content_type="application/json")
+        patch_vary_headers(response, ("Accept-Encoding",))
+        gzip_body = facets.get_gzip_body(self.slug)
+        if gzip_body is not None and accepts_gzip(self.request):
+            response.content = gzip_body
+            response["Content-Encoding"] = "gzip"
+        return response
 
 
 class FilterViewRelevant(FiltersView):
     serializer_class = EventRelevantSerializerRead
     permission_classes = (permissions.AllowAny,)
-    try:
-        query_dict = get_data_from_db_and_transform(TradeEventRelevant)
-    except django.db.Error:
-        query_dict = {}
-    # getting data to populate filters
-    region_countries, countries = get_api_region_countries(query_dict)
-    # print(region_countries)
-    regions = list(region_countries.keys())
-    region_relations = get_api_region_relations(query_dict)
-    region_products = get_api_region_products(query_dict)
-    relation_countries = get_api_relation_countries(query_dict)
-    country_products = get_api_country_products(query_dict)
-    product_branch_products_dict = get_all_product_branch_products(query_dict)
-    product_branches = get_api_product_branches(query_dict)
+    facet_index = FacetIndex(TradeEventRelevant)
     slug = None
     @csrf_exempt
     @swagger_auto_schema(
         query_serializer=serializer_class,
+        manual_parameters=[EventApiView.start_date, EventApiView.end_date],
     )
     def get(self, request):
         return super().get(self.request)
 
 
+class FilterValuesMixin:
+    """
+    get_filter_values
+        Возвращает отсортированный список значений измерения dimension
+        (relation, region, country, product_branch, product), которые встречаются в базе
+        вместе со значениями фильтров region, relation, country, product_branch, product.
+        Например, страны с товарной группой X при отношении Y: ?dimension=country&relation=Y&product=X
+    """
+
+    slug = "get_filter_values"
+
+    def get_filters_response(self, facets):
+        dimension = self.request.query_params.get("dimension")
+        if dimension not in FACET_STORE_DIMENSIONS:
+            return Response(
+                f"dimension should be one of: {', '.join(FACET_STORE_DIMENSIONS)}",
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        filters = {}
+        for field in FACET_STORE_DIMENSIONS:
+            value = self.request.query_params.get(field, "").replace("_", " ")
+            if value and value not in FILTER_ALL_VALUES:
+                filters[field] = [value]
+        values = facets.store.values(dimension, **filters)
+        if dimension == "product":
+            # товарный раздел не входит в свои группы
+            values = [value for value in values if value not in LEXICON.smtk_products]
+        return Response(values)
+
+
+class FilterValuesView(FilterValuesMixin, FiltersView):
+    pass
+
+
+class FilterValuesViewRelevant(FilterValuesMixin, FilterViewRelevant):
+    pass
+
+
+class FacetsView(EventApiView):
+    """
+    get_facets
+        Возвращает число событий для каждого значения фильтров при текущих значениях фильтров:
+        {"total": n, "relation": {отношение: n}, "region": {регион: n}, "country": {страна: n},
+         "product_branch": {товарный раздел: n}, "product": {товарная группа: n}}
+        Параметры те же, что у /api_news/news, считается одним запросом к базе.
+    """
+
+    http_method_names = ["get"]
+    permission_classes = (permissions.IsAuthenticated,)
+    etag_model = TradeEvent
+
+    region = EventApiView.region
+    relation = EventApiView.relation
+    country = EventApiView.country
+    product_branch = EventApiView.product_branch
+    product = EventApiView.product
+    start_date = EventApiView.start_date
+    end_date = EventApiView.end_date
+    q = EventApiView.q
+
+    def get_facet_queryset(self):
+        # те же события, что в списке /api_news/news
+        return self.get_queryset(TradeEvent).filter(status="not_seen")
+
+    @csrf_exempt
+    @method_decorator(
+        swagger_auto_schema(
+            manual_parameters=[
+                region,
+                relation,
+                country,
+                product_branch,
+                product,
+                start_date,
+                end_date,
+                q,
+            ],
+        ),
+        name="list",
+    )
+    def get(self, request, *args, **kwargs):
+        return super().get(request, *args, **kwargs)
+
+    def list(self, request, *args, **kwargs):
+        return Response(get_facet_counts(self.get_facet_queryset()))
+
+
+class FacetsViewRelevant(FacetsView):
+    """
+    То же, что FacetsView, для таблицы trade_news_relevant (параметры как у /api_news/news_relevant).
+    """
+
+    permission_classes = (permissions.AllowAny,)
+    etag_model = TradeEventRelevant
+
+    def get_facet_queryset(self):
+        return self.get_queryset(TradeEventRelevant)
+
+
 class ConstantsView(APIView):
     permission_classes = (permissions.AllowAny,)
-    const_regions = [*query_regions.keys()]
+    const_regions = [*LEXICON.regions.keys()]
     const_countries_regions = const_regions + sorted(
-        set([loc for k, v in query_regions.items() for loc in v])
+        set([loc for k, v in LEXICON.regions.items() for loc in v])
     )
     const_countries_regions = [
         "Разные " + loc if loc.startswith("Страны") else loc
         for loc in const_countries_regions
     ]
-    const_prods = smtk_product_all
+    const_prods = list(LEXICON.smtk_product_all)
 
     slug = None
 
@@ -183,7 +276,7 @@ class ConstantsView(APIView):
     @swagger_auto_schema()
     def get(self, request):
         if self.slug == "get_const_relations":
-            return Response(relations)
+            return Response(LEXICON.relations)
 
         elif self.slug == "get_const_countries":
             return Response(self.const_countries_regions)
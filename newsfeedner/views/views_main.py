@@ -1,17 +1,23 @@
 import json
 import logging
 import os
+import pickle
 import sys
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from time import time
 from typing import List, Tuple
 import uuid
 
+import numpy as np
 import pytz
 import requests
 from django.contrib.staticfiles.storage import staticfiles_storage
+from django.contrib.postgres.search import SearchQuery, SearchRank
 from django.db import transaction
-from django.db.models import Q, QuerySet
+from django.db.models import F, FloatField, Q, QuerySet
+from django.db.models.functions import Cast
 from django.db.utils import IntegrityError
 from django.shortcuts import get_object_or_404
 from django.utils.decorators import method_decorator
@@ -26,15 +32,21 @@ from rest_framework.response import Response
 
 # Добавлено 03.02.2023
 from openpyxl import Workbook
-from django.http import HttpResponse
+from openpyxl.cell import WriteOnlyCell
+from django.http import FileResponse
 from openpyxl.styles import Font, Alignment, Border, Side, PatternFill
 from openpyxl.utils import get_column_letter
 from rest_framework import serializers
 
+from newsfeedner.pagination import EventCursorPagination
 from newsfeedner.models import (
+    EVENT_LOCATION_MODELS,
+    ApprovedIDs,
+    CheckedIDs,
     TradeEvent,
     TradeEventRelevant,
     TradeEventForApproval,
+    TradeNewsEmbeddings,
 )
 from newsfeedner.permissions import ApproverPermissions
 from newsfeedner.serializers.serializers_main import (
@@ -57,8 +69,15 @@ from newsfeedner.serializers.serializers_post_ids import (
 #     process_text_locations,
 #     get_article_abstract,
 # )
-from newsfeedner.utils.trade_utils import query_regions_dict as query_regions
-from newsfeedner.utils.trade_utils import smtk_products
+from newsfeedner.utils.derived_fields import set_derived_fields
+from newsfeedner.utils.lexicon import LEXICON
+from newsfeedner.utils.response_cache import (
+    get_cached_response_data,
+    get_etag_response,
+    get_request_etag,
+    get_response_cache_key,
+    get_table_versions,
+)
 
 logger = logging.getLogger()
 logger.setLevel(logging.INFO)
@@ -83,6 +102,8 @@ if not annotation_config:
     annotation_config = default_config
 
 EMBEDDING_SERVICE = os.getenv("EMBEDDING_SERVICE")
+# секунды ожидания ответа сервиса эмбеддингов (соединение и чтение)
+EMBEDDING_TIMEOUT = float(os.getenv("EMBEDDING_TIMEOUT", 10))
 
 
 class EventList(ListView):
@@ -121,54 +142,21 @@ class EventList(ListView):
         Фильтрует queryset по заданным фильтрам и возвращает новый queryset
         region - value. Например, "Страны_Африки"
         country - value. Например, "Коморские_острова",
+        Фильтр выполняется через индексированную таблицу локаций событий (semi-join по event_id).
         """
         if country:
             country = country.replace("_", " ")
             country = country.replace("Все страны", "")
-        if not country and region.startswith("Страны"):
-            region_list = query_regions.get(region)
-            if "Африки" in region:
-                region_strings = ["африк", "брикс", "опек"]
-            elif "Латинской" in region:
-                region_strings = ["латинск", "америк", "опек"]
-            elif "СНГ" in region:
-                region_strings = ["снг", "брикс", "еаэс"]
-            elif "Европ" in region or "США" in region:
-                region_strings = ["европ", "сша", "америк", "ec"]
-            elif "Океани" in region or "Австрал" in region:
-                region_strings = ["океан", "австрал"]
-            elif "Азии" in region:
-                region_strings = ["азии", "азия", "асеан", "брикс", "опек"]
-            elif "Ближн" in region:
-                region_strings = ["восток", "ближний", "опек"]
-            else:
-                region_strings = ""
-
-            combined_query = Q(locations__icontains=region_strings[0])
-            for region_string in region_strings[1:]:
-                combined_query &= Q(locations__icontains=region_string)
-            for country in region_list:
-                if len(country) > 4:
-                    country = country[:-1]
-                # швейцария contains цар
-                if country == "ЦАР":
-                    combined_query |= Q(locations__contains=country.upper())
-                # боливия contains ливия
-                elif country == "ливи":
-                    combined_query |= Q(locations__icontains=" " + country)
-                    combined_query &= ~Q(locations__icontains="боливия")
-                else:
-                    combined_query |= Q(locations__icontains=country)
-            queryset = queryset.filter(combined_query)
-
-        elif country:
-            # "match abbreviated countries only in the original cases"
-            # "ЦАР not -> Швейцария"
-            if country.isupper():
-                queryset = queryset.filter(locations__contains=country)
-            else:
-                queryset = queryset.filter(locations__icontains=country.lower())
-        return queryset
+        if region:
+            region = region.replace("_", " ")
+        location_model = EVENT_LOCATION_MODELS[queryset.model]
+        if country:
+            location_rows = location_model.objects.filter(country=country)
+        elif region and region in LEXICON.regions:
+            location_rows = location_model.objects.filter(region=region)
+        else:
+            return queryset
+        return queryset.filter(id__in=location_rows.values("event_id"))
 
     def filter_queryset_by_relation(self, queryset, relation=None):
         """
@@ -202,18 +190,28 @@ class EventList(ListView):
             product = product.replace("Все товарные группы", "")
 
         if product:
-            query = Q(itc_codes__contains=product)
-            queryset = queryset.filter(query)
+            queryset = queryset.filter(smtk_codes__overlap=[product])
 
         elif not product and product_branch:
-            products = smtk_products[product_branch]
-
-            query = Q(itc_codes__contains=product_branch)
-            for product in products:
-                query |= Q(itc_codes__contains=product)
-            queryset = queryset.filter(query)
+            products = LEXICON.smtk_products[product_branch]
+            queryset = queryset.filter(smtk_codes__overlap=[product_branch, *products])
         return queryset
 
+    def filter_queryset_by_text(self, queryset, text=None):
+        """
+        Функция получает на вход queryset и поисковую строку.
+        Фильтрует queryset полнотекстовым поиском по заголовку (title_tsv, конфигурация russian)
+        и добавляет к нему поле rank - релевантность заголовка запросу.
+        text - value. Например, "экспорт пшеницы" (поддерживается синтаксис websearch: "фраза", or, -слово)
+        """
+        text = text.strip() if text else ""
+        if not text:
+            return queryset
+        query = SearchQuery(text, config="russian", search_type="websearch")
+        # rank приводится к double precision, чтобы значение в курсоре совпадало с базой точно
+        rank = Cast(SearchRank(F("title_tsv"), query), FloatField())
+        return queryset.filter(title_tsv=query).annotate(rank=rank)
+
     def get_queryset(self):
         print("start")
         queryset = TradeEvent.objects.all()
@@ -309,19 +307,56 @@ class EventApiView(ListAPIView, EventList):
         description="дата окончания периода, например: 2023-03-08",
     )
 
-    def check_dates(self, dates):
-        dates = dates.split(",")
-        for d in dates:
-            try:
-                d = datetime.strptime(d, "%Y-%m-%d")
-            except ValueError:
-                raise serializers.ValidationError({"dates": f"'{d}' date format is wrong. Date should be in format YYYY-MM-DD"})
+    pagination = openapi.Parameter(
+        "pagination",
+        in_=openapi.IN_QUERY,
+        type=openapi.TYPE_STRING,
+        description="режим пагинации: 'cursor' - постраничный вывод по курсору (дата события, id) "
+        "со ссылками next/previous вместо номеров страниц",
+    )
+
+    cursor = openapi.Parameter(
+        "cursor",
+        in_=openapi.IN_QUERY,
+        type=openapi.TYPE_STRING,
+        description="курсор из ссылок next/previous, только для pagination=cursor",
+    )
+
+    approx_count = openapi.Parameter(
+        "approx_count",
+        in_=openapi.IN_QUERY,
+        type=openapi.TYPE_STRING,
+        description="для pagination=cursor: вернуть в count оценку числа страниц "
+        "по плану запроса (без COUNT(*))",
+    )
+
+    q = openapi.Parameter(
+        "q",
+        in_=openapi.IN_QUERY,
+        type=openapi.TYPE_STRING,
+        description="полнотекстовый поиск по заголовку (морфология русского языка), например: "
+        "'экспорт пшеницы'. Результаты сортируются по релевантности",
+    )
+
+    cursor_ordering = ("-event_date", "-id")
+    # таблица, по версии которой строится ETag ответа (None - без ETag)
+    etag_model = None
+
+    def check_dates(self, d):
+        """
+        Разбирает дату из параметров запроса: ровно одна дата YYYY-MM-DD
+        (значения через запятую не принимаются - они попали бы в event_date__range).
+        """
+        try:
+            return datetime.strptime(d, "%Y-%m-%d").date()
+        except ValueError:
+            raise serializers.ValidationError({"dates": f"'{d}' date format is wrong. Date should be in format YYYY-MM-DD"})
 
     def get_query_params(self) -> Tuple[Tuple, List]:
         """
         Функция получает параметры запроса и возвращает список имен и список значений параметров
         """
-        fields = ("region", "relation", "country", "product_branch", "product", "start_date", "end_date")
+        fields = ("region", "relation", "country", "product_branch", "product", "start_date", "end_date", "q")
         values = []
         for field in fields:
             value = self.request.query_params.get(field)
@@ -340,15 +375,47 @@ class EventApiView(ListAPIView, EventList):
          (модель TradeEventForApproval)
         """
         # queryset = TradeEvent.objects.all()
-        queryset = objectTable.objects.filter(dates__range=[self.start_date, self.end_date]).order_by("-dates")
+        queryset = objectTable.objects.filter(
+            event_date__range=[self.start_date, self.end_date],
+        ).order_by("-event_date", "-id")
 
         fields, values = self.get_query_params()
 
         queryset = self.filter_queryset_by_location(queryset, values[0], values[2])
         queryset = self.filter_queryset_by_relation(queryset, values[1])
         queryset = self.filter_queryset_by_product(queryset, values[3], values[4])
+        if values[7]:
+            queryset = self.filter_queryset_by_text(queryset, values[7])
+            queryset = queryset.order_by("-rank", "-event_date", "-id")
+            self.cursor_ordering = ("-rank", "-event_date", "-id")
         return queryset
 
+    def get_paginated_events(self, queryset) -> Response:
+        """
+        Возвращает страницу событий.
+        По умолчанию - постраничная пагинация (count - число страниц),
+        при pagination=cursor - keyset-пагинация по cursor_ordering.
+        """
+        if self.request.query_params.get("pagination") == "cursor":
+            paginator = EventCursorPagination()
+            page = paginator.paginate_queryset(queryset, self.request, view=self)
+            serializer = self.get_serializer(page, many=True)
+            return paginator.get_paginated_response(serializer.data)
+
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            queryset = page
+        serializer = self.get_serializer(queryset, many=True)
+        events = serializer.data
+
+        data = dict()
+        # ugly but works
+        data["count"] = self.paginator.page.paginator.num_pages
+        data["next"] = self.paginator.get_next_link()
+        data["previous"] = self.paginator.get_previous_link()
+        data["results"] = events
+        return Response(data)
+
     # def list(self, request, *args, **kwargs):
     #     start_time = time()
     #     queryset = self.get_queryset(TradeEvent)
@@ -385,20 +452,27 @@ class EventApiView(ListAPIView, EventList):
                 product,
                 start_date,
                 end_date,
+                q,
+                pagination,
+                cursor,
+                approx_count,
             ],
         ),
         name="list",
     )
     def get(self, request, *args, **kwargs):
-        self.start_date = self.request.GET.get("start_date", "")
-        self.end_date = self.request.GET.get("end_date", "")
         try:
-            self.check_dates(self.start_date)
-            self.check_dates(self.end_date)
+            self.start_date = self.check_dates(self.request.GET.get("start_date", ""))
+            self.end_date = self.check_dates(self.request.GET.get("end_date", ""))
         except ValueError as e:
             print(e)
             return f"Error {e}"
-        return super().get(request, *args, **kwargs)
+        if self.etag_model is None:
+            return super().get(request, *args, **kwargs)
+        # ETag по версии таблицы: при совпадении If-None-Match - 304 без запроса к таблице событий
+        self.table_versions = get_table_versions(self.etag_model)
+        etag = get_request_etag(type(self).__name__, self.table_versions, request)
+        return get_etag_response(request, etag, lambda: super(EventApiView, self).get(request, *args, **kwargs))
 
 
 # Страница для всех пользователей - релевантные новости
@@ -410,6 +484,7 @@ class EventApiViewRelevant(EventApiView):
     http_method_names = ["get", "head", "options", "trace"]
     read_serializer_class = EventRelevantSerializerRead
     permission_classes = (permissions.AllowAny,)
+    etag_model = TradeEventRelevant
 
     region = EventApiView.region
     relation = EventApiView.relation
@@ -418,6 +493,10 @@ class EventApiViewRelevant(EventApiView):
     product = EventApiView.product
     start_date = EventApiView.start_date
     end_date = EventApiView.end_date
+    q = EventApiView.q
+    pagination = EventApiView.pagination
+    cursor = EventApiView.cursor
+    approx_count = EventApiView.approx_count
 
     def get_serializer_class(self):
         return self.read_serializer_class
@@ -433,25 +512,27 @@ class EventApiViewRelevant(EventApiView):
                 product,
                 start_date,
                 end_date,
+                q,
+                pagination,
+                cursor,
+                approx_count,
             ],
         ),
         name="list",
     )
     def list(self, request, *args, **kwargs):
-        queryset = super().get_queryset(TradeEventRelevant)
-        page = self.paginate_queryset(queryset)
-        if page is not None:
-            queryset = page
-        serializer = self.get_serializer(queryset, many=True)
-        events = serializer.data
+        """
+        Ответ кэшируется по версии таблицы trade_news_relevant и параметрам запроса.
+        Версия увеличивается триггером в транзакции записи (NewsApiViewApproval.post и др.),
+        поэтому устаревшие страницы не отдаются.
+        """
+        cache_key = get_response_cache_key("news_relevant", self.table_versions, request)
 
-        data = dict()
-        # ugly but works
-        data["count"] = self.paginator.page.paginator.num_pages
-        data["next"] = self.paginator.get_next_link()
-        data["previous"] = self.paginator.get_previous_link()
-        data["results"] = events
-        return Response(data)
+        def get_data():
+            queryset = super(EventApiViewRelevant, self).get_queryset(TradeEventRelevant)
+            return self.get_paginated_events(queryset).data
+
+        return Response(get_cached_response_data(cache_key, get_data))
 
 
 # Добавлено 07.02.2023 получить релевантные новости в формате xlsx
@@ -461,6 +542,8 @@ class EventApiViewRelevant_to_xlsx(EventApiView):
     http_method_names = ["get"]
     read_serializer_class = EventRelevantSerializerRead
     permission_classes = (permissions.AllowAny,)
+    # число строк, которое читается из базы за один запрос
+    chunk_size = 2000
 
     region = EventApiView.region
     relation = EventApiView.relation
@@ -469,6 +552,7 @@ class EventApiViewRelevant_to_xlsx(EventApiView):
     product = EventApiView.product
     start_date = EventApiView.start_date
     end_date = EventApiView.end_date
+    q = EventApiView.q
 
     @csrf_exempt
     @method_decorator(
@@ -481,6 +565,7 @@ class EventApiViewRelevant_to_xlsx(EventApiView):
                 product,
                 start_date,
                 end_date,
+                q,
             ],
             responses={"200": "Возвращает выборку в виде файла формата xlsx для заданных значений входных параметров."},
         ),
@@ -490,26 +575,28 @@ class EventApiViewRelevant_to_xlsx(EventApiView):
         return super().get(request, *args, **kwargs)
 
     def list(self, request, *args, **kwargs):
+        """
+        Строки выбираются из базы пачками (iterator), лист write-only пишется во временный файл,
+        готовый xlsx отдаётся потоком (FileResponse), поэтому память не зависит от числа строк.
+        """
         queryset = super().get_queryset(TradeEventRelevant)
+        rows = queryset.values_list("classes", "itc_codes", "locations", "title", "url", "dates")
 
-        response = HttpResponse(
-            content_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-        )
-        response["Content-Disposition"] = "attachment; filename={date}-trade.xlsx".format(
-            date=datetime.now().strftime("%Y-%m-%d"),
-        )
-        workbook = Workbook()
-
-        # Get active worksheet/tab
-        worksheet = workbook.active
-        worksheet.title = "trade_news"
+        workbook = Workbook(write_only=True)
+        worksheet = workbook.create_sheet("trade_news")
         columns = ["Тип отношений", "Коды СМТК", "Страны", "Событие", "Источник", "Дата"]
-        row_num = 1
 
-        # Assign the titles for each cell of the header
-        for col_num, column_title in enumerate(columns, 1):
-            cell = worksheet.cell(row=row_num, column=col_num)
-            cell.value = column_title
+        # в write-only режиме ширина столбцов задаётся до записи строк
+        for col_num in range(1, len(columns) + 1):
+            column_dimensions = worksheet.column_dimensions[get_column_letter(col_num)]
+            if col_num == 6:
+                column_dimensions.width = 17
+            else:
+                column_dimensions.width = 45
+
+        header = []
+        for column_title in columns:
+            cell = WriteOnlyCell(worksheet, value=column_title)
             cell.font = Font(bold=True)
             cell.alignment = Alignment(horizontal="center")
             cell.fill = PatternFill(
@@ -517,31 +604,21 @@ class EventApiViewRelevant_to_xlsx(EventApiView):
                 end_color="d2d2d7",
                 fill_type="solid",
             )
-            column_letter = get_column_letter(col_num)
-            column_dimensions = worksheet.column_dimensions[column_letter]
-            if col_num == 6:
-                column_dimensions.width = 17
-            else:
-                column_dimensions.width = 45
-
-        # Iterate through all rows
-        for trade_news in queryset:
-            row_num += 1
-            # Define the data for each cell in the row
-            row = [
-                "; ".join(trade_news.classes),
-                trade_news.itc_codes,
-                trade_news.locations,
-                trade_news.title,
-                trade_news.url,
-                trade_news.dates,
-            ]
-            # Assign the data for each cell of the row
-            for col_num, cell_value in enumerate(row, 1):
-                cell = worksheet.cell(row=row_num, column=col_num)
-                cell.value = cell_value
-        workbook.save(response)
-        return response
+            header.append(cell)
+        worksheet.append(header)
+
+        for classes, *row in rows.iterator(chunk_size=self.chunk_size):
+            worksheet.append(["; ".join(classes), *row])
+
+        output = tempfile.TemporaryFile()
+        workbook.save(output)
+        output.seek(0)
+        return FileResponse(
+            output,
+            as_attachment=True,
+            filename="{date}-trade.xlsx".format(date=datetime.now().strftime("%Y-%m-%d")),
+            content_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+        )
 
     # Конец добавлено
 
@@ -562,8 +639,13 @@ class NewsApiView(EventApiView):
     product = EventApiView.product
     start_date = EventApiView.start_date
     end_date = EventApiView.end_date
+    q = EventApiView.q
+    pagination = EventApiView.pagination
+    cursor = EventApiView.cursor
+    approx_count = EventApiView.approx_count
 
     request = ""
+    etag_model = TradeEvent
     read_serializer_class = EventSerializerRead
     write_event_serializer_class = EventSerializerWrite
     write_approval_serializer_class = EventApprovalSerializerWrite
@@ -597,6 +679,10 @@ class NewsApiView(EventApiView):
                 product,
                 start_date,
                 end_date,
+                q,
+                pagination,
+                cursor,
+                approx_count,
             ],
         ),
         name="list",
@@ -606,19 +692,7 @@ class NewsApiView(EventApiView):
 
     def list(self, request, *args, **kwargs):
         queryset = self.get_queryset()
-        page = self.paginate_queryset(queryset)
-        if page is not None:
-            queryset = page
-        serializer = self.get_serializer(queryset, many=True)
-        events = serializer.data
-
-        data = dict()
-        # ugly but works
-        data["count"] = self.paginator.page.paginator.num_pages
-        data["next"] = self.paginator.get_next_link()
-        data["previous"] = self.paginator.get_previous_link()
-        data["results"] = events
-        return Response(data)
+        return self.get_paginated_events(queryset)
 
     def post_article_ids(self, request):
         """
@@ -626,14 +700,17 @@ class NewsApiView(EventApiView):
         Return: serializer.data
         """
 
-        ids = request.data.get("article_ids")
-        if ids:
-            ids = ids.split(",")
-        req_data = [{"checked_id": v} for v in ids]
-        serializer = self.checkedids_serializer(data=req_data, many=True)
+        serializer = self.get_article_ids_serializer(request.data.get("article_ids"))
         serializer.is_valid(raise_exception=True)
         return serializer
 
+    def get_article_ids_serializer(self, ids):
+        """
+        Сериализатор записей checked_ids для строки article_ids ("1,2,3")
+        """
+        ids = ids.split(",") if ids else []
+        return self.checkedids_serializer(data=[{"checked_id": v} for v in ids], many=True)
+
     def post_text_embedding(self, request, uuid):
         """
         Метод получает вектор из текста через внешнее API.
@@ -643,7 +720,7 @@ class NewsApiView(EventApiView):
         """
         text = request.data.get("title")
         article_ids = request.data.get("article_ids")
-        result = requests.post(EMBEDDING_SERVICE, json={"text": text}).json()
+        result = requests.post(EMBEDDING_SERVICE, json={"text": text}, timeout=EMBEDDING_TIMEOUT).json()
         embedding_data = {
             "id": uuid,
             "embedding": result["embedding"],
@@ -716,8 +793,13 @@ class NewsApiViewApproval(EventApiView):  # (ListAPIView, NewsList): #
     product = EventApiView.product
     start_date = EventApiView.start_date
     end_date = EventApiView.end_date
+    q = EventApiView.q
+    pagination = EventApiView.pagination
+    cursor = EventApiView.cursor
+    approx_count = EventApiView.approx_count
 
     http_method_names = ["get", "post", "head", "options", "trace"]
+    etag_model = TradeEventForApproval
     read_serializer_class = EventApprovalSerializerRead
     write_approval_serializer_class = EventApprovalSerializerWriteStatus
     write_relevant_serializer_class = EventRelevantSerializerWrite
@@ -760,6 +842,10 @@ class NewsApiViewApproval(EventApiView):  # (ListAPIView, NewsList): #
                 product,
                 start_date,
                 end_date,
+                q,
+                pagination,
+                cursor,
+                approx_count,
             ],
         ),
         name="list",
@@ -769,33 +855,24 @@ class NewsApiViewApproval(EventApiView):  # (ListAPIView, NewsList): #
 
     def list(self, request, *args, **kwargs):
         queryset = self.get_queryset()
-        page = self.paginate_queryset(queryset)
-        if page is not None:
-            queryset = page
-        serializer = self.get_serializer(queryset, many=True)
-        events = serializer.data
-
-        data = dict()
-        # ugly but works
-        data["count"] = self.paginator.page.paginator.num_pages
-        data["next"] = self.paginator.get_next_link()
-        data["previous"] = self.paginator.get_previous_link()
-        data["results"] = events
-        return Response(data)
+        return self.get_paginated_events(queryset)
 
     def post_article_ids(self, request):
         """
         Метод сохраняет значения article_ids в approved_ids при сохранении данных в таблицу trade_news_relevant
         Return: serializer.data
         """
-        ids = request.data.get("article_ids")
-        if ids:
-            ids = ids.split(",")
-        req_data = [{"approved_id": v} for v in ids]
-        serializer = self.approved_ids_serializer(data=req_data, many=True)
+        serializer = self.get_article_ids_serializer(request.data.get("article_ids"))
         serializer.is_valid(raise_exception=True)
         return serializer
 
+    def get_article_ids_serializer(self, ids):
+        """
+        Сериализатор записей approved_ids для строки article_ids ("1,2,3")
+        """
+        ids = ids.split(",") if ids else []
+        return self.approved_ids_serializer(data=[{"approved_id": v} for v in ids], many=True)
+
     def post_text_embedding(self, request, uuid):
         """
         Метод получает вектор из текста через внешнее API.
@@ -805,7 +882,7 @@ class NewsApiViewApproval(EventApiView):  # (ListAPIView, NewsList): #
         """
         text = request.data.get("title")
         article_ids = request.data.get("article_ids")
-        result = requests.post(EMBEDDING_SERVICE, json={"text": text}).json()
+        result = requests.post(EMBEDDING_SERVICE, json={"text": text}, timeout=EMBEDDING_TIMEOUT).json()
         embedding_data = {
             "id": uuid,
             "embedding": result["embedding"],
@@ -907,3 +984,212 @@ class NewsApiViewApproval(EventApiView):  # (ListAPIView, NewsList): #
                 status=status.HTTP_200_OK,
             )
             # Конец добавлено
+
+
+class BulkPostMixin:
+    """
+    Пакетная запись событий: список событий проверяется целиком,
+    события без ошибок записываются bulk_create/update в одной транзакции,
+    по остальным возвращаются ошибки с индексом события в списке.
+    Событие проверяется и записывается так же, как одиночным post представления:
+    событие - в event_model, id статей - через get_article_ids_serializer в article_ids_model,
+    у исходных событий в source_model статус меняется на source_status.
+    """
+
+    event_model = None
+    article_ids_model = None
+    source_model = None
+    source_status = None
+    unique_fields = ("classes", "itc_codes", "locations", "title")
+    integrity_errors = {
+        "_pkey": "Новость с таким id уже есть в базе",
+        "unique_": "Новость с аналогичными значениями (Тип отношений, Страны, Код товара, Текст новости) уже существует",
+    }
+
+    def get_unique_key(self, data):
+        return tuple(tuple(data[f]) if isinstance(data[f], list) else data[f] for f in self.unique_fields)
+
+    def validate_items(self, items) -> Tuple[List, List]:
+        """
+        Возвращает список (индекс, validated_data) событий без ошибок и список ошибок.
+        Кроме сериализатора проверяются повторы id и уникальных полей в базе и внутри списка
+        и повторы id статей внутри списка.
+        """
+        valid, errors = [], []
+        # индекс события в списке -> проверенные записи id статей
+        self.article_ids = {}
+        for index, item in enumerate(items):
+            serializer = self.get_serializer(data=item)
+            if not serializer.is_valid():
+                errors.append({"index": index, "id": item.get("id"), "errors": serializer.errors})
+                continue
+            data = serializer.validated_data
+            ids_serializer = self.get_article_ids_serializer(",".join(data["article_ids"]))
+            if not ids_serializer.is_valid():
+                errors.append({"index": index, "id": data["id"], "errors": {"article_ids": ids_serializer.errors}})
+                continue
+            valid.append((index, data))
+            self.article_ids[index] = ids_serializer.validated_data
+
+        existing_ids = set(
+            self.event_model.objects.filter(id__in=[data["id"] for _, data in valid]).values_list("id", flat=True)
+        )
+        existing_keys = {
+            self.get_unique_key(dict(zip(self.unique_fields, row)))
+            for row in self.event_model.objects.filter(title__in=[data["title"] for _, data in valid]).values_list(
+                *self.unique_fields
+            )
+        }
+        checked, seen_ids, seen_article_ids = [], set(), set()
+        for index, data in valid:
+            key = self.get_unique_key(data)
+            # "0" - новость без статьи, может быть у нескольких событий
+            article_ids = {value for ids in self.article_ids[index] for value in ids.values()} - {"0"}
+            repeated_article_ids = article_ids & seen_article_ids
+            if data["id"] in existing_ids or data["id"] in seen_ids:
+                errors.append({"index": index, "id": data["id"], "errors": {"error": self.integrity_errors["_pkey"]}})
+            elif key in existing_keys:
+                errors.append({"index": index, "id": data["id"], "errors": {"error": self.integrity_errors["unique_"]}})
+            elif repeated_article_ids:
+                errors.append({
+                    "index": index,
+                    "id": data["id"],
+                    "errors": {
+                        "article_ids": f"id статей {', '.join(sorted(repeated_article_ids, key=int))} "
+                                       "уже есть у другого события в списке"
+                    },
+                })
+            else:
+                checked.append((index, data))
+                seen_ids.add(data["id"])
+                seen_article_ids |= article_ids
+                existing_keys.add(key)
+        return checked, errors
+
+    def get_integrity_error_message(self, err):
+        for constraint, message in self.integrity_errors.items():
+            if constraint in str(err):
+                return message
+        return str(err)
+
+    def bulk_save(self, items):
+        events = [self.event_model(**data) for _, data in items]
+        set_derived_fields(events)
+        self.event_model.objects.bulk_create(events)
+        self.article_ids_model.objects.bulk_create(
+            [self.article_ids_model(**ids) for index, _ in items for ids in self.article_ids[index]],
+            ignore_conflicts=True,
+        )
+        self.source_model.objects.filter(id__in=[data["id"] for _, data in items]).update(status=self.source_status)
+
+    def save_items(self, items) -> List:
+        """
+        Записывает события одной пачкой. Если пачка не записалась из-за конкурентной записи
+        (IntegrityError), события записываются по одному, ошибки возвращаются по каждому.
+        """
+        errors = []
+        with transaction.atomic():
+            try:
+                with transaction.atomic():
+                    self.bulk_save(items)
+                return errors
+            except IntegrityError:
+                pass
+            for index, data in items:
+                try:
+                    with transaction.atomic():
+                        self.bulk_save([(index, data)])
+                except IntegrityError as err:
+                    errors.append({"index": index, "id": data["id"], "errors": {"error": self.get_integrity_error_message(err)}})
+        return errors
+
+    def bulk_post(self, request):
+        items = request.data
+        if not isinstance(items, list):
+            return Response({"error": "Ожидается список событий"}, status=status.HTTP_400_BAD_REQUEST)
+        valid, errors = self.validate_items(items)
+        valid, embedding_errors = self.prepare_items(valid)
+        errors += embedding_errors
+        errors += self.save_items(valid)
+        failed = {error["index"] for error in errors}
+        saved = [data["id"] for index, data in valid if index not in failed]
+        errors.sort(key=lambda error: error["index"])
+        return Response({"saved": saved, "errors": errors}, status=status.HTTP_200_OK)
+
+    def prepare_items(self, items) -> Tuple[List, List]:
+        """
+        Подготовка событий перед записью (например, получение эмбеддингов). По умолчанию ничего не делает.
+        """
+        return items, []
+
+
+# Пакетная проверка новостей аннотаторами
+class NewsBulkApiView(BulkPostMixin, NewsApiView):
+    """
+    Принимает список событий в формате NewsApiView.post и записывает их в trade_news_for_approval.
+    Возвращает {"saved": [id], "errors": [{"index": номер события в списке, "id": id, "errors": ошибки}]}.
+    """
+
+    http_method_names = ["post", "options"]
+    event_model = TradeEventForApproval
+    article_ids_model = CheckedIDs
+    source_model = TradeEvent
+    source_status = "checked"
+    embedding_workers = 8
+
+    def get_text_embedding(self, data):
+        result = requests.post(EMBEDDING_SERVICE, json={"text": data["title"]}, timeout=EMBEDDING_TIMEOUT).json()
+        return TradeNewsEmbeddings(
+            id=data["id"],
+            embedding=pickle.dumps(np.array(result["embedding"]).astype(np.float16)),
+            article_id=",".join(data["article_ids"]),
+            model=result["model"],
+            date_added=datetime.now(pytz.utc),
+        )
+
+    def prepare_items(self, items):
+        """
+        Получает эмбеддинги заголовков из внешнего API параллельно, до открытия транзакции.
+        """
+        self.embeddings, prepared, errors = {}, [], []
+        with ThreadPoolExecutor(max_workers=self.embedding_workers) as executor:
+            futures = [(index, data, executor.submit(self.get_text_embedding, data)) for index, data in items]
+            for index, data, future in futures:
+                try:
+                    self.embeddings[data["id"]] = future.result()
+                    prepared.append((index, data))
+                except (requests.RequestException, KeyError, TypeError, ValueError) as err:
+                    errors.append({"index": index, "id": data["id"], "errors": {"embedding": str(err)}})
+        return prepared, errors
+
+    def bulk_save(self, items):
+        super().bulk_save(items)
+        # оставшиеся эмбеддинги с теми же id заменяются, как update_or_create в EmbeddingSerializer
+        ids = [data["id"] for _, data in items]
+        TradeNewsEmbeddings.objects.filter(id__in=ids).delete()
+        TradeNewsEmbeddings.objects.bulk_create([self.embeddings[event_id] for event_id in ids])
+
+    @csrf_exempt
+    @swagger_auto_schema(request_body=EventApprovalSerializerWrite(many=True))
+    def post(self, request):
+        return self.bulk_post(request)
+
+
+# Пакетное одобрение новостей проверяющими
+class NewsApprovalBulkApiView(BulkPostMixin, NewsApiViewApproval):
+    """
+    Принимает список событий в формате NewsApiViewApproval.post (с непустым id)
+    и записывает их в trade_news_relevant.
+    Возвращает {"saved": [id], "errors": [{"index": номер события в списке, "id": id, "errors": ошибки}]}.
+    """
+
+    http_method_names = ["post", "options"]
+    event_model = TradeEventRelevant
+    article_ids_model = ApprovedIDs
+    source_model = TradeEventForApproval
+    source_status = "approved"
+
+    @csrf_exempt
+    @swagger_auto_schema(request_body=EventRelevantSerializerWrite(many=True))
+    def post(self, request):
+        return self.bulk_post(request)
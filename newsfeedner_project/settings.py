@@ -91,9 +91,32 @@ DATABASES = {
         "PASSWORD": os.getenv("POSTGRES_PASSWORD"),
         "HOST": os.getenv("POSTGRES_HOST"),
         "PORT": os.getenv("POSTGRES_PORT"),
+        # миграции создаются при развёртывании (entrypoint.sh), тестовая база строится по моделям;
+        # неуправляемые модели тест-раннер делает управляемыми (newsfeedner/tests/test_runner.py)
+        "TEST": {"MIGRATE": False},
     }
 }
 
+# Кэш общий для всех воркеров gunicorn (таблица trade_news_cache, создаётся createcachetable)
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.db.DatabaseCache",
+        "LOCATION": "trade_news_cache",
+        "TIMEOUT": 60 * 60 * 24,
+        "OPTIONS": {"MAX_ENTRIES": 10000},
+    }
+}
+
+# как часто (в секундах) фоновый поток проверяет изменения таблиц событий для данных фильтров
+FILTER_FACETS_REFRESH_INTERVAL = int(os.getenv("FILTER_FACETS_REFRESH_INTERVAL", 60))
+# хранить ли готовые ответы фильтров также в gzip (отдаются клиентам с Accept-Encoding: gzip)
+FILTER_FACETS_GZIP = os.getenv("FILTER_FACETS_GZIP", "1") == "1"
+
+# сколько нормальных форм локаций держать в кэше процесса (utils/normal_forms.py)
+NORMAL_FORMS_CACHE_SIZE = int(os.getenv("NORMAL_FORMS_CACHE_SIZE", 50000))
+# загружать MorphAnalyzer при импорте wsgi.py (gunicorn --preload), а не при первом обращении
+MORPH_PRELOAD = os.getenv("MORPH_PRELOAD", "0") == "1"
+
 ALLOWED_HOSTS = [
     "10.8.0.10",
     "10.8.0.5",
@@ -7,10 +7,20 @@ For more information on this file, see
 https://docs.djangoproject.com/en/2.1/howto/deployment/wsgi/
 """
 
+import gc
 import os
 
+from django.conf import settings
 from django.core.wsgi import get_wsgi_application
 
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "newsfeedner_project.settings")
 
 application = get_wsgi_application()
+
+if settings.MORPH_PRELOAD:
+    # gunicorn --preload: словари pymorphy2 загружаются в мастере и после fork остаются общими страницами;
+    # gc.freeze убирает загруженные объекты из обхода сборщика мусора, чтобы он не копировал их страницы
+    from newsfeedner.utils.morph import get_morph
+
+    get_morph()
+    gc.freeze()